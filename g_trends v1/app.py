@@ -1,17 +1,42 @@
 import os
+import threading
 import datetime as dt
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 import pandas as pd
 import streamlit as st
-from pytrends.request import TrendReq
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from gtrends.anomalies import compute_anomalies
+from gtrends.cache import get_explanation_cache, get_trends_cache
+from gtrends.config import (
+    GEO_CODE,
+    HF_BATCH_SIZE,
+    INFERENCE_BACKEND,
+    MODEL_ID,
+    PRELOAD_MODEL,
+    SIDECAR_ADDRESS,
+    STREAM_EXPLANATIONS,
+)
+from gtrends.explain import (
+    HF_TOKEN_PLACEHOLDER,
+    is_missing_key,
+)
+from gtrends.fetch import fetch_trends_swr
+from gtrends.formatting import format_pct
+from gtrends.inference import pipeline_inference_queue, queued_hf_explanation, queued_stream_hf_explanation
+from gtrends.preload import ModelPreloader, preload_textgen_pipeline
+from gtrends.retry import CircuitOpenError, is_rate_limit_error
+from gtrends.scheduler import explain_concurrently
+from gtrends.session import get_session_pool
+from gtrends.sidecar import SidecarClient
+from gtrends.singleflight import get_single_flight
+from gtrends.views import get_view_log
 
 # -----------------------------
 # Config / Constants
 # -----------------------------
 APP_TITLE = "Keyword Trend Explorer"
-# MODEL_ID = "mistralai/Mistral-7B-Instruct-v0.2" # Large model, 7B params 
-MODEL_ID = "distilgpt2" # Small model, 124M params
 
 
 # Load environment variables from .env file if it exists
@@ -30,139 +55,82 @@ st.set_page_config(page_title=APP_TITLE, layout="centered")
 # -----------------------------
 # Utility Functions
 # -----------------------------
-@st.cache_data(show_spinner=False)
-def fetch_trends_2023_us(keyword: str) -> pd.DataFrame:
+# A short TTL lets a page pick up data refreshed in the background a minute later
+@st.cache_data(show_spinner=False, ttl=60)
+def fetch_trends_2023_us(keyword: str) -> Tuple[pd.DataFrame, bool]:
     """Fetch weekly Google Trends data for 2023 in the US for a keyword.
 
-    Returns a DataFrame with columns: [date, interest]
+    Returns (DataFrame with columns [date, interest], is_stale); expired data is
+    returned at once and refreshed in the background.
+    Errors are raised rather than returned so that failures are never cached.
     """
-    import time
-    import random
-    
+    return fetch_trends_swr(keyword, timeframe="2023-01-01 2023-12-31", geo="US")
+
+
+def load_trends(keyword: str) -> pd.DataFrame:
+    """Fetch trends for the UI, showing an error and returning an empty frame on failure."""
     try:
-        pytrends = TrendReq(hl="en-US", tz=360)
-        pytrends.build_payload(kw_list=[keyword], timeframe="2023-01-01 2023-12-31", geo="US")
-        
-        # Add a small random delay to avoid rate limiting
-        time.sleep(random.uniform(1, 3))
-        
-        df = pytrends.interest_over_time()
-        
-        if df is None or df.empty:
-            return pd.DataFrame(columns=["date", "interest"])  # empty frame
-
-        # df index is datetime; column is the keyword, plus 'isPartial'
-        series = df[keyword].copy()
-        series = series.asfreq("W-SUN") if series.index.freq is None else series
-
-        out = pd.DataFrame({
-            "date": series.index.tz_localize(None),
-            "interest": series.values,
-        })
-        return out.reset_index(drop=True)
-        
+        trends_df, stale = fetch_trends_2023_us(keyword)
+        if stale:
+            st.caption("🕒 Showing the last saved data while it is refreshed in the background.")
+        return trends_df
+    except CircuitOpenError as e:
+        st.error(f"⚠️ Google Trends is rate limiting us. Please try again in about {e.retry_in:.0f} seconds.")
     except Exception as e:
-        if "429" in str(e) or "TooManyRequests" in str(e):
+        if is_rate_limit_error(e):
             st.error("⚠️ Rate limit exceeded. Please wait a few minutes before trying again.")
-            return pd.DataFrame(columns=["date", "interest"])
         else:
             st.error(f"Error fetching trends data: {e}")
-            return pd.DataFrame(columns=["date", "interest"])
+    return pd.DataFrame(columns=["date", "interest"])
 
 
-def compute_anomalies(df: pd.DataFrame, change_threshold: float = 0.30) -> pd.DataFrame:
-    """Compute week-over-week percentage change anomalies.
+def get_model_preloader(token: Optional[str]) -> ModelPreloader:
+    """Start building (and warming up) the pipeline for `token` on a background thread, once per process.
 
-    An anomaly is when abs(pct_change) >= change_threshold (default 30%).
-    Adds columns: pct_change, is_anomaly, direction ('spiked'/'dropped'/None)
+    `python -m gtrends.serve app.py` starts the same preload when the server starts.
     """
-    if df.empty:
-        return df.assign(pct_change=pd.Series(dtype=float), is_anomaly=False, direction=None)
-
-    out = df.copy()
-
-    # Avoid division by zero by replacing zero previous interest with NaN during pct_change
-    interest = out["interest"].astype(float)
-    pct = interest.pct_change()
-
-    out["pct_change"] = pct
-    out["is_anomaly"] = pct.abs() >= change_threshold
-    out["direction"] = out["pct_change"].apply(lambda x: "spiked" if pd.notna(x) and x > 0 else ("dropped" if pd.notna(x) and x < 0 else None))
-
-    return out
+    return preload_textgen_pipeline(token)
 
 
-def format_pct(x: float) -> str:
-    if pd.isna(x):
-        return "—"
-    return f"{x * 100:.1f}%"
-
+def get_textgen_pipeline(token: Optional[str]):
+    """Return the process-wide local text-generation pipeline, waiting for the preload if it is still running.
 
-def build_explanation_prompt(keyword: str, date: dt.date, direction: str) -> str:
-    return (
-        f"Explain why search interest in '{keyword}' might have {direction} on "
-        f"{date.strftime('%Y-%m-%d')} in the US. Give a concise 2-3 sentence hypothesis."
-    )
+    Returns None if the pipeline cannot be created (e.g., missing dependency or token).
+    """
+    if is_missing_key(token, HF_TOKEN_PLACEHOLDER):
+        return None
+    return get_model_preloader(token).wait()
 
 
 @st.cache_resource(show_spinner=False)
-def get_textgen_pipeline(token: Optional[str]):
-    """Create and cache a local transformers text-generation pipeline for the configured model.
+def get_inference_queue(token: Optional[str]):
+    """Process-wide queue that batches prompts from every session through the cached pipeline.
 
-    Returns None if the pipeline cannot be created (e.g., missing dependency or token).
+    With GTRENDS_SIDECAR_ADDRESS set, prompts go to the shared sidecar process instead,
+    so this process never loads the weights. Returns None if the pipeline cannot be created.
     """
-    if not token or token.strip() == "YOUR_HF_API_TOKEN_HERE":
-        return None
-    try:
-        from transformers import pipeline  # type: ignore
-
-        # Pass token for private/gated models if needed.
-        # Some models require trust_remote_code; keep off by default for safety.
-        pipe = pipeline(
-            task="text-generation",
-            model=MODEL_ID,
-            token=token,  # Needed if model is gated/private
-            trust_remote_code=True,
-            device="cpu"  # Force CPU usage
-            # device_map="auto"  # Uncomment if GPU/accelerate available
-        )
-        return pipe
-    except Exception:
+    if SIDECAR_ADDRESS:
+        return SidecarClient(SIDECAR_ADDRESS)
+    textgen = get_textgen_pipeline(token)
+    if textgen is None:
         return None
+    return pipeline_inference_queue(textgen)
 
 
-@st.cache_data(show_spinner=False)
 def get_hf_explanation(keyword: str, date: dt.date, direction: str, token: Optional[str]) -> str:
-    """Call Hugging Face Inference API to get an explanation. Falls back to a dummy string if unavailable."""
-    prompt = build_explanation_prompt(keyword, date, direction)
+    """Get an explanation from the shared inference queue. Falls back to a dummy string if unavailable.
 
-    # Fallback if token is not provided or left as placeholder
-    if not token or token.strip() == "YOUR_HF_API_TOKEN_HERE":
-        return f"(Demo) Possible reason it {direction}: seasonal events, news cycles, or viral content around {date:%Y-%m-%d}."
+    Not wrapped in st.cache_data: the persistent explanation cache already reuses results, and a
+    memoized copy would pin the first (possibly stale or fallback) text until the server restarts.
+    """
+    return queued_hf_explanation(
+        keyword, date, direction, token, queue_loader=get_inference_queue, cache=get_explanation_cache()
+    )
 
-    # Use local transformers pipeline
-    textgen = get_textgen_pipeline(token)
-    if textgen is not None:
-        try:
-            outputs = textgen(
-                prompt,
-                max_new_tokens=100,
-                temperature=0.7,
-                do_sample=True,
-                return_full_text=False,
-            )
-            # transformers returns list of dicts with 'generated_text'
-            if isinstance(outputs, list) and outputs:
-                text = outputs[0].get("generated_text")
-                if isinstance(text, str):
-                    return text.strip()
-            # Some pipelines may return a string directly
-            if isinstance(outputs, str):
-                return outputs.strip()
-            return str(outputs)
-        except Exception as e:
-            return f"(Pipeline) Generation failed: {e}"
-    return "(Pipeline) Text-generation pipeline unavailable. Ensure transformers is installed and model is accessible."
+
+# Kick off the model build on the first script run (a no-op if gtrends.serve already started it at server start)
+if PRELOAD_MODEL and not SIDECAR_ADDRESS and not is_missing_key(HUGGINGFACE_API_TOKEN, HF_TOKEN_PLACEHOLDER):
+    get_model_preloader(HUGGINGFACE_API_TOKEN)
 
 
 # -----------------------------
@@ -187,13 +155,42 @@ with st.sidebar:
         key="hf_token_input",
         value=HUGGINGFACE_API_TOKEN or "",
     )
-    st.caption("Uses model: " + MODEL_ID)
+    if SIDECAR_ADDRESS:
+        st.caption(f"Uses model: {MODEL_ID} (shared sidecar at {SIDECAR_ADDRESS})")
+    else:
+        st.caption(f"Uses model: {MODEL_ID} ({INFERENCE_BACKEND} backend)")
+    token_for_status = st.session_state.get("hf_token_input") or HUGGINGFACE_API_TOKEN
+    if PRELOAD_MODEL and not SIDECAR_ADDRESS and not is_missing_key(token_for_status, HF_TOKEN_PLACEHOLDER):
+        preloader = get_model_preloader(token_for_status)
+        if preloader.ready:
+            st.caption(f"🟢 Model ready (loaded in {preloader.load_seconds:.0f}s)")
+        elif preloader.state == "loading":
+            st.caption("🟡 Model warming up... explanations will start once it is ready")
+        else:
+            st.caption("🔴 Model unavailable: " + (preloader.status()["error"] or "check transformers and the token"))
+
+    cache_stats = get_trends_cache().stats()
+    st.caption(
+        f"Trends cache: {cache_stats['hits']} hits • {cache_stats['stale']} stale • "
+        f"{cache_stats['misses']} misses • {cache_stats['entries']} entries"
+    )
+    explanation_stats = get_explanation_cache().stats()
+    st.caption(f"Explanation cache: {explanation_stats['hits']} hits • {explanation_stats['misses']} misses • {explanation_stats['entries']} entries")
+    pool_stats = get_session_pool().stats()
+    st.caption(f"Trends sessions: {pool_stats['created']} created • {pool_stats['reused']} reused • {pool_stats['idle']} idle")
+    flight_stats = get_single_flight().stats()
+    st.caption(f"Coalesced requests: {flight_stats['shared']} shared • {flight_stats['executed']} executed")
 
 keyword = st.text_input("Enter a keyword or phrase", placeholder="e.g., electric cars", key="keyword_input")
 
 if keyword:
+    viewed = st.session_state.setdefault("viewed_keywords", set())
+    if keyword not in viewed:
+        # Count each keyword once per session; the watchlist prefetcher warms the most viewed first
+        viewed.add(keyword)
+        get_view_log().record(keyword, GEO_CODE)
     with st.spinner("Fetching Google Trends data..."):
-        trends_df = fetch_trends_2023_us(keyword)
+        trends_df = load_trends(keyword)
     
     # Add helpful information about rate limiting
     st.info("💡 **Tip**: If you get rate limit errors, wait 2-3 minutes between searches.")
@@ -237,8 +234,10 @@ if keyword:
     if anomalies.empty:
         st.info("No anomalies detected (±30% WoW).")
     else:
-        # Display each anomaly with explanation
+        # Display each anomaly with a placeholder. Several anomalies are submitted at once so the shared
+        # inference queue can batch them (and other sessions' prompts) together
         token_in_use = st.session_state.get("hf_token_input") or HUGGINGFACE_API_TOKEN
+        jobs, slots = [], []
         for _, row in anomalies.iterrows():
             date_val = pd.to_datetime(row["date"]).date()
             direction = row["direction"] or "changed"
@@ -246,9 +245,43 @@ if keyword:
 
             with st.expander(f"{date_val} • {direction} • WoW: {wow_str}"):
                 st.write(f"Interest: {int(row['interest'])}")
-                with st.spinner("Getting explanation..."):
-                    explanation = get_hf_explanation(keyword, date_val, direction, token_in_use)
-                st.write(explanation)
+                slot = st.empty()
+                slot.caption("⏳ Getting explanation...")
+            jobs.append((keyword, date_val, direction))
+            slots.append(slot)
+
+        if STREAM_EXPLANATIONS and not SIDECAR_ADDRESS and len(jobs) == 1:
+            # A single explanation streams token by token; streaming several would run them one after
+            # another at batch size 1, so the list below goes through the batching queue instead. The stream
+            # is generated by the queue's worker too, so it never uses the pipeline alongside a batch
+            (kw, d, dirn), = jobs
+            slots[0].write_stream(queued_stream_hf_explanation(
+                kw, d, dirn, token_in_use,
+                queue_loader=get_inference_queue,
+                cache=get_explanation_cache(),
+            ))
+        else:
+            # Results stream into their expanders as each batch completes
+            script_ctx = get_script_run_ctx()
+            for i, explanation in explain_concurrently(
+                jobs,
+                lambda kw, d, dirn: get_hf_explanation(kw, d, dirn, token_in_use),
+                max_concurrency=HF_BATCH_SIZE,
+                initializer=lambda: add_script_run_ctx(threading.current_thread(), script_ctx),
+            ):
+                slots[i].write(explanation)
+
+        # The queue only exists once the pipeline has been loaded for a real token
+        inference_queue = None if is_missing_key(token_in_use, HF_TOKEN_PLACEHOLDER) else get_inference_queue(token_in_use)
+        try:
+            q = inference_queue.stats() if inference_queue is not None else None
+        except Exception:
+            q = None  # sidecar unreachable; the explanations above already say so
+        if q is not None and q["batches"]:
+            st.sidebar.caption(
+                f"Inference queue: depth {q['queue_depth']} • mean batch {q['mean_batch_size']:.1f} • "
+                f"p50 {q['p50_ms']:.0f} ms • p95 {q['p95_ms']:.0f} ms"
+            )
 
 else:
     st.write("Enter a keyword to explore its trend.")
@@ -1,22 +1,32 @@
 import os
 import datetime as dt
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 import pandas as pd
 import streamlit as st
-from pytrends.request import TrendReq
+
+from gtrends.anomalies import compute_anomalies
+from gtrends.cache import get_explanation_cache, get_trends_cache
+from gtrends.config import GEO_CODE, OPENAI_BATCH_EXPLANATIONS, OPENAI_MODEL, STREAM_EXPLANATIONS, TIMEFRAME
+from gtrends.explain import (
+    load_openai_client,
+    openai_explanation,
+    openai_explanations_batch,
+    stream_openai_explanation,
+)
+from gtrends.fetch import fetch_trends_swr
+from gtrends.formatting import format_pct, format_timeframe_display, get_geo_display_name
+from gtrends.retry import CircuitOpenError, is_rate_limit_error
+from gtrends.scheduler import aexplain_openai, iterate_async
+from gtrends.semantic import get_semantic_cache
+from gtrends.session import get_session_pool
+from gtrends.singleflight import get_single_flight
+from gtrends.views import get_view_log
 
 # -----------------------------
 # Config / Constants
 # -----------------------------
 APP_TITLE = "Keyword Trend Explorer"
-# OpenAI model configuration
-OPENAI_MODEL = "gpt-4o-mini"
-MAX_TOKENS = 100
-
-# Google Trends configuration
-TIMEFRAME = "2023-01-01 2023-12-31"
-GEO_CODE = "US"
 
 
 # Load environment variables from .env file if it exists
@@ -33,79 +43,33 @@ st.set_page_config(page_title=APP_TITLE, layout="centered")
 # -----------------------------
 # Utility Functions
 # -----------------------------
-@st.cache_data(show_spinner=False)
-def fetch_trends_2023_us(keyword: str) -> pd.DataFrame:
+# A short TTL lets a page pick up data refreshed in the background a minute later
+@st.cache_data(show_spinner=False, ttl=60)
+def fetch_trends_2023_us(keyword: str) -> Tuple[pd.DataFrame, bool]:
     """Fetch weekly Google Trends data for 2023 in the US for a keyword.
 
-    Returns a DataFrame with columns: [date, interest]
+    Returns (DataFrame with columns [date, interest], is_stale); expired data is
+    returned at once and refreshed in the background.
+    Errors are raised rather than returned so that failures are never cached.
     """
-    import time
-    import random
-    
+    return fetch_trends_swr(keyword, timeframe=TIMEFRAME, geo=GEO_CODE)
+
+
+def load_trends(keyword: str) -> pd.DataFrame:
+    """Fetch trends for the UI, showing an error and returning an empty frame on failure."""
     try:
-        pytrends = TrendReq(hl="en-US", tz=360)
-        pytrends.build_payload(kw_list=[keyword], timeframe=TIMEFRAME, geo=GEO_CODE)
-        
-        # Add a small random delay to avoid rate limiting
-        time.sleep(random.uniform(1, 3))
-        
-        df = pytrends.interest_over_time()
-        
-        if df is None or df.empty:
-            return pd.DataFrame(columns=["date", "interest"])  # empty frame
-
-        # df index is datetime; column is the keyword, plus 'isPartial'
-        series = df[keyword].copy()
-        series = series.asfreq("W-SUN") if series.index.freq is None else series
-
-        out = pd.DataFrame({
-            "date": series.index.tz_localize(None),
-            "interest": series.values,
-        })
-        return out.reset_index(drop=True)
-        
+        trends_df, stale = fetch_trends_2023_us(keyword)
+        if stale:
+            st.caption("🕒 Showing the last saved data while it is refreshed in the background.")
+        return trends_df
+    except CircuitOpenError as e:
+        st.error(f"⚠️ Google Trends is rate limiting us. Please try again in about {e.retry_in:.0f} seconds.")
     except Exception as e:
-        if "429" in str(e) or "TooManyRequests" in str(e):
+        if is_rate_limit_error(e):
             st.error("⚠️ Rate limit exceeded. Please wait a few minutes before trying again.")
-            return pd.DataFrame(columns=["date", "interest"])
         else:
             st.error(f"Error fetching trends data: {e}")
-            return pd.DataFrame(columns=["date", "interest"])
-
-
-def compute_anomalies(df: pd.DataFrame, change_threshold: float = 0.30) -> pd.DataFrame:
-    """Compute week-over-week percentage change anomalies.
-
-    An anomaly is when abs(pct_change) >= change_threshold (default 30%).
-    Adds columns: pct_change, is_anomaly, direction ('spiked'/'dropped'/None)
-    """
-    if df.empty:
-        return df.assign(pct_change=pd.Series(dtype=float), is_anomaly=False, direction=None)
-
-    out = df.copy()
-
-    # Avoid division by zero by replacing zero previous interest with NaN during pct_change
-    interest = out["interest"].astype(float)
-    pct = interest.pct_change()
-
-    out["pct_change"] = pct
-    out["is_anomaly"] = pct.abs() >= change_threshold
-    out["direction"] = out["pct_change"].apply(lambda x: "spiked" if pd.notna(x) and x > 0 else ("dropped" if pd.notna(x) and x < 0 else None))
-
-    return out
-
-
-def format_pct(x: float) -> str:
-    if pd.isna(x):
-        return "—"
-    return f"{x * 100:.1f}%"
-
-
-def build_explanation_prompt(keyword: str, date: dt.date, direction: str) -> str:
-    return (
-        f"Explain why search interest in '{keyword}' might have {direction} on "
-        f"{date.strftime('%Y-%m-%d')} in {get_geo_display_name(GEO_CODE)}. Give a concise 2-3 sentence hypothesis."
-    )
+    return pd.DataFrame(columns=["date", "interest"])
 
 
 @st.cache_resource(show_spinner=False)
@@ -114,78 +78,21 @@ def get_openai_client(api_key: Optional[str]):
 
     Returns None if the client cannot be created (e.g., missing dependency or API key).
     """
-    if not api_key or api_key.strip() == "YOUR_OPENAI_API_KEY_HERE":
-        return None
-    try:
-        from openai import OpenAI
-        
-        client = OpenAI(api_key=api_key)
-        return client
-    except Exception:
-        return None
+    return load_openai_client(api_key)
 
 
-@st.cache_data(show_spinner=False)
 def get_openai_explanation(keyword: str, date: dt.date, direction: str, api_key: Optional[str]) -> str:
-    """Call OpenAI API to get an explanation. Falls back to a dummy string if unavailable."""
-    prompt = build_explanation_prompt(keyword, date, direction)
-
-    # Fallback if API key is not provided or left as placeholder
-    if not api_key or api_key.strip() == "YOUR_OPENAI_API_KEY_HERE":
-        return f"(Demo) Possible reason it {direction}: seasonal events, news cycles, or viral content around {date:%Y-%m-%d}."
-
-    # Use OpenAI API
-    client = get_openai_client(api_key)
-    if client is not None:
-        try:
-            response = client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=MAX_TOKENS
-            )
-            
-            if response.choices and len(response.choices) > 0:
-                content = response.choices[0].message.content
-                if content:
-                    return content.strip()
-            
-            return "No response generated."
-        except Exception as e:
-            return f"(OpenAI) Generation failed: {e}"
-    return "(OpenAI) Client unavailable. Ensure openai library is installed and API key is valid."
-
-
-def format_timeframe_display(timeframe: str) -> str:
-    """Convert timeframe from 'YYYY-MM-DD YYYY-MM-DD' to readable format."""
-    try:
-        start_date, end_date = timeframe.split(" ")
-        start_dt = dt.datetime.strptime(start_date, "%Y-%m-%d")
-        end_dt = dt.datetime.strptime(end_date, "%Y-%m-%d")
-        
-        start_formatted = start_dt.strftime("%B %d, %Y")
-        end_formatted = end_dt.strftime("%B %d, %Y")
-        
-        return f"{start_formatted} - {end_formatted}"
-    except:
-        return timeframe  # fallback to original if parsing fails
+    """Call OpenAI API to get an explanation. Falls back to a dummy string if unavailable.
 
-def get_geo_display_name(geo_code: str) -> str:
-    """Convert geo code to display name using pycountry."""
-    try:
-        import pycountry
-        
-        # Convert 2-letter country code to country name
-        country = pycountry.countries.get(alpha_2=geo_code)
-        if country:
-            return country.name
-        else:
-            return geo_code  # fallback to code if not found
-            
-    except Exception as e:
-        # Fallback to original code if pycountry fails
-        return geo_code
+    Reuse comes from the shared explanation cache, so texts regenerated in the background reach the page.
+    """
+    return openai_explanation(
+        keyword, date, direction, api_key,
+        region=get_geo_display_name(GEO_CODE),
+        client_loader=get_openai_client,
+        cache=get_explanation_cache(),
+        semantic_cache=get_semantic_cache(),
+    )
 
 
 # -----------------------------
@@ -212,11 +119,32 @@ with st.sidebar:
     )
     st.caption("Uses model: " + OPENAI_MODEL)
 
+    cache_stats = get_trends_cache().stats()
+    st.caption(
+        f"Trends cache: {cache_stats['hits']} hits • {cache_stats['stale']} stale • "
+        f"{cache_stats['misses']} misses • {cache_stats['entries']} entries"
+    )
+    explanation_stats = get_explanation_cache().stats()
+    st.caption(f"Explanation cache: {explanation_stats['hits']} hits • {explanation_stats['misses']} misses • {explanation_stats['entries']} entries")
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is not None:
+        semantic_stats = semantic_cache.stats()
+        st.caption(f"Similar-keyword reuse: {semantic_stats['hits']} hits • {semantic_stats['entries']} entries")
+    pool_stats = get_session_pool().stats()
+    st.caption(f"Trends sessions: {pool_stats['created']} created • {pool_stats['reused']} reused • {pool_stats['idle']} idle")
+    flight_stats = get_single_flight().stats()
+    st.caption(f"Coalesced requests: {flight_stats['shared']} shared • {flight_stats['executed']} executed")
+
 keyword = st.text_input("Enter a keyword or phrase", placeholder="e.g., electric cars", key="keyword_input")
 
 if keyword:
+    viewed = st.session_state.setdefault("viewed_keywords", set())
+    if keyword not in viewed:
+        # Count each keyword once per session; the watchlist prefetcher warms the most viewed first
+        viewed.add(keyword)
+        get_view_log().record(keyword, GEO_CODE)
     with st.spinner("Fetching Google Trends data..."):
-        trends_df = fetch_trends_2023_us(keyword)
+        trends_df = load_trends(keyword)
     
     # Add helpful information about rate limiting
     st.info("💡 **Tip**: If you get rate limit errors, wait 2-3 minutes between searches.")
@@ -293,6 +221,8 @@ if keyword:
     else:
         # Display each anomaly with on-demand explanation
         api_key_in_use = st.session_state.get("openai_key_input") or OPENAI_API_KEY
+        explain_all = st.button("🤖 Explain all anomalies", key=f"explain_all_{keyword}")
+        pending_jobs, pending = [], []
         for idx, row in anomalies.iterrows():
             date_val = pd.to_datetime(row["date"]).date()
             direction = row["direction"] or "changed"
@@ -306,16 +236,65 @@ if keyword:
                 st.write(f"Interest: {int(row['interest'])}")
                 
                 # Button to trigger explanation
-                if st.button("🤖 Get AI Explanation", key=button_key):
-                    with st.spinner("Getting explanation from OpenAI..."):
-                        explanation = get_openai_explanation(keyword, date_val, direction, api_key_in_use)
-                        # Store the explanation in session state
-                        st.session_state[explanation_key] = explanation
-                
+                clicked = st.button("🤖 Get AI Explanation", key=button_key)
+                slot = st.empty()
+                if clicked:
+                    if STREAM_EXPLANATIONS:
+                        # Tokens appear as they arrive; the final text is cached by stream_openai_explanation
+                        with slot.container():
+                            st.write("**AI Explanation:**")
+                            explanation = st.write_stream(stream_openai_explanation(
+                                keyword, date_val, direction, api_key_in_use,
+                                region=get_geo_display_name(GEO_CODE),
+                                client_loader=get_openai_client,
+                                cache=get_explanation_cache(),
+                                semantic_cache=get_semantic_cache(),
+                            ))
+                    else:
+                        with st.spinner("Getting explanation from OpenAI..."):
+                            explanation = get_openai_explanation(keyword, date_val, direction, api_key_in_use)
+                    # Store the explanation in session state
+                    st.session_state[explanation_key] = explanation
+
                 # Display explanation if it exists in session state
                 if explanation_key in st.session_state:
+                    with slot.container():
+                        st.write("**AI Explanation:**")
+                        st.write(st.session_state[explanation_key])
+                elif explain_all:
+                    slot.caption("⏳ Getting explanation from OpenAI...")
+                    pending_jobs.append((keyword, date_val, direction))
+                    pending.append((explanation_key, slot))
+
+        # "Explain all" asks for every missing explanation of the keyword in one JSON request, or
+        # (with GTRENDS_OPENAI_BATCH_EXPLAIN=0) sends them concurrently and fills expanders as each arrives
+        if pending_jobs:
+            region = get_geo_display_name(GEO_CODE)
+            explanation_cache, semantic_cache = get_explanation_cache(), get_semantic_cache()
+            if OPENAI_BATCH_EXPLANATIONS:
+                with st.spinner("Getting explanations from OpenAI..."):
+                    texts = openai_explanations_batch(
+                        keyword,
+                        [(date_val, direction) for _, date_val, direction in pending_jobs],
+                        api_key_in_use,
+                        region=region,
+                        client_loader=get_openai_client,
+                        cache=explanation_cache,
+                        semantic_cache=semantic_cache,
+                    )
+                results = enumerate(texts)
+            else:
+                results = iterate_async(
+                    lambda: aexplain_openai(
+                        pending_jobs, api_key_in_use, region=region, cache=explanation_cache, semantic_cache=semantic_cache
+                    )
+                )
+            for i, explanation in results:
+                explanation_key, slot = pending[i]
+                st.session_state[explanation_key] = explanation
+                with slot.container():
                     st.write("**AI Explanation:**")
-                    st.write(st.session_state[explanation_key])
+                    st.write(explanation)
 
 else:
     st.write("Enter a keyword to explore its trend.")
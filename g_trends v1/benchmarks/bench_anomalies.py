@@ -0,0 +1,87 @@
+"""Benchmark for compute_anomalies over long-format frames.
+
+Compares the vectorized grouped implementation against the previous per-series
+loop (Series.apply with a Python lambda for every row) at increasing numbers
+of weekly series. Run from the `g_trends v1` directory:
+
+    python benchmarks/bench_anomalies.py --series 1000 10000 100000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gtrends.anomalies import compute_anomalies  # noqa: E402
+
+
+def legacy_compute_anomalies(df: pd.DataFrame, change_threshold: float = 0.30) -> pd.DataFrame:
+    """The pre-vectorization implementation, kept here as the baseline."""
+    out = df.copy()
+    pct = out["interest"].astype(float).ffill().pct_change(fill_method=None)
+    out["pct_change"] = pct
+    out["is_anomaly"] = pct.abs() >= change_threshold
+    out["direction"] = out["pct_change"].apply(lambda x: "spiked" if pd.notna(x) and x > 0 else ("dropped" if pd.notna(x) and x < 0 else None))
+    return out
+
+
+def make_long_frame(n_series: int, weeks: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2023-01-01", periods=weeks, freq="W-SUN")
+    interest = rng.integers(0, 101, size=n_series * weeks).astype(float)
+    return pd.DataFrame({
+        "keyword": np.repeat([f"kw{i}" for i in range(n_series)], weeks),
+        "date": np.tile(dates.values, n_series),
+        "interest": interest,
+    })
+
+
+def time_it(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--baseline-max", type=int, default=10000,
+        help="Skip the slow per-series baseline above this many series (default: 10000)",
+    )
+    args = parser.parse_args()
+
+    print(f"{'series':>8} {'rows':>10} {'vectorized s':>13} {'baseline s':>11} {'speedup':>8}")
+    for n in args.series:
+        df = make_long_frame(n, args.weeks)
+        fast = time_it(lambda: compute_anomalies(df, by="keyword"), args.repeat)
+
+        if n <= args.baseline_max:
+            groups = [g for _, g in df.groupby("keyword", sort=False)]
+            slow = time_it(lambda: pd.concat([legacy_compute_anomalies(g) for g in groups]), 1)
+
+            # Sanity check: both implementations agree
+            expected = pd.concat([legacy_compute_anomalies(g) for g in groups[:100]])
+            actual = compute_anomalies(pd.concat(groups[:100]), by="keyword")
+            assert np.allclose(expected["pct_change"], actual["pct_change"], equal_nan=True)
+            assert (expected["is_anomaly"].to_numpy() == actual["is_anomaly"].to_numpy()).all()
+            assert (expected["direction"].fillna("-").to_numpy() == actual["direction"].astype(object).fillna("-").to_numpy()).all()
+
+            print(f"{n:>8} {len(df):>10} {fast:>13.3f} {slow:>11.3f} {slow / fast:>7.1f}x")
+        else:
+            print(f"{n:>8} {len(df):>10} {fast:>13.3f} {'-':>11} {'-':>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Import-time benchmark for the gtrends package.
+
+Imports each core module in a fresh interpreter, reports the median import time
+and fails if a module is slower than --max-ms or pulls in a heavy dependency at
+import time. Run from the `g_trends v1` directory:
+
+    python benchmarks/bench_import.py --max-ms 50
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+MODULES = [
+    "gtrends",
+    "gtrends.config",
+    "gtrends.anomalies",
+    "gtrends.bulk",
+    "gtrends.cache",
+    "gtrends.cli",
+    "gtrends.explain",
+    "gtrends.fetch",
+    "gtrends.formatting",
+    "gtrends.inference",
+    "gtrends.prefetch",
+    "gtrends.preload",
+    "gtrends.ratelimit",
+    "gtrends.refresh",
+    "gtrends.retry",
+    "gtrends.scheduler",
+    "gtrends.semantic",
+    "gtrends.serve",
+    "gtrends.session",
+    "gtrends.sidecar",
+    "gtrends.singleflight",
+    "gtrends.stitch",
+    "gtrends.views",
+]
+
+HEAVY_DEPENDENCIES = [
+    "pandas",
+    "numpy",
+    "streamlit",
+    "pytrends",
+    "requests",
+    "transformers",
+    "torch",
+    "openai",
+    "altair",
+    "pycountry",
+    "dotenv",
+]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = {heavy!r}
+print(json.dumps({{"ms": elapsed * 1000, "leaked": [m for m in heavy if m in sys.modules]}}))
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def probe(module: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_DEPENDENCIES)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module (default: 5)")
+    parser.add_argument("--max-ms", type=float, default=50.0, help="Fail if a module's median import exceeds this")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':<22} {'median ms':>10}  leaked heavy imports")
+    for module in MODULES:
+        runs = [probe(module) for _ in range(args.repeat)]
+        median = statistics.median(r["ms"] for r in runs)
+        leaked = sorted({m for r in runs for m in r["leaked"]})
+        slow = median > args.max_ms
+        failed = failed or slow or bool(leaked)
+        flag = "  <-- too slow" if slow else ""
+        print(f"{module:<22} {median:>10.1f}  {', '.join(leaked) or '-'}{flag}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Benchmark for the local text-generation backends.
+
+Loads MODEL_ID with each backend ("torch", "int8", "onnx") in a fresh
+interpreter, generates explanations for a fixed set of prompts and reports load
+time, generated tokens per second and peak RSS. Needs transformers (plus torch,
+and optimum[onnxruntime] for "onnx") and a Hugging Face token in
+HUGGINGFACE_API_TOKEN. Run from the `g_trends v1` directory:
+
+    python benchmarks/bench_textgen_backends.py --backends torch int8 onnx --prompts 8
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+PROBE = """
+import sys, time, json, resource
+import datetime as dt
+from gtrends.config import MODEL_ID
+from gtrends.explain import GENERATION_KWARGS, build_explanation_prompt, load_textgen_pipeline
+
+start = time.perf_counter()
+textgen = load_textgen_pipeline({token!r}, backend={backend!r})
+load_s = time.perf_counter() - start
+if textgen is None:
+    print(json.dumps({{"error": "pipeline unavailable"}}))
+    sys.exit(0)
+
+prompts = [
+    build_explanation_prompt(f"keyword {{i}}", dt.date(2023, 1, 1) + dt.timedelta(weeks=i), "spiked")
+    for i in range({prompts})
+]
+textgen(prompts[0], **GENERATION_KWARGS)  # first-run warm-up
+
+tokens = 0
+start = time.perf_counter()
+for prompt in prompts:
+    text = textgen(prompt, **GENERATION_KWARGS)[0]["generated_text"]
+    tokens += len(textgen.tokenizer(text)["input_ids"])
+elapsed = time.perf_counter() - start
+
+# ru_maxrss is in KiB on Linux
+print(json.dumps({{
+    "model": MODEL_ID,
+    "load_s": load_s,
+    "tokens_per_s": tokens / elapsed,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def probe(backend: str, prompts: int, token: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(backend=backend, prompts=prompts, token=token)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if out.returncode != 0:
+        return {"error": (out.stderr.strip().splitlines() or ["failed"])[-1]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--prompts", type=int, default=8)
+    args = parser.parse_args()
+
+    token = os.getenv("HUGGINGFACE_API_TOKEN")
+    if not token:
+        print("Set HUGGINGFACE_API_TOKEN to load the model", file=sys.stderr)
+        return 1
+
+    print(f"{'backend':<8} {'load s':>8} {'tokens/s':>10} {'peak RSS MB':>12}")
+    for backend in args.backends:
+        result = probe(backend, args.prompts, token)
+        if "error" in result:
+            print(f"{backend:<8} {result['error']}")
+            continue
+        print(f"{backend:<8} {result['load_s']:8.1f} {result['tokens_per_s']:10.1f} {result['peak_rss_mb']:12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Benchmark for batched local text generation.
+
+Runs the same explanation prompts through the transformers pipeline one at a
+time and then in padded batches, and reports explanations per second for each.
+Needs transformers and a Hugging Face token in HUGGINGFACE_API_TOKEN. Run from
+the `g_trends v1` directory:
+
+    python benchmarks/bench_textgen_batch.py --prompts 32 --batch-size 1 8 16
+"""
+
+import os
+import sys
+import time
+import argparse
+import datetime as dt
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gtrends.config import MODEL_ID  # noqa: E402
+from gtrends.explain import (  # noqa: E402
+    build_explanation_prompt,
+    generate_batch_with_pipeline,
+    generate_with_pipeline,
+    load_textgen_pipeline,
+)
+
+
+def make_prompts(n: int):
+    start = dt.date(2023, 1, 1)
+    return [
+        build_explanation_prompt(f"keyword {i}", start + dt.timedelta(weeks=i % 52), "spiked" if i % 2 else "dropped")
+        for i in range(n)
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+
+    textgen = load_textgen_pipeline(os.getenv("HUGGINGFACE_API_TOKEN"))
+    if textgen is None:
+        print("Pipeline unavailable: install transformers and set HUGGINGFACE_API_TOKEN", file=sys.stderr)
+        return 1
+
+    prompts = make_prompts(args.prompts)
+    generate_with_pipeline(textgen, prompts[0])  # warm up weights and kernels
+
+    start = time.perf_counter()
+    for prompt in prompts:
+        generate_with_pipeline(textgen, prompt)
+    sequential = time.perf_counter() - start
+    print(f"{MODEL_ID}: {len(prompts)} prompts")
+    print(f"  sequential     {sequential:8.2f} s  {len(prompts) / sequential:6.2f} explanations/s")
+
+    for batch_size in args.batch_size:
+        start = time.perf_counter()
+        generate_batch_with_pipeline(textgen, prompts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(
+            f"  batch_size={batch_size:<4d}{elapsed:8.2f} s  {len(prompts) / elapsed:6.2f} explanations/s"
+            f"  ({sequential / elapsed:4.1f}x)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""Core Google Trends logic shared by the Streamlit apps.
+
+Nothing in this package touches Streamlit, and heavy dependencies (pandas,
+pytrends, transformers, openai, pycountry) are only imported when a function
+that needs them is first called, so importing the package is cheap enough for
+worker processes, tests and the CLI. The most used functions are re-exported
+lazily from here.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "fetch_trends": "gtrends.fetch",
+    "fetch_trends_batch": "gtrends.fetch",
+    "compute_anomalies": "gtrends.anomalies",
+    "compute_anomalies_long": "gtrends.anomalies",
+    "build_explanation_prompt": "gtrends.explain",
+    "format_pct": "gtrends.formatting",
+    "format_timeframe_display": "gtrends.formatting",
+    "get_geo_display_name": "gtrends.formatting",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'gtrends' has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
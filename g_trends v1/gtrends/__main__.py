@@ -0,0 +1,5 @@
+import sys
+
+from gtrends.cli import main
+
+sys.exit(main())
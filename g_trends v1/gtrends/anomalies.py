@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional, Sequence, Union
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+DIRECTIONS = ["spiked", "dropped"]
+SERIES_COLUMNS = ("keyword", "geo")
+
+
+def classify_direction(pct: np.ndarray) -> pd.Categorical:
+    """Map percentage changes to a 'spiked'/'dropped' categorical (NaN for no change / missing)."""
+    import numpy as np
+    import pandas as pd
+
+    sign = np.sign(pct)
+    codes = np.select([sign > 0, sign < 0], [0, 1], default=-1)
+    return pd.Categorical.from_codes(codes, categories=DIRECTIONS)
+
+
+def compute_anomalies(
+    df: pd.DataFrame,
+    change_threshold: float = 0.30,
+    by: Optional[Union[str, List[str]]] = None,
+    copy: bool = True,
+) -> pd.DataFrame:
+    """Compute week-over-week percentage change anomalies.
+
+    An anomaly is when abs(pct_change) >= change_threshold (default 30%).
+    Adds columns: pct_change, is_anomaly, direction ('spiked'/'dropped' categorical, NaN otherwise)
+
+    With `by` (e.g. "keyword"), `df` is a long-format frame holding many series,
+    each already in date order, and changes are computed per series in a single
+    grouped pass. Pass copy=False to add the columns to `df` in place.
+    """
+    import numpy as np
+    import pandas as pd
+
+    out = df.copy() if copy else df
+    if out.empty:
+        out["pct_change"] = pd.Series(dtype=float)
+        out["is_anomaly"] = pd.Series(dtype=bool)
+        out["direction"] = pd.Categorical([], categories=DIRECTIONS)
+        return out
+
+    # Missing weeks carry the previous value forward; the fill is explicit, so no pandas default is relied on
+    interest = out["interest"].astype(float)
+    if by is None:
+        filled = interest.ffill()
+        previous = filled.shift(1)
+    else:
+        keys = [out[c] for c in ([by] if isinstance(by, str) else by)]
+        filled = interest.groupby(keys, sort=False, dropna=False).ffill()
+        previous = filled.groupby(keys, sort=False, dropna=False).shift(1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = filled.to_numpy() / previous.to_numpy() - 1.0
+
+    out["pct_change"] = pct
+    out["is_anomaly"] = np.abs(pct) >= change_threshold
+    out["direction"] = classify_direction(pct)
+
+    return out
+
+
+def compute_anomalies_long(
+    df: pd.DataFrame,
+    change_threshold: float = 0.30,
+    series_cols: Sequence[str] = SERIES_COLUMNS,
+) -> pd.DataFrame:
+    """Compute week-over-week anomalies for every series in a long-format frame.
+
+    `df` has one row per (series, date), e.g. columns [keyword, geo, date, interest];
+    each distinct combination of the `series_cols` present in the frame is one
+    series. Rows may come in any order: they are stably sorted by series and date,
+    scored in a single grouped pass and returned in the original order with the
+    original index.
+
+    Adds columns: pct_change, is_anomaly, direction (see `compute_anomalies`)
+    """
+    import numpy as np
+
+    missing = [c for c in ("date", "interest") if c not in df.columns]
+    if missing:
+        raise ValueError(f"long-format frame is missing columns: {missing}")
+    keys = [c for c in series_cols if c in df.columns]
+    if not keys:
+        raise ValueError(f"long-format frame needs at least one series column out of {list(series_cols)}")
+
+    order = df[keys + ["date"]].reset_index(drop=True).sort_values(keys + ["date"], kind="stable").index.to_numpy()
+    scored = compute_anomalies(df.take(order), change_threshold=change_threshold, by=keys, copy=False)
+
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    return scored.take(inverse)
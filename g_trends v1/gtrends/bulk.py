@@ -0,0 +1,257 @@
+"""Offline bulk explanation jobs.
+
+Prompts are written to an OpenAI Batch-format JSONL request file, submitted
+through a pluggable backend, polled until the backend finishes and loaded into
+the persistent explanation cache. Job state lives in a directory, so re-running
+the same job resumes polling an in-flight batch, and items that are already
+cached are never submitted again.
+"""
+
+import os
+import json
+import time
+import datetime as dt
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from gtrends.cache import ExplanationCache, explanation_key
+from gtrends.config import BULK_POLL_INTERVAL_SECONDS, OPENAI_MODEL
+from gtrends.explain import (
+    OPENAI_PARAMS,
+    build_explanation_prompt,
+    is_fallback_explanation,
+    lookup_openai_explanation,
+    remember_openai_explanation,
+)
+from gtrends.semantic import SemanticExplanationCache
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def build_request_line(custom_id: str, prompt: str, model: str = OPENAI_MODEL) -> Dict[str, Any]:
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": CHAT_COMPLETIONS_URL,
+        "body": {"model": model, "messages": [{"role": "user", "content": prompt}], **OPENAI_PARAMS},
+    }
+
+
+def parse_result_line(line: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """Return (custom_id, text) for one output line; text is None for failed requests."""
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        return line.get("custom_id", ""), None
+    try:
+        content = response["body"]["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return line.get("custom_id", ""), None
+    return line.get("custom_id", ""), content.strip() if content else None
+
+
+class BatchBackend(ABC):
+    """Interface for batch-submission backends."""
+
+    @abstractmethod
+    def submit(self, requests_path: str) -> str:
+        """Submit a JSONL request file and return the backend's batch id."""
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """Return the batch status ('completed', 'failed', 'expired', 'cancelled' are terminal)."""
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """Yield the output lines of a finished batch."""
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """Submits through the OpenAI Batch API (24h completion window, discounted pricing)."""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def submit(self, requests_path: str) -> str:
+        with open(requests_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id, endpoint=CHAT_COMPLETIONS_URL, completion_window="24h"
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if line.strip():
+                    yield json.loads(line)
+
+
+class LocalFileBackend(BatchBackend):
+    """File-based stand-in that completes each request with `complete(prompt)` on submit.
+
+    Output files use the Batch API format, so the rest of the job path is exercised
+    unchanged (useful for tests, or to run a job without the Batch API).
+    """
+
+    def __init__(self, root: str, complete: Callable[[str], str]):
+        self.root = root
+        self.complete = complete
+        os.makedirs(root, exist_ok=True)
+
+    def _output_path(self, batch_id: str) -> str:
+        return os.path.join(self.root, f"{batch_id}.output.jsonl")
+
+    def submit(self, requests_path: str) -> str:
+        batch_id = f"local-{time.time_ns()}"
+        output_path = self._output_path(batch_id)
+        with open(requests_path, encoding="utf-8") as src, open(output_path, "w", encoding="utf-8") as out:
+            for line in src:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                prompt = request["body"]["messages"][-1]["content"]
+                try:
+                    body = {"choices": [{"message": {"role": "assistant", "content": self.complete(prompt)}}]}
+                    response = {"status_code": 200, "body": body}
+                    result = {"custom_id": request["custom_id"], "response": response, "error": None}
+                except Exception as e:
+                    result = {"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}}
+                out.write(json.dumps(result) + "\n")
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        return "completed" if os.path.exists(self._output_path(batch_id)) else "failed"
+
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        with open(self._output_path(batch_id), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class BulkExplanationJob:
+    """A resumable bulk explanation job stored in `job_dir`.
+
+    `job_dir/state.json` records the batch currently in flight; `requests.jsonl`
+    holds the last submitted request file.
+    """
+
+    def __init__(
+        self,
+        job_dir: str,
+        backend: BatchBackend,
+        cache: ExplanationCache,
+        region: str = "the US",
+        semantic_cache: Optional[SemanticExplanationCache] = None,
+        poll_interval: float = BULK_POLL_INTERVAL_SECONDS,
+    ):
+        self.job_dir = job_dir
+        self.backend = backend
+        self.cache = cache
+        self.region = region
+        self.semantic_cache = semantic_cache
+        self.poll_interval = poll_interval
+        os.makedirs(job_dir, exist_ok=True)
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.job_dir, "state.json")
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def _prompts(self, jobs: List[Tuple[str, dt.date, str]]) -> List[str]:
+        return [build_explanation_prompt(kw, date, direction, region=self.region) for kw, date, direction in jobs]
+
+    def _lookup(self, job: Tuple[str, dt.date, str], prompt: str) -> Optional[str]:
+        keyword, date, direction = job
+        return lookup_openai_explanation(keyword, date, direction, self.region, prompt, self.cache, self.semantic_cache)
+
+    def cached_texts(self, jobs: List[Tuple[str, dt.date, str]]) -> List[Optional[str]]:
+        """The explanations already loaded for `jobs` (None where there is none yet)."""
+        return [self._lookup(job, prompt) for job, prompt in zip(jobs, self._prompts(jobs))]
+
+    def _wait(self, batch_id: str, deadline: Optional[float]) -> str:
+        while True:
+            status = self.backend.status(batch_id)
+            if status in TERMINAL_STATUSES:
+                return status
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"batch {batch_id} still '{status}'; re-run the job to resume polling")
+            time.sleep(self.poll_interval)
+
+    def _collect(self, batch_id: str, pending: Dict[str, Tuple[Tuple[str, dt.date, str], str]]) -> int:
+        loaded = 0
+        for line in self.backend.results(batch_id):
+            custom_id, text = parse_result_line(line)
+            if text is None or custom_id not in pending or is_fallback_explanation(text):
+                continue
+            (keyword, date, direction), prompt = pending[custom_id]
+            remember_openai_explanation(
+                keyword, date, direction, self.region, prompt, text, self.cache, self.semantic_cache
+            )
+            loaded += 1
+        return loaded
+
+    def run(
+        self, jobs: List[Tuple[str, dt.date, str]], max_rounds: int = 2, timeout: Optional[float] = None
+    ) -> List[Optional[str]]:
+        """Explain every (keyword, date, direction) job and return the texts (None where all rounds failed).
+
+        Each round submits only the jobs that are not cached yet; failed items are
+        retried in the next round, up to `max_rounds` submissions. Raises
+        TimeoutError if a batch is still running after `timeout` seconds (the job
+        can then be re-run to resume).
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        prompts = self._prompts(jobs)
+
+        def pending_items() -> Dict[str, Tuple[Tuple[str, dt.date, str], str]]:
+            items = {}
+            for job, prompt in zip(jobs, prompts):
+                if self._lookup(job, prompt) is None:
+                    items[explanation_key(prompt, OPENAI_MODEL, OPENAI_PARAMS)] = (job, prompt)
+            return items
+
+        state = self._load_state()
+        rounds = 0
+        while True:
+            pending = pending_items()
+            if not pending:
+                break
+            batch_id = state.get("batch_id")
+            if batch_id is None:
+                if rounds >= max_rounds:
+                    break
+                requests_path = os.path.join(self.job_dir, "requests.jsonl")
+                with open(requests_path, "w", encoding="utf-8") as f:
+                    for custom_id, (_, prompt) in pending.items():
+                        f.write(json.dumps(build_request_line(custom_id, prompt)) + "\n")
+                batch_id = self.backend.submit(requests_path)
+                state = {"batch_id": batch_id, "submitted": len(pending), "submitted_at": time.time()}
+                self._save_state(state)
+                rounds += 1
+
+            status = self._wait(batch_id, deadline)
+            loaded = self._collect(batch_id, pending)
+            state = {"last_batch_id": batch_id, "last_status": status, "last_loaded": loaded}
+            self._save_state(state)
+
+        return self.cached_texts(jobs)
@@ -0,0 +1,433 @@
+from __future__ import annotations
+
+import os
+import io
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import datetime as dt
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Mapping, Optional, Tuple
+
+from gtrends.config import (
+    CACHE_DIR,
+    EXPLANATION_CACHE_MAX_BYTES,
+    EXPLANATION_CACHE_MAX_ENTRIES,
+    EXPLANATION_TTL_SECONDS,
+    MAX_STALE_SECONDS,
+    TRENDS_CACHE_MAX_ENTRIES,
+    TRENDS_CACHE_TTL_SECONDS,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def ttl_for_timeframe(timeframe: str, default_ttl: int = TRENDS_CACHE_TTL_SECONDS) -> Optional[int]:
+    """Return the cache TTL in seconds for a pytrends timeframe, or None to keep forever.
+
+    Explicit 'YYYY-MM-DD YYYY-MM-DD' windows that ended before today never change,
+    so they are cached indefinitely. Relative windows ('today 12-m', 'now 7-d')
+    and ranges that are still open get the short default TTL.
+    """
+    try:
+        _, end_date = timeframe.split(" ")
+        end = dt.datetime.strptime(end_date, "%Y-%m-%d").date()
+    except ValueError:
+        return default_ttl
+    return None if end < dt.date.today() else default_ttl
+
+
+def frame_to_json(df: pd.DataFrame) -> str:
+    return df.to_json(orient="split", date_format="iso", index=False)
+
+
+def frame_from_json(payload: str) -> pd.DataFrame:
+    import pandas as pd
+
+    df = pd.read_json(io.StringIO(payload), orient="split", dtype=False, convert_dates=False)
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"]).dt.tz_localize(None)
+    return df
+
+
+class TrendsCache:
+    """SQLite-backed persistent cache of trends frames keyed by (keyword, timeframe, geo).
+
+    Entries carry an optional expiry time and a last-access timestamp; expired
+    entries are kept for `max_stale` more seconds so they can be served while a
+    refresh runs (see `lookup`), and once the cache holds more than `max_entries`
+    rows the least recently used ones are evicted. Hit/miss/stale counters are
+    kept per process and exposed via `stats()`.
+    """
+
+    def __init__(self, path: str, max_entries: int = TRENDS_CACHE_MAX_ENTRIES, max_stale: float = MAX_STALE_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS trends (
+                    keyword TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    geo TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (keyword, timeframe, geo)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS trends_last_access ON trends (last_access)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A short-lived connection per operation keeps the cache safe to use from
+        # Streamlit's script threads and from several processes at once.
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, hit: bool, stale: bool = False) -> None:
+        with self._lock:
+            if stale:
+                self._stale += 1
+            elif hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def lookup(
+        self, keyword: str, timeframe: str, geo: str, allow_stale: bool = False
+    ) -> Optional[Tuple[pd.DataFrame, bool]]:
+        """Return (frame, is_stale), or None on a miss.
+
+        Expired entries are misses unless `allow_stale` is set, in which case those
+        expired for at most `max_stale` seconds are returned with is_stale=True.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, expires_at FROM trends WHERE keyword = ? AND timeframe = ? AND geo = ?",
+                (keyword, timeframe, geo),
+            ).fetchone()
+            stale = row is not None and row[1] is not None and row[1] <= now
+            if row is None or (stale and (not allow_stale or row[1] + self.max_stale <= now)):
+                self._count(hit=False)
+                return None
+            conn.execute(
+                "UPDATE trends SET last_access = ? WHERE keyword = ? AND timeframe = ? AND geo = ?",
+                (now, keyword, timeframe, geo),
+            )
+        self._count(hit=True, stale=stale)
+        return frame_from_json(row[0]), stale
+
+    def get(self, keyword: str, timeframe: str, geo: str) -> Optional[pd.DataFrame]:
+        """Return the cached frame, or None on a miss or an expired entry."""
+        entry = self.lookup(keyword, timeframe, geo)
+        return entry[0] if entry is not None else None
+
+    def set(self, keyword: str, timeframe: str, geo: str, df: pd.DataFrame, ttl: Optional[int] = None) -> None:
+        """Store a frame. `ttl` is in seconds; None keeps the entry until evicted."""
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO trends
+                    (keyword, timeframe, geo, payload, created_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (keyword, timeframe, geo, frame_to_json(df), now, expires_at, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "DELETE FROM trends WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time() - self.max_stale,)
+        )
+        (count,) = conn.execute("SELECT COUNT(*) FROM trends").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                """
+                DELETE FROM trends WHERE rowid IN (
+                    SELECT rowid FROM trends ORDER BY last_access ASC LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM trends")
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            (entries,) = conn.execute("SELECT COUNT(*) FROM trends").fetchone()
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "stale": self._stale, "entries": entries}
+
+
+_cache: Optional[TrendsCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_trends_cache() -> TrendsCache:
+    """Return the process-wide trends cache stored under CACHE_DIR."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TrendsCache(os.path.join(CACHE_DIR, "trends.sqlite"))
+        return _cache
+
+
+class SeriesStore:
+    """SQLite-backed store of the last fetched series per (keyword, timeframe, geo).
+
+    Used by `fetch.refresh_trends` to extend rolling windows with a short tail
+    fetch. Rows keep the `is_partial` flags and the time of the last full-window
+    fetch, never expire, and are evicted least recently updated first beyond
+    `max_entries`.
+    """
+
+    def __init__(self, path: str, max_entries: int = TRENDS_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS series (
+                    keyword TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    geo TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    full_fetched_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (keyword, timeframe, geo)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, keyword: str, timeframe: str, geo: str) -> Optional[Tuple[pd.DataFrame, float]]:
+        """Return (frame with date/interest/is_partial, last full-fetch time), or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, full_fetched_at FROM series WHERE keyword = ? AND timeframe = ? AND geo = ?",
+                (keyword, timeframe, geo),
+            ).fetchone()
+        if row is None:
+            return None
+        df = frame_from_json(row[0])
+        df["is_partial"] = df["is_partial"].astype(bool)
+        return df, row[1]
+
+    def set(self, keyword: str, timeframe: str, geo: str, df: pd.DataFrame, full_fetched_at: float) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO series (keyword, timeframe, geo, payload, full_fetched_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (keyword, timeframe, geo, frame_to_json(df), full_fetched_at, time.time()),
+            )
+            conn.execute(
+                """
+                DELETE FROM series WHERE rowid IN (
+                    SELECT rowid FROM series ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM series")
+
+
+_series_store: Optional[SeriesStore] = None
+_series_store_lock = threading.Lock()
+
+
+def get_series_store() -> SeriesStore:
+    """Return the process-wide incremental-refresh series store under CACHE_DIR."""
+    global _series_store
+    with _series_store_lock:
+        if _series_store is None:
+            _series_store = SeriesStore(os.path.join(CACHE_DIR, "series.sqlite"))
+        return _series_store
+
+
+def explanation_key(prompt: str, model: str, params: Mapping[str, Any]) -> str:
+    """Stable hash of everything that determines a generated explanation."""
+    blob = json.dumps({"prompt": prompt, "model": model, "params": dict(params)}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    """SQLite-backed persistent store of generated explanations.
+
+    Entries are keyed by `explanation_key(prompt, model, params)`, so changing the
+    prompt template, the model or the sampling settings never returns a stale text.
+    Least recently used entries are evicted once the store holds more than
+    `max_entries` rows or more than `max_bytes` of explanation text. With a
+    `ttl` (seconds, 0 = never), older entries expire but can still be served for
+    `max_stale` more seconds while they are regenerated (see `lookup`).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = EXPLANATION_CACHE_MAX_ENTRIES,
+        max_bytes: int = EXPLANATION_CACHE_MAX_BYTES,
+        ttl: float = EXPLANATION_TTL_SECONDS,
+        max_stale: float = MAX_STALE_SECONDS,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS explanations (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS explanations_last_access ON explanations (last_access)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, hit: bool, stale: bool = False) -> None:
+        with self._lock:
+            if stale:
+                self._stale += 1
+            elif hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def lookup(
+        self, prompt: str, model: str, params: Mapping[str, Any], allow_stale: bool = False
+    ) -> Optional[Tuple[str, bool]]:
+        """Return (text, is_stale), or None on a miss.
+
+        Expired entries are misses unless `allow_stale` is set, in which case those
+        expired for at most `max_stale` seconds are returned with is_stale=True.
+        """
+        key = explanation_key(prompt, model, params)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT text, created_at FROM explanations WHERE key = ?", (key,)).fetchone()
+            age = now - row[1] if row is not None else 0.0
+            stale = bool(self.ttl) and age > self.ttl
+            if row is None or (stale and (not allow_stale or age > self.ttl + self.max_stale)):
+                self._count(hit=False)
+                return None
+            conn.execute("UPDATE explanations SET last_access = ? WHERE key = ?", (now, key))
+        self._count(hit=True, stale=stale)
+        return row[0], stale
+
+    def get(self, prompt: str, model: str, params: Mapping[str, Any]) -> Optional[str]:
+        """Return the stored explanation, or None on a miss or an expired entry."""
+        entry = self.lookup(prompt, model, params)
+        return entry[0] if entry is not None else None
+
+    def set(self, prompt: str, model: str, params: Mapping[str, Any], text: str) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO explanations (key, model, prompt, text, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (explanation_key(prompt, model, params), model, prompt, text, len(text.encode("utf-8")), now, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        if self.ttl:
+            conn.execute("DELETE FROM explanations WHERE created_at <= ?", (time.time() - self.ttl - self.max_stale,))
+        # Keep the most recently used rows that fit both the entry and the byte budget
+        conn.execute(
+            """
+            DELETE FROM explanations WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid,
+                           ROW_NUMBER() OVER (ORDER BY last_access DESC) AS position,
+                           SUM(size) OVER (ORDER BY last_access DESC ROWS UNBOUNDED PRECEDING) AS running_bytes
+                    FROM explanations
+                )
+                WHERE position > ? OR running_bytes > ?
+            )
+            """,
+            (self.max_entries, self.max_bytes),
+        )
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM explanations")
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM explanations").fetchone()
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "stale": self._stale, "entries": entries, "bytes": size}
+
+
+_explanation_cache: Optional[ExplanationCache] = None
+_explanation_cache_lock = threading.Lock()
+
+
+def get_explanation_cache() -> ExplanationCache:
+    """Return the process-wide explanation cache stored under CACHE_DIR."""
+    global _explanation_cache
+    with _explanation_cache_lock:
+        if _explanation_cache is None:
+            _explanation_cache = ExplanationCache(os.path.join(CACHE_DIR, "explanations.sqlite"))
+        return _explanation_cache
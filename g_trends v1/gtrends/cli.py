@@ -0,0 +1,383 @@
+"""Headless batch entry point: fetch trends, detect anomalies and write the results.
+
+Example (run from the `g_trends v1` directory):
+
+    python -m gtrends.cli keywords.txt -o anomalies.parquet --explain openai --workers 4
+
+Without -o nothing is written, which is useful to pre-warm the persistent
+explanation cache for a list of popular keywords.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from gtrends.anomalies import compute_anomalies_long
+from gtrends.bulk import BatchBackend, BulkExplanationJob, LocalFileBackend, OpenAIBatchBackend
+from gtrends.cache import ExplanationCache, get_explanation_cache
+from gtrends.config import (
+    GEO_CODE,
+    HF_BATCH_SIZE,
+    OPENAI_BATCH_EXPLANATIONS,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_PER_MINUTE,
+    TIMEFRAME,
+)
+from gtrends.explain import (
+    demo_explanation,
+    generate_with_openai,
+    hf_explanations_batch,
+    load_openai_client,
+    openai_explanation,
+    openai_explanations_batch,
+)
+from gtrends.fetch import fetch_trends, fetch_trends_batch, timeframe_bounds
+from gtrends.formatting import get_geo_display_name
+from gtrends.ratelimit import configure_rate_limiter
+from gtrends.scheduler import explain_concurrently
+from gtrends.semantic import get_semantic_cache
+from gtrends.stitch import fetch_daily_trends
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+OUTPUT_FORMATS = ("parquet", "csv", "jsonl")
+EXPLAINERS = ("none", "demo", "hf", "openai")
+
+
+def read_keywords(path: str) -> List[str]:
+    """Read one keyword per line, skipping blank lines and '#' comments. '-' reads stdin."""
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        lines = [line.strip() for line in handle]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    return list(dict.fromkeys(line for line in lines if line and not line.startswith("#")))
+
+
+def infer_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("jsonl", "ndjson"):
+        return "jsonl"
+    if ext in OUTPUT_FORMATS:
+        return ext
+    raise ValueError(f"Cannot infer output format from '{path}'; pass --format")
+
+
+def write_output(df: pd.DataFrame, path: str, fmt: str) -> None:
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "jsonl":
+        df.to_json(path, orient="records", lines=True, date_format="iso")
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
+
+
+def fetch_all(
+    keywords: List[str], timeframe: str, geo: str, workers: int, batch: bool, daily: bool = False
+) -> pd.DataFrame:
+    """Fetch every keyword into one long-format frame, logging (not raising) per-keyword failures.
+
+    With `batch`, a failing payload group is logged for all of its keywords and the
+    other groups are kept (see `fetch_trends_batch`). With `daily`, each keyword gets a daily series stitched from overlapping windows.
+
+    Returns a DataFrame with columns: [keyword, geo, date, interest]
+    """
+    import pandas as pd
+
+    if batch:
+        def report(group: List[str], error: Exception) -> None:
+            print(f"[gtrends] {', '.join(group)}: fetch failed: {error}", file=sys.stderr)
+
+        long_df = fetch_trends_batch(keywords, timeframe=timeframe, geo=geo, on_error=report)
+    else:
+        frames = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            fetch = fetch_daily_trends if daily else fetch_trends
+            futures = {pool.submit(fetch, kw, timeframe, geo): kw for kw in keywords}
+            for future in as_completed(futures):
+                keyword = futures[future]
+                try:
+                    df = future.result()
+                except Exception as e:
+                    print(f"[gtrends] {keyword}: fetch failed: {e}", file=sys.stderr)
+                    continue
+                if df.empty:
+                    print(f"[gtrends] {keyword}: no trend data", file=sys.stderr)
+                    continue
+                frames[keyword] = df.assign(keyword=keyword)
+
+        # Keep the input keyword order regardless of completion order
+        ordered = [frames[kw] for kw in keywords if kw in frames]
+        long_df = pd.concat(ordered, ignore_index=True) if ordered else pd.DataFrame(columns=["keyword", "date", "interest"])
+
+    return long_df.assign(geo=geo)[["keyword", "geo", "date", "interest"]]
+
+
+def detect_all(long_df: pd.DataFrame, threshold: float) -> pd.DataFrame:
+    scored = compute_anomalies_long(long_df, change_threshold=threshold)
+    return scored[["keyword", "geo", "date", "interest", "pct_change", "is_anomaly", "direction"]]
+
+
+def make_explainer(
+    kind: str, geo: str, cache: Optional[ExplanationCache] = None
+) -> Optional[Callable[[str, object, str], str]]:
+    """Return a (keyword, date, direction) -> explanation callable for a per-call backend.
+
+    'hf' is not listed here: it is batched, see `explain_all`.
+    """
+    if kind == "none":
+        return None
+    if kind == "demo":
+        return lambda keyword, date, direction: demo_explanation(date, direction)
+    if kind == "openai":
+        api_key = os.getenv("OPENAI_API_KEY")
+        loader = lru_cache(maxsize=None)(load_openai_client)
+        region = get_geo_display_name(geo)
+        return lambda keyword, date, direction: openai_explanation(
+            keyword, date, direction, api_key, region=region, client_loader=loader, cache=cache,
+            semantic_cache=get_semantic_cache() if cache is not None else None,
+        )
+    raise ValueError(f"Unknown explainer: {kind}")
+
+
+def explain_all(
+    scored: pd.DataFrame,
+    kind: str,
+    geo: str,
+    workers: int,
+    batch_size: int = HF_BATCH_SIZE,
+    cache: Optional[ExplanationCache] = None,
+    openai_batch: bool = OPENAI_BATCH_EXPLANATIONS,
+    bulk_job: Optional[str] = None,
+    bulk_backend: str = "openai",
+    bulk_timeout: Optional[float] = None,
+) -> pd.DataFrame:
+    """Add an `explanation` column for every anomalous row (None elsewhere).
+
+    The local 'hf' backend runs all prompts through the pipeline in padded
+    batches; with `openai_batch`, OpenAI gets one request per keyword (keywords
+    run on `workers` threads); otherwise every anomaly is one call on `workers`
+    threads. Explanations found in `cache` are reused and new ones are stored there.
+    With `bulk_job` (a job directory), OpenAI explanations go through a resumable
+    offline batch job instead (see `gtrends.bulk`).
+    """
+    import pandas as pd
+
+    out = scored.assign(explanation=None)
+    anomalies = out[out["is_anomaly"]]
+    jobs = [
+        (row.keyword, pd.to_datetime(row.date).date(), row.direction or "changed")
+        for row in anomalies.itertuples(index=False)
+    ]
+    if kind == "hf":
+        token = os.getenv("HUGGINGFACE_API_TOKEN")
+        texts = hf_explanations_batch(jobs, token, batch_size=batch_size, cache=cache)
+        for i, text in enumerate(texts):
+            out.at[anomalies.index[i], "explanation"] = text
+        return out
+
+    if kind == "openai" and bulk_job:
+        texts = explain_bulk(jobs, geo, bulk_job, bulk_backend, cache, bulk_timeout)
+        for i, text in enumerate(texts):
+            out.at[anomalies.index[i], "explanation"] = text
+        return out
+
+    if kind == "openai" and openai_batch:
+        api_key = os.getenv("OPENAI_API_KEY")
+        loader = lru_cache(maxsize=None)(load_openai_client)
+        region = get_geo_display_name(geo)
+        semantic_cache = get_semantic_cache() if cache is not None else None
+        by_keyword = {}
+        for i, (keyword, date, direction) in enumerate(jobs):
+            by_keyword.setdefault(keyword, []).append((i, date, direction))
+
+        def explain_keyword(keyword: str, items: list) -> List[str]:
+            return openai_explanations_batch(
+                keyword, [(date, direction) for _, date, direction in items], api_key,
+                region=region, client_loader=loader, cache=cache, semantic_cache=semantic_cache,
+            )
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(explain_keyword, kw, items): items for kw, items in by_keyword.items()}
+            for future in as_completed(futures):
+                for (i, _, _), text in zip(futures[future], future.result()):
+                    out.at[anomalies.index[i], "explanation"] = text
+        return out
+
+    explainer = make_explainer(kind, geo, cache)
+    for i, text in explain_concurrently(jobs, explainer, max_concurrency=workers):
+        out.at[anomalies.index[i], "explanation"] = text
+    return out
+
+
+def make_bulk_backend(name: str, job_dir: str) -> BatchBackend:
+    client = load_openai_client(os.getenv("OPENAI_API_KEY"))
+    if client is None:
+        raise RuntimeError("OpenAI client unavailable: install openai and set OPENAI_API_KEY")
+    if name == "openai":
+        return OpenAIBatchBackend(client)
+    if name == "local":
+        return LocalFileBackend(os.path.join(job_dir, "local"), lambda prompt: generate_with_openai(client, prompt))
+    raise ValueError(f"Unknown bulk backend: {name}")
+
+
+def explain_bulk(
+    jobs: list, geo: str, job_dir: str, backend: str, cache: ExplanationCache, timeout: Optional[float]
+) -> List[Optional[str]]:
+    """Explain every job with a resumable offline batch job; None where generation failed or is still running."""
+    job = BulkExplanationJob(
+        job_dir,
+        make_bulk_backend(backend, job_dir),
+        cache,
+        region=get_geo_display_name(geo),
+        semantic_cache=get_semantic_cache(),
+    )
+    try:
+        texts = job.run(jobs, timeout=timeout)
+    except TimeoutError as e:
+        # Keep what earlier runs already loaded; the rows are still written without the rest
+        print(f"[gtrends] bulk job: {e}", file=sys.stderr)
+        return job.cached_texts(jobs)
+    failed = sum(text is None for text in texts)
+    if failed:
+        print(f"[gtrends] bulk job: {failed}/{len(texts)} explanations failed; re-run to retry them", file=sys.stderr)
+    return texts
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m gtrends.cli",
+        description="Fetch Google Trends for a list of keywords, detect week-over-week anomalies and write them out.",
+    )
+    parser.add_argument("keywords_file", help="File with one keyword per line ('-' for stdin)")
+    parser.add_argument("-o", "--output", help="Output path (.parquet, .csv or .jsonl); omit to only warm the caches")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="Output format (default: from the file extension)")
+    parser.add_argument("--timeframe", default=TIMEFRAME, help=f"pytrends timeframe (default: '{TIMEFRAME}')")
+    parser.add_argument("--geo", default=GEO_CODE, help=f"Geo code (default: {GEO_CODE})")
+    parser.add_argument("--threshold", type=float, default=0.30, help="Anomaly threshold as a fraction (default: 0.30)")
+    parser.add_argument("--explain", choices=EXPLAINERS, default="none", help="Explanation backend (default: none)")
+    parser.add_argument(
+        "--hf-batch-size",
+        type=int,
+        default=HF_BATCH_SIZE,
+        help=f"Prompts per padded batch for --explain hf (default: {HF_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--openai-batch",
+        action=argparse.BooleanOptionalAction,
+        default=OPENAI_BATCH_EXPLANATIONS,
+        help="With --explain openai, send one JSON request per keyword instead of one per anomaly",
+    )
+    parser.add_argument(
+        "--bulk-job",
+        metavar="DIR",
+        help="With --explain openai, run explanations as a resumable offline batch job stored in DIR",
+    )
+    parser.add_argument(
+        "--bulk-backend",
+        choices=("openai", "local"),
+        default="openai",
+        help="'openai' uses the Batch API; 'local' completes the request file with regular calls (default: openai)",
+    )
+    parser.add_argument(
+        "--bulk-timeout",
+        type=float,
+        help="Seconds to wait for a bulk batch before giving up (re-run to resume; default: wait)",
+    )
+    parser.add_argument(
+        "--no-explanation-cache",
+        action="store_true",
+        help="Neither read nor write the persistent (exact and similar-keyword) explanation caches",
+    )
+    parser.add_argument("--anomalies-only", action="store_true", help="Only write anomalous weeks")
+    parser.add_argument("--batch", action="store_true", help="Fetch in 5-keyword payloads rescaled onto a shared anchor")
+    parser.add_argument(
+        "--daily",
+        action="store_true",
+        help="Daily series stitched from overlapping windows (anomalies become day-over-day)",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent fetch / explanation workers (default: 4)")
+    parser.add_argument("--rate-per-minute", type=float, default=RATE_LIMIT_PER_MINUTE, help="Google Trends request budget")
+    parser.add_argument("--burst", type=float, default=RATE_LIMIT_BURST, help="Token-bucket burst size")
+    parser.add_argument(
+        "--rate-limiter",
+        choices=("process", "sqlite"),
+        default=RATE_LIMIT_BACKEND,
+        help="'sqlite' shares the request budget with other processes on this host",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.bulk_job and (args.explain != "openai" or args.no_explanation_cache):
+        parser.error("--bulk-job needs --explain openai and the explanation cache")
+    if args.daily and (args.batch or timeframe_bounds(args.timeframe) is None):
+        parser.error("--daily needs a day-resolution --timeframe and cannot be combined with --batch")
+
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+
+    fmt = infer_format(args.output, args.format) if args.output else None
+    keywords = read_keywords(args.keywords_file)
+    if not keywords:
+        print("[gtrends] no keywords to process", file=sys.stderr)
+        return 1
+
+    configure_rate_limiter(args.rate_per_minute, args.burst, args.rate_limiter)
+
+    long_df = fetch_all(keywords, args.timeframe, args.geo, args.workers, args.batch, args.daily)
+    scored = detect_all(long_df, args.threshold)
+
+    if args.explain != "none":
+        cache = None if args.no_explanation_cache else get_explanation_cache()
+        scored = explain_all(
+            scored,
+            args.explain,
+            args.geo,
+            args.workers,
+            args.hf_batch_size,
+            cache,
+            openai_batch=args.openai_batch,
+            bulk_job=args.bulk_job,
+            bulk_backend=args.bulk_backend,
+            bulk_timeout=args.bulk_timeout,
+        )
+
+    if args.anomalies_only:
+        scored = scored[scored["is_anomaly"]]
+
+    if args.output:
+        write_output(scored.reset_index(drop=True), args.output, fmt)
+
+    fetched = long_df["keyword"].nunique()
+    print(
+        f"[gtrends] {fetched}/{len(keywords)} keywords fetched, "
+        f"{int(scored['is_anomaly'].sum())} anomalies "
+        + (f"written to {args.output}" if args.output else "found"),
+        file=sys.stderr,
+    )
+    # A bulk job that timed out or left failures must be re-run, so report it like a failed fetch
+    unexplained = args.bulk_job and scored.loc[scored["is_anomaly"], "explanation"].isna().any()
+    return 0 if fetched == len(keywords) and not unexplained else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Shared configuration / constants for the trends package."""
+
+import os
+
+# Google Trends configuration
+TIMEFRAME = "2023-01-01 2023-12-31"
+GEO_CODE = "US"
+TRENDS_HL = "en-US"
+TRENDS_TZ = 360
+
+# pytrends accepts at most 5 keywords per payload
+MAX_KEYWORDS_PER_PAYLOAD = 5
+
+# Persistent on-disk cache (survives Streamlit restarts and redeploys)
+CACHE_DIR = os.getenv(
+    "GTRENDS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"),
+)
+# Open-ended windows ("today 12-m", ranges ending today or later) expire after this many seconds;
+# fully historical windows never expire.
+TRENDS_CACHE_TTL_SECONDS = int(os.getenv("GTRENDS_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+TRENDS_CACHE_MAX_ENTRIES = int(os.getenv("GTRENDS_CACHE_MAX_ENTRIES", "5000"))
+# Stale-while-revalidate: expired entries are still served (and refreshed in the background) for this long
+MAX_STALE_SECONDS = float(os.getenv("GTRENDS_MAX_STALE_SECONDS", str(24 * 60 * 60)))
+REFRESH_WORKERS = int(os.getenv("GTRENDS_REFRESH_WORKERS", "2"))
+
+# Rolling windows are extended with a short overlapping tail fetch instead of a full refetch
+INCREMENTAL_REFRESH = os.getenv("GTRENDS_INCREMENTAL_REFRESH", "1") != "0"
+INCREMENTAL_OVERLAP_POINTS = int(os.getenv("GTRENDS_INCREMENTAL_OVERLAP", "4"))
+# Refetch the full window this often so tail rescaling errors cannot accumulate
+INCREMENTAL_FULL_REFRESH_DAYS = float(os.getenv("GTRENDS_FULL_REFRESH_DAYS", "30"))
+
+# Daily history: longest window Google still returns daily, and the overlap used to chain windows
+STITCH_WINDOW_DAYS = int(os.getenv("GTRENDS_STITCH_WINDOW_DAYS", "269"))
+STITCH_OVERLAP_DAYS = int(os.getenv("GTRENDS_STITCH_OVERLAP_DAYS", "30"))
+
+# Watchlist prefetching: app views kept for prioritising, the window they are counted over,
+# and the Google Trends HTTP requests (retries and cookie bootstraps included) one prefetch run may spend
+VIEW_RETENTION_DAYS = int(os.getenv("GTRENDS_VIEW_RETENTION_DAYS", "90"))
+VIEW_WINDOW_DAYS = int(os.getenv("GTRENDS_VIEW_WINDOW_DAYS", "14"))
+PREFETCH_REQUEST_BUDGET = int(os.getenv("GTRENDS_PREFETCH_BUDGET", "200"))
+# Generated explanations are kept until evicted (least recently used first)
+EXPLANATION_CACHE_MAX_ENTRIES = int(os.getenv("GTRENDS_EXPLANATION_CACHE_MAX_ENTRIES", "50000"))
+EXPLANATION_CACHE_MAX_BYTES = int(os.getenv("GTRENDS_EXPLANATION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Regenerate stored explanations older than this (0 = keep them until evicted)
+EXPLANATION_TTL_SECONDS = float(os.getenv("GTRENDS_EXPLANATION_TTL_SECONDS", "0"))
+# Reuse an OpenAI explanation of a similar keyword that moved the same way in the same week
+SEMANTIC_CACHE_ENABLED = os.getenv("GTRENDS_SEMANTIC_CACHE", "1") != "0"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("GTRENDS_SEMANTIC_THRESHOLD", "0.8"))
+SEMANTIC_DATE_WINDOW_DAYS = int(os.getenv("GTRENDS_SEMANTIC_DATE_WINDOW_DAYS", "0"))
+
+# Google Trends request budget shared by every session (token bucket).
+# "process" limits a single server process; "sqlite" shares the budget across processes on a host.
+RATE_LIMIT_PER_MINUTE = float(os.getenv("GTRENDS_RATE_PER_MINUTE", "20"))
+RATE_LIMIT_BURST = float(os.getenv("GTRENDS_RATE_BURST", "5"))
+RATE_LIMIT_BACKEND = os.getenv("GTRENDS_RATE_LIMITER", "process")
+
+# Retry / circuit breaker for Google Trends throttling (429s)
+RETRY_MAX_ATTEMPTS = int(os.getenv("GTRENDS_RETRY_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("GTRENDS_RETRY_BASE_DELAY", "2"))
+RETRY_MAX_DELAY = float(os.getenv("GTRENDS_RETRY_MAX_DELAY", "60"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("GTRENDS_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("GTRENDS_BREAKER_COOLDOWN", "120"))
+
+# Pooled TrendReq clients: reuse warmed cookies and HTTP connections between fetches
+SESSION_POOL_MAX_IDLE = int(os.getenv("GTRENDS_SESSION_POOL_SIZE", "4"))
+SESSION_COOKIE_TTL_SECONDS = float(os.getenv("GTRENDS_COOKIE_TTL_SECONDS", "1800"))
+
+# Explanation models
+# MODEL_ID = "mistralai/Mistral-7B-Instruct-v0.2" # Large model, 7B params
+MODEL_ID = "distilgpt2"  # Small model, 124M params
+# Build and warm up the local model in the background as soon as the app starts
+PRELOAD_MODEL = os.getenv("GTRENDS_PRELOAD_MODEL", "1") != "0"
+# CPU backend for the local model: "torch", "int8" (dynamic quantization) or "onnx" (ONNX Runtime via optimum)
+INFERENCE_BACKEND = os.getenv("GTRENDS_INFERENCE_BACKEND", "torch")
+OPENAI_MODEL = "gpt-4o-mini"
+MAX_TOKENS = 100
+# Render explanations token by token as they are generated
+STREAM_EXPLANATIONS = os.getenv("GTRENDS_STREAM_EXPLANATIONS", "1") != "0"
+# Explain all anomalies of a keyword with one JSON chat completion instead of one call each
+OPENAI_BATCH_EXPLANATIONS = os.getenv("GTRENDS_OPENAI_BATCH_EXPLAIN", "1") != "0"
+# Anomalies per JSON chat completion; keeps the reply well inside the model's completion limit
+OPENAI_BATCH_MAX_ANOMALIES = int(os.getenv("GTRENDS_OPENAI_BATCH_SIZE", "15"))
+
+# How often offline bulk explanation jobs poll their batch backend
+BULK_POLL_INTERVAL_SECONDS = float(os.getenv("GTRENDS_BULK_POLL_SECONDS", "30"))
+
+# Maximum explanations generated at the same time for one page / job
+EXPLAIN_MAX_CONCURRENCY = int(os.getenv("GTRENDS_EXPLAIN_CONCURRENCY", "4"))
+
+# Prompts per padded batch for the local text-generation pipeline
+HF_BATCH_SIZE = int(os.getenv("GTRENDS_HF_BATCH_SIZE", "8"))
+
+# How long the shared inference queue waits to fill a batch across sessions
+INFERENCE_MAX_WAIT_MS = float(os.getenv("GTRENDS_INFERENCE_MAX_WAIT_MS", "25"))
+
+# Local inference sidecar shared by all app processes ("host:port" or a Unix socket path; empty = load in-process)
+SIDECAR_ADDRESS = os.getenv("GTRENDS_SIDECAR_ADDRESS", "")
+# Shared HMAC key for sidecar connections; empty = a random per-host key in CACHE_DIR/sidecar.key
+SIDECAR_AUTHKEY = os.getenv("GTRENDS_SIDECAR_AUTHKEY", "").encode("utf-8")
+# Listening on a non-loopback TCP address must be allowed explicitly
+SIDECAR_ALLOW_REMOTE = os.getenv("GTRENDS_SIDECAR_ALLOW_REMOTE", "0") == "1"
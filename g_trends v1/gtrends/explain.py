@@ -0,0 +1,779 @@
+import os
+import re
+import sys
+import json
+import shutil
+import tempfile
+import datetime as dt
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from gtrends.cache import ExplanationCache, explanation_key
+from gtrends.config import (
+    CACHE_DIR,
+    HF_BATCH_SIZE,
+    INFERENCE_BACKEND,
+    MAX_TOKENS,
+    MODEL_ID,
+    OPENAI_BATCH_MAX_ANOMALIES,
+    OPENAI_MODEL,
+)
+from gtrends.refresh import get_background_refresher
+from gtrends.semantic import SemanticExplanationCache
+from gtrends.singleflight import get_single_flight
+
+HF_TOKEN_PLACEHOLDER = "YOUR_HF_API_TOKEN_HERE"
+OPENAI_KEY_PLACEHOLDER = "YOUR_OPENAI_API_KEY_HERE"
+OPENAI_UNAVAILABLE = "(OpenAI) Client unavailable. Ensure openai library is installed and API key is valid."
+PIPELINE_UNAVAILABLE = "(Pipeline) Text-generation pipeline unavailable. Ensure transformers is installed and model is accessible."
+# File optimum writes for an exported decoder; its presence marks a complete export
+ONNX_MODEL_FILE = "model.onnx"
+
+
+def build_explanation_prompt(keyword: str, date: dt.date, direction: str, region: str = "the US") -> str:
+    return (
+        f"Explain why search interest in '{keyword}' might have {direction} on "
+        f"{date.strftime('%Y-%m-%d')} in {region}. Give a concise 2-3 sentence hypothesis."
+    )
+
+
+def build_batch_explanation_prompt(
+    keyword: str, anomalies: List[Tuple[dt.date, str]], region: str = "the US"
+) -> str:
+    """One prompt covering every (date, direction) anomaly of a keyword, answered as a JSON object."""
+    weeks = "\n".join(f"- {date:%Y-%m-%d}: {direction}" for date, direction in anomalies)
+    return (
+        f"Search interest in '{keyword}' in {region} changed sharply in these weeks:\n{weeks}\n"
+        "For each date, give a concise 2-3 sentence hypothesis explaining the change. "
+        'Reply with only a JSON object mapping each date (YYYY-MM-DD) to its explanation, e.g. {"2023-01-01": "..."}.'
+    )
+
+
+# One complete "YYYY-MM-DD": "..." pair of a batched reply
+BATCH_ENTRY_RE = re.compile(r'"(\d{4}-\d{2}-\d{2})"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+def parse_batch_explanations(content: str) -> Dict[str, str]:
+    """Parse the date -> explanation JSON object of a batched reply.
+
+    A reply that is not valid JSON (typically one cut off at the token limit)
+    still yields its complete date/explanation pairs; anything else gives {}.
+    """
+    text = content.strip()
+    if text.startswith("```"):
+        # Tolerate a fenced ```json block
+        text = text.strip("`").strip()
+        if text.lower().startswith("json"):
+            text = text[4:]
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = {date: json.loads(value) for date, value in BATCH_ENTRY_RE.findall(text)}
+    if not isinstance(data, dict):
+        return {}
+    return {str(date): value.strip() for date, value in data.items() if isinstance(value, str) and value.strip()}
+
+
+def is_missing_key(key: Optional[str], placeholder: str) -> bool:
+    return not key or key.strip() == placeholder
+
+
+def demo_explanation(date: dt.date, direction: str) -> str:
+    return f"(Demo) Possible reason it {direction}: seasonal events, news cycles, or viral content around {date:%Y-%m-%d}."
+
+
+# Demo texts and error messages start with one of these and are never cached
+FALLBACK_PREFIXES = ("(Demo)", "(Pipeline)", "(OpenAI)", "(Scheduler)", "No response generated.")
+
+
+def is_fallback_explanation(text: str) -> bool:
+    return text.startswith(FALLBACK_PREFIXES)
+
+
+def remember_explanation(
+    cache: Optional[ExplanationCache], prompt: str, model: str, params: Mapping[str, Any], text: str
+) -> str:
+    """Store a generated explanation in `cache` (if any) unless it is a fallback; returns `text`."""
+    if cache is not None and not is_fallback_explanation(text):
+        cache.set(prompt, model, params, text)
+    return text
+
+
+def lookup_explanation(
+    cache: Optional[ExplanationCache],
+    prompt: str,
+    model: str,
+    params: Mapping[str, Any],
+    regenerate: Callable[[], object],
+) -> Optional[str]:
+    """Return the stored explanation, or None on a miss.
+
+    An expired entry still within the cache's maximum staleness is returned as is
+    while `regenerate()` replaces it on a background thread.
+    """
+    entry = cache.lookup(prompt, model, params, allow_stale=True) if cache is not None else None
+    if entry is None:
+        return None
+    text, stale = entry
+    if stale:
+        get_background_refresher().submit(("explanation", explanation_key(prompt, model, params)), regenerate)
+    return text
+
+
+def load_textgen_pipeline(token: Optional[str], model_id: str = MODEL_ID, backend: str = INFERENCE_BACKEND):
+    """Create a local transformers text-generation pipeline for the configured model.
+
+    `backend` selects how the model runs on CPU:
+    - "torch": the plain PyTorch model (default)
+    - "int8": PyTorch with int8 dynamic quantization of the Linear layers
+    - "onnx": an ONNX Runtime export via optimum (exported on first load)
+
+    Returns None if the pipeline cannot be created (e.g., missing dependency or token).
+    """
+    if is_missing_key(token, HF_TOKEN_PLACEHOLDER):
+        return None
+    try:
+        if backend == "int8":
+            return _quantized_pipeline(token, model_id)
+        if backend == "onnx":
+            return _onnx_pipeline(token, model_id)
+
+        from transformers import pipeline  # type: ignore
+
+        # Pass token for private/gated models if needed.
+        # Some models require trust_remote_code; keep off by default for safety.
+        pipe = pipeline(
+            task="text-generation",
+            model=model_id,
+            token=token,  # Needed if model is gated/private
+            trust_remote_code=True,
+            device="cpu"  # Force CPU usage
+            # device_map="auto"  # Uncomment if GPU/accelerate available
+        )
+        return pipe
+    except Exception as e:
+        print(f"[gtrends] text-generation pipeline ({backend}) unavailable: {e}", file=sys.stderr)
+        return None
+
+
+def _quantized_pipeline(token: Optional[str], model_id: str):
+    import torch  # type: ignore
+    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline  # type: ignore
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id, token=token)
+    model = AutoModelForCausalLM.from_pretrained(model_id, token=token, trust_remote_code=True)
+    model.eval()
+    # Weights of nn.Linear layers are stored as int8 and activations quantized on the fly.
+    # GPT-2 style models use Conv1D rather than Linear, so they gain little; Llama/Mistral style models gain most.
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline(task="text-generation", model=model, tokenizer=tokenizer, device="cpu")
+
+
+def _onnx_pipeline(token: Optional[str], model_id: str):
+    from optimum.onnxruntime import ORTModelForCausalLM  # type: ignore
+    from transformers import AutoTokenizer, pipeline  # type: ignore
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id, token=token)
+    export_dir = os.path.join(CACHE_DIR, "onnx", model_id.replace("/", "--"))
+    if os.path.isfile(os.path.join(export_dir, ONNX_MODEL_FILE)):
+        try:
+            return pipeline(task="text-generation", model=ORTModelForCausalLM.from_pretrained(export_dir), tokenizer=tokenizer)
+        except Exception as e:
+            print(f"[gtrends] discarding unreadable ONNX export {export_dir}: {e}", file=sys.stderr)
+
+    # Export once and keep it next to the other caches so restarts skip the conversion. The export is
+    # written to a temporary directory and moved into place, so a crash never leaves a partial one behind
+    model = ORTModelForCausalLM.from_pretrained(model_id, token=token, export=True)
+    parent = os.path.dirname(export_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".export-", dir=parent)
+    try:
+        model.save_pretrained(tmp_dir)
+        if not os.path.isfile(os.path.join(tmp_dir, ONNX_MODEL_FILE)):
+            raise RuntimeError(f"ONNX export of {model_id} did not produce {ONNX_MODEL_FILE}")
+        shutil.rmtree(export_dir, ignore_errors=True)  # an incomplete or unreadable earlier export
+        try:
+            os.replace(tmp_dir, export_dir)
+        except OSError:
+            pass  # another process moved its export into place first; this one is still usable in memory
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return pipeline(task="text-generation", model=model, tokenizer=tokenizer)
+
+
+# Sampling settings for the local text-generation pipeline
+GENERATION_KWARGS = {
+    "max_new_tokens": 100,
+    "temperature": 0.7,
+    "do_sample": True,
+    "return_full_text": False,
+}
+
+
+def _generated_text(outputs: Any) -> str:
+    # transformers returns list of dicts with 'generated_text'
+    if isinstance(outputs, list) and outputs:
+        text = outputs[0].get("generated_text")
+        if isinstance(text, str):
+            return text.strip()
+    # Some pipelines may return a string directly
+    if isinstance(outputs, str):
+        return outputs.strip()
+    return str(outputs)
+
+
+def generate_with_pipeline(textgen: Any, prompt: str) -> str:
+    """Run one prompt through a text-generation pipeline and return the cleaned text."""
+    try:
+        return _generated_text(textgen(prompt, **GENERATION_KWARGS))
+    except Exception as e:
+        return f"(Pipeline) Generation failed: {e}"
+
+
+def prepare_pipeline_for_batching(textgen: Any) -> None:
+    """Give decoder-only models a pad token and left padding so prompts can share a batch."""
+    tokenizer = getattr(textgen, "tokenizer", None)
+    if tokenizer is None:
+        return
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+    generation_config = getattr(textgen.model, "generation_config", None)
+    if generation_config is not None and generation_config.pad_token_id is None:
+        generation_config.pad_token_id = tokenizer.pad_token_id
+
+
+def warm_up_pipeline(textgen: Any) -> None:
+    """Run a short throwaway batched generation so weight paging and first-run costs are paid up front."""
+    prepare_pipeline_for_batching(textgen)
+    prompt = build_explanation_prompt("warm-up", dt.date(2023, 1, 1), "spiked")
+    textgen([prompt, prompt], batch_size=2, max_new_tokens=8, do_sample=False, return_full_text=False)
+
+
+def generate_batch_with_pipeline(textgen: Any, prompts: List[str], batch_size: int = HF_BATCH_SIZE) -> List[str]:
+    """Run many prompts through the pipeline in padded batches of `batch_size`.
+
+    Returns one cleaned text per prompt, in order. If the batched call fails, the
+    error message is returned for every prompt.
+    """
+    if not prompts:
+        return []
+    try:
+        prepare_pipeline_for_batching(textgen)
+        outputs = textgen(prompts, batch_size=batch_size, **GENERATION_KWARGS)
+        return [_generated_text(out) for out in outputs]
+    except Exception as e:
+        return [f"(Pipeline) Generation failed: {e}"] * len(prompts)
+
+
+def stream_with_pipeline(textgen: Any, prompt: str) -> Iterator[str]:
+    """Yield the generated text piece by piece as the pipeline produces tokens.
+
+    Generation runs on a background thread feeding a transformers TextIteratorStreamer.
+    """
+    import threading
+
+    try:
+        from transformers import TextIteratorStreamer  # type: ignore
+
+        streamer = TextIteratorStreamer(textgen.tokenizer, skip_prompt=True, skip_special_tokens=True)
+    except Exception as e:
+        yield f"(Pipeline) Generation failed: {e}"
+        return
+
+    errors: List[BaseException] = []
+
+    def run() -> None:
+        try:
+            textgen(prompt, streamer=streamer, **GENERATION_KWARGS)
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    for chunk in streamer:
+        if chunk:
+            yield chunk
+    worker.join()
+    if errors:
+        yield f"(Pipeline) Generation failed: {errors[0]}"
+
+
+def stream_and_remember(chunks: Iterator[str], remember: Callable[[str], Any]) -> Iterator[str]:
+    """Pass `chunks` through and call `remember(full_text)` once the stream is exhausted.
+
+    Nothing is remembered if the stream reported an error part-way through.
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    if not any(is_fallback_explanation(part) for part in parts):
+        remember("".join(parts).strip())
+
+
+def hf_explanation(
+    keyword: str,
+    date: dt.date,
+    direction: str,
+    token: Optional[str],
+    pipeline_loader: Callable[[Optional[str]], Any] = load_textgen_pipeline,
+    cache: Optional[ExplanationCache] = None,
+) -> str:
+    """Get an explanation from the local transformers pipeline. Falls back to a dummy string if unavailable.
+
+    `pipeline_loader` lets callers supply a cached pipeline factory
+    (e.g. the Streamlit app's st.cache_resource wrapper). With `cache`, stored
+    explanations are returned without loading the model (expired ones are
+    regenerated in the background) and new ones are stored. Concurrent calls for
+    the same prompt share one generation.
+    """
+    prompt = build_explanation_prompt(keyword, date, direction)
+
+    # Fallback if token is not provided or left as placeholder
+    if is_missing_key(token, HF_TOKEN_PLACEHOLDER):
+        return demo_explanation(date, direction)
+
+    generate = partial(_generate_hf_explanation, prompt, token, pipeline_loader, cache)
+    cached = lookup_explanation(cache, prompt, MODEL_ID, GENERATION_KWARGS, regenerate=generate)
+    if cached is not None:
+        return cached
+
+    # Use local transformers pipeline
+    return generate()
+
+
+def _generate_hf_explanation(
+    prompt: str,
+    token: Optional[str],
+    pipeline_loader: Callable[[Optional[str]], Any],
+    cache: Optional[ExplanationCache],
+) -> str:
+    def generate() -> str:
+        textgen = pipeline_loader(token)
+        if textgen is None:
+            return PIPELINE_UNAVAILABLE
+        return remember_explanation(cache, prompt, MODEL_ID, GENERATION_KWARGS, generate_with_pipeline(textgen, prompt))
+
+    return get_single_flight().do(("explanation", explanation_key(prompt, MODEL_ID, GENERATION_KWARGS)), generate)
+
+
+def hf_explanations_batch(
+    jobs: List[Tuple[str, dt.date, str]],
+    token: Optional[str],
+    pipeline_loader: Callable[[Optional[str]], Any] = load_textgen_pipeline,
+    batch_size: int = HF_BATCH_SIZE,
+    cache: Optional[ExplanationCache] = None,
+) -> List[str]:
+    """Batched counterpart of `hf_explanation` for a list of (keyword, date, direction) jobs.
+
+    With `cache`, only the prompts that are not stored yet go through the model.
+    """
+    if is_missing_key(token, HF_TOKEN_PLACEHOLDER):
+        return [demo_explanation(date, direction) for _, date, direction in jobs]
+
+    prompts = [build_explanation_prompt(keyword, date, direction) for keyword, date, direction in jobs]
+    texts: List[Optional[str]] = [
+        cache.get(prompt, MODEL_ID, GENERATION_KWARGS) if cache is not None else None for prompt in prompts
+    ]
+    pending = [i for i, text in enumerate(texts) if text is None]
+    if not pending:
+        return texts
+
+    textgen = pipeline_loader(token)
+    if textgen is None:
+        generated = [PIPELINE_UNAVAILABLE] * len(pending)
+    else:
+        generated = generate_batch_with_pipeline(textgen, [prompts[i] for i in pending], batch_size=batch_size)
+    for i, text in zip(pending, generated):
+        texts[i] = remember_explanation(cache, prompts[i], MODEL_ID, GENERATION_KWARGS, text)
+    return texts
+
+
+# Request settings that, with the prompt and model, determine an OpenAI explanation
+OPENAI_PARAMS = {"max_tokens": MAX_TOKENS}
+
+
+def stream_hf_explanation(
+    keyword: str,
+    date: dt.date,
+    direction: str,
+    token: Optional[str],
+    pipeline_loader: Callable[[Optional[str]], Any] = load_textgen_pipeline,
+    cache: Optional[ExplanationCache] = None,
+) -> Iterator[str]:
+    """Streaming counterpart of `hf_explanation`; the full text is stored in `cache` at the end.
+
+    Concurrent streams of the same prompt share one generation (see `SingleFlight.stream`).
+    """
+    prompt = build_explanation_prompt(keyword, date, direction)
+    if is_missing_key(token, HF_TOKEN_PLACEHOLDER):
+        yield demo_explanation(date, direction)
+        return
+
+    regenerate = partial(_generate_hf_explanation, prompt, token, pipeline_loader, cache)
+    cached = lookup_explanation(cache, prompt, MODEL_ID, GENERATION_KWARGS, regenerate=regenerate)
+    if cached is not None:
+        yield cached
+        return
+
+    def generate() -> Iterator[str]:
+        textgen = pipeline_loader(token)
+        if textgen is None:
+            yield PIPELINE_UNAVAILABLE
+            return
+        yield from stream_and_remember(
+            stream_with_pipeline(textgen, prompt),
+            lambda text: remember_explanation(cache, prompt, MODEL_ID, GENERATION_KWARGS, text),
+        )
+
+    # Sessions streaming the same prompt share one generation; later ones replay its chunks
+    yield from get_single_flight().stream(("explanation", explanation_key(prompt, MODEL_ID, GENERATION_KWARGS)), generate)
+
+
+def lookup_openai_explanation(
+    keyword: str,
+    date: dt.date,
+    direction: str,
+    region: str,
+    prompt: str,
+    cache: Optional[ExplanationCache],
+    semantic_cache: Optional[SemanticExplanationCache],
+    regenerate: Optional[Callable[[], object]] = None,
+) -> Optional[str]:
+    """Exact prompt match first, then a similar keyword in the same week and direction.
+
+    With `regenerate`, expired exact matches are served and regenerated in the
+    background (see `lookup_explanation`); without it they count as misses.
+    """
+    if cache is not None:
+        if regenerate is not None:
+            cached = lookup_explanation(cache, prompt, OPENAI_MODEL, OPENAI_PARAMS, regenerate)
+        else:
+            cached = cache.get(prompt, OPENAI_MODEL, OPENAI_PARAMS)
+        if cached is not None:
+            return cached
+    if semantic_cache is not None:
+        return semantic_cache.lookup(keyword, date, direction, OPENAI_MODEL, OPENAI_PARAMS, region=region)
+    return None
+
+
+def remember_openai_explanation(
+    keyword: str,
+    date: dt.date,
+    direction: str,
+    region: str,
+    prompt: str,
+    text: str,
+    cache: Optional[ExplanationCache],
+    semantic_cache: Optional[SemanticExplanationCache],
+) -> str:
+    remember_explanation(cache, prompt, OPENAI_MODEL, OPENAI_PARAMS, text)
+    if semantic_cache is not None and not is_fallback_explanation(text):
+        semantic_cache.add(keyword, date, direction, OPENAI_MODEL, OPENAI_PARAMS, text, region=region)
+    return text
+
+
+def load_openai_client(api_key: Optional[str]):
+    """Create an OpenAI client.
+
+    Returns None if the client cannot be created (e.g., missing dependency or API key).
+    """
+    if is_missing_key(api_key, OPENAI_KEY_PLACEHOLDER):
+        return None
+    try:
+        from openai import OpenAI
+
+        client = OpenAI(api_key=api_key)
+        return client
+    except Exception:
+        return None
+
+
+def generate_with_openai(client: Any, prompt: str, model: str = OPENAI_MODEL, max_tokens: int = MAX_TOKENS) -> str:
+    """Send one prompt as a chat completion and return the cleaned text."""
+    try:
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens
+        )
+
+        if response.choices and len(response.choices) > 0:
+            content = response.choices[0].message.content
+            if content:
+                return content.strip()
+
+        return "No response generated."
+    except Exception as e:
+        return f"(OpenAI) Generation failed: {e}"
+
+
+def stream_with_openai(
+    client: Any, prompt: str, model: str = OPENAI_MODEL, max_tokens: int = MAX_TOKENS
+) -> Iterator[str]:
+    """Streaming counterpart of `generate_with_openai`: yields content deltas as they arrive."""
+    try:
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        for event in stream:
+            if event.choices and event.choices[0].delta.content:
+                yield event.choices[0].delta.content
+    except Exception as e:
+        yield f"(OpenAI) Generation failed: {e}"
+
+
+def openai_explanation(
+    keyword: str,
+    date: dt.date,
+    direction: str,
+    api_key: Optional[str],
+    region: str = "the US",
+    client_loader: Callable[[Optional[str]], Any] = load_openai_client,
+    cache: Optional[ExplanationCache] = None,
+    semantic_cache: Optional[SemanticExplanationCache] = None,
+) -> str:
+    """Call OpenAI API to get an explanation. Falls back to a dummy string if unavailable.
+
+    With `cache`, stored explanations are returned without an API call (expired ones are
+    regenerated in the background) and new ones are stored.
+    With `semantic_cache`, the explanation of a similar keyword with the same date and
+    direction is reused as well. Concurrent calls for the same prompt share one API call.
+    """
+    prompt = build_explanation_prompt(keyword, date, direction, region=region)
+
+    # Fallback if API key is not provided or left as placeholder
+    if is_missing_key(api_key, OPENAI_KEY_PLACEHOLDER):
+        return demo_explanation(date, direction)
+
+    generate = partial(
+        _generate_openai_explanation,
+        keyword, date, direction, region, prompt, api_key, client_loader, cache, semantic_cache,
+    )
+    cached = lookup_openai_explanation(
+        keyword, date, direction, region, prompt, cache, semantic_cache, regenerate=generate
+    )
+    if cached is not None:
+        return cached
+
+    # Use OpenAI API
+    return generate()
+
+
+def _generate_openai_explanation(
+    keyword: str,
+    date: dt.date,
+    direction: str,
+    region: str,
+    prompt: str,
+    api_key: Optional[str],
+    client_loader: Callable[[Optional[str]], Any],
+    cache: Optional[ExplanationCache],
+    semantic_cache: Optional[SemanticExplanationCache],
+) -> str:
+    def generate() -> str:
+        client = client_loader(api_key)
+        if client is None:
+            return OPENAI_UNAVAILABLE
+        text = generate_with_openai(client, prompt)
+        return remember_openai_explanation(keyword, date, direction, region, prompt, text, cache, semantic_cache)
+
+    return get_single_flight().do(("explanation", explanation_key(prompt, OPENAI_MODEL, OPENAI_PARAMS)), generate)
+
+
+def stream_openai_explanation(
+    keyword: str,
+    date: dt.date,
+    direction: str,
+    api_key: Optional[str],
+    region: str = "the US",
+    client_loader: Callable[[Optional[str]], Any] = load_openai_client,
+    cache: Optional[ExplanationCache] = None,
+    semantic_cache: Optional[SemanticExplanationCache] = None,
+) -> Iterator[str]:
+    """Streaming counterpart of `openai_explanation`; the full text is cached once the stream ends.
+
+    Concurrent streams of the same prompt share one API call, as in `stream_hf_explanation`.
+    """
+    prompt = build_explanation_prompt(keyword, date, direction, region=region)
+    if is_missing_key(api_key, OPENAI_KEY_PLACEHOLDER):
+        yield demo_explanation(date, direction)
+        return
+
+    regenerate = partial(
+        _generate_openai_explanation,
+        keyword, date, direction, region, prompt, api_key, client_loader, cache, semantic_cache,
+    )
+    cached = lookup_openai_explanation(
+        keyword, date, direction, region, prompt, cache, semantic_cache, regenerate=regenerate
+    )
+    if cached is not None:
+        yield cached
+        return
+
+    def generate() -> Iterator[str]:
+        client = client_loader(api_key)
+        if client is None:
+            yield OPENAI_UNAVAILABLE
+            return
+        yield from stream_and_remember(
+            stream_with_openai(client, prompt),
+            lambda text: remember_openai_explanation(
+                keyword, date, direction, region, prompt, text, cache, semantic_cache
+            ),
+        )
+
+    yield from get_single_flight().stream(("explanation", explanation_key(prompt, OPENAI_MODEL, OPENAI_PARAMS)), generate)
+
+
+def openai_explanations_batch(
+    keyword: str,
+    anomalies: List[Tuple[dt.date, str]],
+    api_key: Optional[str],
+    region: str = "the US",
+    client_loader: Callable[[Optional[str]], Any] = load_openai_client,
+    cache: Optional[ExplanationCache] = None,
+    semantic_cache: Optional[SemanticExplanationCache] = None,
+    chunk_size: int = OPENAI_BATCH_MAX_ANOMALIES,
+) -> List[str]:
+    """Explain every (date, direction) anomaly of one keyword with one chat completion per `chunk_size` anomalies.
+
+    Each reply is parsed as a JSON object mapping dates to explanations; anomalies
+    missing from it (or all of them, if the request fails) fall back to
+    one `generate_with_openai` call each. Cached explanations are reused, new
+    ones are stored and concurrent identical calls are coalesced, as in `openai_explanation`.
+    """
+    if is_missing_key(api_key, OPENAI_KEY_PLACEHOLDER):
+        return [demo_explanation(date, direction) for date, direction in anomalies]
+
+    prompts = [build_explanation_prompt(keyword, date, direction, region=region) for date, direction in anomalies]
+    texts: List[Optional[str]] = [
+        lookup_openai_explanation(
+            keyword, date, direction, region, prompt, cache, semantic_cache,
+            regenerate=partial(
+                _generate_openai_explanation,
+                keyword, date, direction, region, prompt, api_key, client_loader, cache, semantic_cache,
+            ),
+        )
+        for (date, direction), prompt in zip(anomalies, prompts)
+    ]
+    pending = [i for i, text in enumerate(texts) if text is None]
+    if not pending:
+        return texts
+
+    def generate() -> List[str]:
+        client = client_loader(api_key)
+        if client is None:
+            return [OPENAI_UNAVAILABLE] * len(pending)
+
+        parsed: Dict[str, str] = {}
+        if len(pending) > 1:
+            # Bounded chunks keep every reply (and its max_tokens) inside the model's completion limit
+            size = max(1, chunk_size)
+            for start in range(0, len(pending), size):
+                chunk = [anomalies[i] for i in pending[start:start + size]]
+                parsed.update(_openai_batch_reply(client, keyword, chunk, region))
+
+        generated = []
+        for i in pending:
+            date, direction = anomalies[i]
+            text = parsed.get(f"{date:%Y-%m-%d}")
+            if text is None:
+                text = generate_with_openai(client, prompts[i])
+            generated.append(
+                remember_openai_explanation(keyword, date, direction, region, prompts[i], text, cache, semantic_cache)
+            )
+        return generated
+
+    # Sessions explaining the same keyword at the same time share one request
+    key = ("openai-batch", keyword, region, tuple(anomalies[i] for i in pending))
+    for i, text in zip(pending, get_single_flight().do(key, generate)):
+        texts[i] = text
+    return texts
+
+
+def _openai_batch_reply(client: Any, keyword: str, anomalies: List[Tuple[dt.date, str]], region: str) -> Dict[str, str]:
+    """Ask for one chunk of anomalies as a JSON object; {} if the request fails."""
+    try:
+        response = client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "user", "content": build_batch_explanation_prompt(keyword, anomalies, region=region)}
+            ],
+            # Same per-anomaly budget as single calls, plus room for the JSON keys
+            max_tokens=(MAX_TOKENS + 20) * len(anomalies),
+            response_format={"type": "json_object"},
+        )
+        return parse_batch_explanations(response.choices[0].message.content or "")
+    except Exception:
+        return {}
+
+
+def load_async_openai_client(api_key: Optional[str]):
+    """Create an AsyncOpenAI client, or None if unavailable.
+
+    Async clients are bound to the event loop they are used on, so create one per loop.
+    """
+    if is_missing_key(api_key, OPENAI_KEY_PLACEHOLDER):
+        return None
+    try:
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=api_key)
+    except Exception:
+        return None
+
+
+async def agenerate_with_openai(client: Any, prompt: str, model: str = OPENAI_MODEL, max_tokens: int = MAX_TOKENS) -> str:
+    """Async counterpart of `generate_with_openai`."""
+    try:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens
+        )
+
+        if response.choices and len(response.choices) > 0:
+            content = response.choices[0].message.content
+            if content:
+                return content.strip()
+
+        return "No response generated."
+    except Exception as e:
+        return f"(OpenAI) Generation failed: {e}"
+
+
+async def aopenai_explanation(
+    keyword: str,
+    date: dt.date,
+    direction: str,
+    api_key: Optional[str],
+    client: Any,
+    region: str = "the US",
+    cache: Optional[ExplanationCache] = None,
+    semantic_cache: Optional[SemanticExplanationCache] = None,
+) -> str:
+    """Async counterpart of `openai_explanation` using an AsyncOpenAI client."""
+    prompt = build_explanation_prompt(keyword, date, direction, region=region)
+
+    if is_missing_key(api_key, OPENAI_KEY_PLACEHOLDER):
+        return demo_explanation(date, direction)
+    # SQLite lookups are fast enough to run on the event loop
+    cached = lookup_openai_explanation(keyword, date, direction, region, prompt, cache, semantic_cache)
+    if cached is not None:
+        return cached
+    if client is not None:
+        text = await agenerate_with_openai(client, prompt)
+        return remember_openai_explanation(keyword, date, direction, region, prompt, text, cache, semantic_cache)
+    return OPENAI_UNAVAILABLE
@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import time
+import datetime as dt
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from gtrends.cache import SeriesStore, TrendsCache, get_series_store, get_trends_cache, ttl_for_timeframe
+from gtrends.config import (
+    GEO_CODE,
+    INCREMENTAL_FULL_REFRESH_DAYS,
+    INCREMENTAL_OVERLAP_POINTS,
+    INCREMENTAL_REFRESH,
+    MAX_KEYWORDS_PER_PAYLOAD,
+    TIMEFRAME,
+)
+from gtrends.ratelimit import get_rate_limiter
+from gtrends.refresh import get_background_refresher
+from gtrends.retry import call_with_retry
+from gtrends.session import get_session_pool
+from gtrends.singleflight import get_single_flight
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+LONG_COLUMNS = ["keyword", "date", "interest"]
+SERIES_COLUMNS = ["date", "interest", "is_partial"]
+DAY = dt.timedelta(days=1)
+WEEK = dt.timedelta(days=7)
+
+
+def empty_long_frame() -> pd.DataFrame:
+    import pandas as pd
+
+    return pd.DataFrame(columns=LONG_COLUMNS)
+
+
+def plan_payload_groups(keywords: List[str], anchor: Optional[str] = None) -> List[List[str]]:
+    """Split keywords into pytrends payload groups of at most 5 keywords.
+
+    When an anchor is given it is placed first in every group, so each group
+    carries 4 tracked keywords plus the anchor used for rescaling.
+    """
+    unique = list(dict.fromkeys(k for k in keywords if k))
+    if anchor is None:
+        size = MAX_KEYWORDS_PER_PAYLOAD
+        return [unique[i:i + size] for i in range(0, len(unique), size)]
+
+    others = [k for k in unique if k != anchor]
+    size = MAX_KEYWORDS_PER_PAYLOAD - 1
+    if not others:
+        return [[anchor]]
+    return [[anchor] + others[i:i + size] for i in range(0, len(others), size)]
+
+
+def fetch_interest_over_time(
+    kw_list: List[str],
+    timeframe: str = TIMEFRAME,
+    geo: str = GEO_CODE,
+    keep_partial: bool = False,
+) -> pd.DataFrame:
+    """Run a single pytrends payload and return its wide interest_over_time frame.
+
+    The frame is indexed by a naive date (weekly gaps filled on a W-SUN grid) with
+    one column per keyword; the boolean 'isPartial' column is kept only when
+    `keep_partial` is set. Rate limits and transient network errors are retried
+    with backoff (see `call_with_retry`); anything else propagates.
+    """
+    import pandas as pd
+
+    def run_payload() -> Optional[pd.DataFrame]:
+        # Wait only when the shared request budget is exhausted
+        get_rate_limiter().acquire()
+
+        with get_session_pool().client() as pytrends:
+            pytrends.build_payload(kw_list=kw_list, timeframe=timeframe, geo=geo)
+            return pytrends.interest_over_time()
+
+    df = call_with_retry(run_payload)
+    if df is None or df.empty:
+        return pd.DataFrame(columns=kw_list, dtype=float)
+
+    wide = df.drop(columns=["isPartial"], errors="ignore").astype(float)
+    # Short windows come back daily (or hourly); only weekly series go on the W-SUN grid
+    if wide.index.freq is None and len(wide) > 1 and wide.index[1] - wide.index[0] == pd.Timedelta(WEEK):
+        wide = wide.asfreq("W-SUN")
+    if keep_partial:
+        partial = df["isPartial"] if "isPartial" in df.columns else pd.Series(False, index=df.index)
+        wide["isPartial"] = partial.reindex(wide.index).fillna(False).astype(bool)
+    wide.index = wide.index.tz_localize(None)
+    wide.index.name = "date"
+    return wide
+
+
+def rescale_to_anchor(groups: List[pd.DataFrame], anchor: str) -> List[pd.DataFrame]:
+    """Rescale payload groups onto the first group's anchor series.
+
+    Every group is normalised by Google to its own maximum, so the anchor column
+    is used as a shared yardstick: each group is multiplied by the ratio of the
+    reference anchor total to its own anchor total. Groups whose anchor is all
+    zero cannot be placed on the common scale and are returned as NaN; if the
+    reference anchor itself is all zero, that holds for every group but the first.
+    """
+    if not groups:
+        return []
+
+    reference = groups[0][anchor].sum()
+    scaled = [groups[0]]
+    for wide in groups[1:]:
+        own = wide[anchor].sum()
+        factor = reference / own if reference > 0 and own > 0 else float("nan")
+        scaled.append(wide * factor)
+    return scaled
+
+
+def fetch_trends_batch(
+    keywords: List[str],
+    anchor: Optional[str] = None,
+    timeframe: str = TIMEFRAME,
+    geo: str = GEO_CODE,
+    on_error: Optional[Callable[[List[str], Exception], None]] = None,
+) -> pd.DataFrame:
+    """Fetch Google Trends interest for many keywords with as few payloads as possible.
+
+    Keywords are packed into pytrends' 5-keyword payload groups. When more than
+    one group is needed, every group shares an anchor keyword and is rescaled
+    onto it so interest values stay comparable across groups; the combined
+    result is renormalised to a 0-100 scale. Unless given, the anchor is the
+    keyword with the highest total in the first group, since a low-volume anchor
+    makes the rescaling ratios noisy.
+
+    A failing payload group raises, unless `on_error(group_keywords, error)` is
+    given: then the group is reported through it and left out of the result. If
+    the anchor probe (the first group) fails or comes back empty, the remaining
+    keywords are fetched as a batch of their own.
+
+    Returns a long-format DataFrame with columns: [keyword, date, interest]
+    """
+    import pandas as pd
+
+    unique = list(dict.fromkeys(k for k in keywords if k))
+    if not unique:
+        return empty_long_frame()
+
+    def fetch_group(kw_list: List[str]) -> pd.DataFrame:
+        try:
+            return fetch_interest_over_time(kw_list, timeframe=timeframe, geo=geo)
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(kw_list, e)
+            return pd.DataFrame(columns=kw_list, dtype=float)
+
+    frames = []
+    if anchor is None and len(unique) > MAX_KEYWORDS_PER_PAYLOAD:
+        # The first group doubles as the anchor probe, so choosing the anchor costs no extra request
+        first = unique[:MAX_KEYWORDS_PER_PAYLOAD]
+        first_wide = fetch_group(first)
+        if first_wide.empty:
+            return fetch_trends_batch(unique[MAX_KEYWORDS_PER_PAYLOAD:], None, timeframe, geo, on_error)
+        totals = first_wide.reindex(columns=first).sum()
+        anchor = totals.idxmax() if totals.max() > 0 else first[0]
+        frames.append(first_wide)
+        groups = [first] + plan_payload_groups([anchor] + unique[MAX_KEYWORDS_PER_PAYLOAD:], anchor)
+    else:
+        groups = plan_payload_groups(unique, anchor)
+    frames += [fetch_group(kw_list) for kw_list in groups[len(frames):]]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return empty_long_frame()
+
+    if anchor is not None and len(groups) > 1:
+        frames = rescale_to_anchor(frames, anchor)
+        wide = pd.concat(
+            [frames[0]] + [f.drop(columns=[anchor]) for f in frames[1:]],
+            axis=1,
+        )
+        peak = wide.max().max()
+        if pd.notna(peak) and peak > 0:
+            wide = (wide * (100.0 / peak)).round(2)
+    else:
+        wide = frames[0]
+
+    wide = wide[[k for k in unique if k in wide.columns]]
+    out = (
+        wide.reset_index()
+        .melt(id_vars="date", var_name="keyword", value_name="interest")
+        [LONG_COLUMNS]
+    )
+    return out.reset_index(drop=True)
+
+
+def timeframe_bounds(timeframe: str, today: Optional[dt.date] = None) -> Optional[Tuple[dt.date, dt.date]]:
+    """Return the (start, end) dates covered by a day-or-coarser timeframe.
+
+    Handles 'YYYY-MM-DD YYYY-MM-DD' and rolling 'today N-m' / 'today N-y'; returns
+    None for 'all' and sub-day windows such as 'now 7-d'.
+    """
+    import pandas as pd
+
+    today = today or dt.date.today()
+    parts = timeframe.split(" ")
+    if len(parts) != 2:
+        return None
+    if parts[0] == "today":
+        count, _, unit = parts[1].partition("-")
+        if not count.isdigit() or unit not in ("m", "y"):
+            return None
+        months = int(count) * (12 if unit == "y" else 1)
+        return (pd.Timestamp(today) - pd.DateOffset(months=months)).date(), today
+    try:
+        start, end = (dt.datetime.strptime(part, "%Y-%m-%d").date() for part in parts)
+    except ValueError:
+        return None
+    return start, end
+
+
+def _series_frame(wide: pd.DataFrame, keyword: str) -> pd.DataFrame:
+    import pandas as pd
+
+    return pd.DataFrame({
+        "date": wide.index,
+        "interest": wide[keyword].to_numpy(dtype=float),
+        "is_partial": wide["isPartial"].to_numpy(dtype=bool),
+    })
+
+
+def _to_weekly(daily: pd.DataFrame) -> pd.DataFrame:
+    """Average a daily series into Google's Sunday-started weeks; incomplete weeks are partial."""
+    bins = daily.set_index("date").resample("W-SUN", label="left", closed="left")
+    days = bins["interest"].count()
+    weekly = bins["interest"].mean().to_frame()
+    weekly["is_partial"] = bins["is_partial"].max().fillna(True).astype(bool) | (days < 7)
+    return weekly[days > 0].rename_axis("date").reset_index()[SERIES_COLUMNS]
+
+
+def _step(dates: pd.Series) -> Optional[dt.timedelta]:
+    return (dates.iloc[1] - dates.iloc[0]).to_pytimedelta() if len(dates) > 1 else None
+
+
+def _extend_with_tail(
+    keyword: str,
+    geo: str,
+    stored: pd.DataFrame,
+    bounds: Tuple[dt.date, dt.date],
+    overlap: int,
+) -> Optional[pd.DataFrame]:
+    """Append the points after the last complete stored row using one short tail fetch.
+
+    The tail window starts `overlap` complete points back; stored partial rows
+    are dropped and re-fetched, and the tail is rescaled onto the stored series by
+    the ratio of their totals over the overlap. Returns None whenever the stored
+    series cannot be extended reliably, so the caller falls back to a full fetch.
+    """
+    import pandas as pd
+
+    start, end = bounds
+    complete = stored[~stored["is_partial"]].reset_index(drop=True)
+    step = _step(complete["date"])
+    if step not in (DAY, WEEK) or len(complete) < overlap:
+        return None
+
+    last_complete = complete["date"].iloc[-1]
+    # Keep the tail at least a week long: shorter ranges come back hourly
+    tail_start = min(complete["date"].iloc[-overlap], last_complete - WEEK).date()
+    if (end - tail_start) > (end - start) / 2:
+        return None  # so far behind that a full fetch is as cheap
+
+    tail_wide = fetch_interest_over_time(
+        [keyword], timeframe=f"{tail_start:%Y-%m-%d} {end:%Y-%m-%d}", geo=geo, keep_partial=True
+    )
+    if tail_wide.empty:
+        return None
+    tail = _series_frame(tail_wide, keyword)
+    tail_step = _step(tail["date"])
+    if step == WEEK and tail_step == DAY:
+        tail = _to_weekly(tail)
+    elif tail_step != step:
+        return None
+
+    both = complete.merge(tail[~tail["is_partial"]], on="date", suffixes=("", "_tail"))
+    reference, own = both["interest"].sum(), both["interest_tail"].sum()
+    if both.empty or not reference > 0 or not own > 0:
+        return None
+
+    new = tail[tail["date"] > last_complete].assign(interest=lambda f: f["interest"] * (reference / own))
+    merged = pd.concat([complete, new], ignore_index=True)
+    # Keep the point whose period contains `start`, as a full fetch does
+    return merged[merged["date"] > pd.Timestamp(start) - step].reset_index(drop=True)
+
+
+def refresh_trends(
+    keyword: str,
+    timeframe: str = TIMEFRAME,
+    geo: str = GEO_CODE,
+    overlap: int = INCREMENTAL_OVERLAP_POINTS,
+    store: Optional[SeriesStore] = None,
+    today: Optional[dt.date] = None,
+) -> pd.DataFrame:
+    """Bring the stored series for `timeframe` up to date, fetching only a short tail when possible.
+
+    The first call (and any call more than INCREMENTAL_FULL_REFRESH_DAYS after the
+    last full fetch) downloads the whole window. Later calls fetch the points
+    since the last complete one plus `overlap` points of overlap, rescale them
+    onto the stored series, drop points that rolled out of the window and
+    renormalise the result to 0-100 like a full fetch.
+
+    Returns a DataFrame with columns: [date, interest]
+    """
+    import pandas as pd
+
+    store = store or get_series_store()
+    bounds = timeframe_bounds(timeframe, today)
+    entry = store.get(keyword, timeframe, geo)
+
+    series = None
+    full_fetched_at = time.time()
+    if bounds is not None and entry is not None and time.time() - entry[1] < INCREMENTAL_FULL_REFRESH_DAYS * 86400:
+        series = _extend_with_tail(keyword, geo, entry[0], bounds, overlap)
+        full_fetched_at = entry[1]
+    if series is None:
+        wide = fetch_interest_over_time([keyword], timeframe=timeframe, geo=geo, keep_partial=True)
+        if wide.empty:
+            return pd.DataFrame(columns=["date", "interest"])
+        series = _series_frame(wide, keyword)
+        full_fetched_at = time.time()
+
+    peak = series["interest"].max()
+    if pd.notna(peak) and peak > 0:
+        series["interest"] = series["interest"] * (100.0 / peak)
+    store.set(keyword, timeframe, geo, series, full_fetched_at)
+    return series.assign(interest=series["interest"].round(2))[["date", "interest"]]
+
+
+def fetch_trends(
+    keyword: str,
+    timeframe: str = TIMEFRAME,
+    geo: str = GEO_CODE,
+    use_cache: bool = True,
+    incremental: bool = INCREMENTAL_REFRESH,
+) -> pd.DataFrame:
+    """Fetch Google Trends interest for a single keyword, backed by the persistent cache.
+
+    Historical windows are cached indefinitely and open-ended ones for a short
+    TTL (see `ttl_for_timeframe`). When an open-ended window expires and
+    `incremental` is set, it is extended with `refresh_trends` rather than
+    refetched in full. Empty results are never cached. Concurrent misses for the
+    same (keyword, timeframe, geo) share a single fetch.
+
+    Returns a DataFrame with columns: [date, interest]
+    """
+    cache = get_trends_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(keyword, timeframe, geo)
+        if cached is not None:
+            return cached
+    return _fetch_and_store(keyword, timeframe, geo, cache, incremental)
+
+
+def _fetch_and_store(
+    keyword: str, timeframe: str, geo: str, cache: Optional[TrendsCache], incremental: bool
+) -> pd.DataFrame:
+    def fetch() -> pd.DataFrame:
+        ttl = ttl_for_timeframe(timeframe)
+        if incremental and ttl is not None and timeframe_bounds(timeframe) is not None:
+            out = refresh_trends(keyword, timeframe=timeframe, geo=geo)
+        else:
+            df = fetch_trends_batch([keyword], timeframe=timeframe, geo=geo)
+            out = df[["date", "interest"]].reset_index(drop=True)
+
+        if cache is not None and not out.empty:
+            cache.set(keyword, timeframe, geo, out, ttl=ttl)
+        return out
+
+    # Every waiting caller gets its own copy of the shared frame
+    return get_single_flight().do(("trends", keyword, timeframe, geo), fetch).copy()
+
+
+def fetch_trends_swr(
+    keyword: str,
+    timeframe: str = TIMEFRAME,
+    geo: str = GEO_CODE,
+    incremental: bool = INCREMENTAL_REFRESH,
+) -> Tuple[pd.DataFrame, bool]:
+    """Stale-while-revalidate variant of `fetch_trends`; returns (frame, is_stale).
+
+    An expired cache entry is returned at once with is_stale=True and refreshed
+    on a background thread (see `BackgroundRefresher`). Entries more than
+    MAX_STALE_SECONDS past expiry, and misses, are fetched in the foreground.
+    """
+    cache = get_trends_cache()
+    entry = cache.lookup(keyword, timeframe, geo, allow_stale=True)
+    if entry is None:
+        return _fetch_and_store(keyword, timeframe, geo, cache, incremental), False
+
+    df, stale = entry
+    if stale:
+        get_background_refresher().submit(
+            ("trends", keyword, timeframe, geo),
+            lambda: _fetch_and_store(keyword, timeframe, geo, cache, incremental),
+        )
+    return df, stale
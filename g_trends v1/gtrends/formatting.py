@@ -0,0 +1,41 @@
+import datetime as dt
+
+
+def format_pct(x: float) -> str:
+    import pandas as pd
+
+    if pd.isna(x):
+        return "—"
+    return f"{x * 100:.1f}%"
+
+
+def format_timeframe_display(timeframe: str) -> str:
+    """Convert timeframe from 'YYYY-MM-DD YYYY-MM-DD' to readable format."""
+    try:
+        start_date, end_date = timeframe.split(" ")
+        start_dt = dt.datetime.strptime(start_date, "%Y-%m-%d")
+        end_dt = dt.datetime.strptime(end_date, "%Y-%m-%d")
+
+        start_formatted = start_dt.strftime("%B %d, %Y")
+        end_formatted = end_dt.strftime("%B %d, %Y")
+
+        return f"{start_formatted} - {end_formatted}"
+    except ValueError:
+        return timeframe  # fallback to original if parsing fails
+
+
+def get_geo_display_name(geo_code: str) -> str:
+    """Convert geo code to display name using pycountry."""
+    try:
+        import pycountry
+
+        # Convert 2-letter country code to country name
+        country = pycountry.countries.get(alpha_2=geo_code)
+        if country:
+            return country.name
+        else:
+            return geo_code  # fallback to code if not found
+
+    except Exception:
+        # Fallback to original code if pycountry fails
+        return geo_code
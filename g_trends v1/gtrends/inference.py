@@ -0,0 +1,313 @@
+import queue
+import time
+import datetime as dt
+import threading
+from collections import deque
+from functools import partial
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from gtrends.cache import ExplanationCache, explanation_key
+from gtrends.config import HF_BATCH_SIZE, INFERENCE_MAX_WAIT_MS, MODEL_ID
+from gtrends.explain import (
+    GENERATION_KWARGS,
+    HF_TOKEN_PLACEHOLDER,
+    PIPELINE_UNAVAILABLE,
+    build_explanation_prompt,
+    demo_explanation,
+    generate_batch_with_pipeline,
+    is_missing_key,
+    lookup_explanation,
+    remember_explanation,
+    stream_and_remember,
+    stream_with_pipeline,
+)
+from gtrends.singleflight import get_single_flight
+
+_STOP = object()
+
+
+class _StreamRequest:
+    """A prompt the worker generates on its own, passing chunks to the reader through `chunks`."""
+
+    def __init__(self, prompt: str):
+        self.prompt = prompt
+        self.chunks: "queue.Queue[Any]" = queue.Queue()
+        self.submitted = time.monotonic()
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class InferenceQueue:
+    """Micro-batching front end for a batched generation function.
+
+    Any thread (e.g. every Streamlit session) can `submit` a prompt and get a
+    Future back. A single worker thread takes the first waiting prompt, keeps
+    collecting more for up to `max_wait` seconds or until `max_batch_size` are
+    waiting, then runs them through `generate_batch(prompts) -> texts` in one
+    call. The model therefore sees a few large batches instead of many
+    concurrent batch-size-1 calls.
+
+    With `generate_stream(prompt) -> chunks`, `submit_stream` queues a prompt
+    that the same worker generates token by token between batches, so the
+    model (e.g. a pipeline, which is not thread-safe) is only ever used by the
+    worker thread.
+    """
+
+    def __init__(
+        self,
+        generate_batch: Callable[[List[str]], List[str]],
+        max_batch_size: int = HF_BATCH_SIZE,
+        max_wait: float = INFERENCE_MAX_WAIT_MS / 1000.0,
+        history: int = 1000,
+        generate_stream: Optional[Callable[[str], Iterator[str]]] = None,
+    ):
+        self.generate_batch = generate_batch
+        self.generate_stream = generate_stream
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self._requests: "queue.Queue[Any]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes: deque = deque(maxlen=history)
+        self._latencies: deque = deque(maxlen=history)
+        self._stats = {"requests": 0, "batches": 0, "streams": 0, "failed": 0}
+        self._held: Optional[_StreamRequest] = None  # stream that arrived while a batch was filling
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="gtrends-inference", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt: str) -> "Future[str]":
+        """Queue one prompt; the Future resolves to its generated text."""
+        if self._closed:
+            raise RuntimeError("inference queue is closed")
+        future: "Future[str]" = Future()
+        self._requests.put((prompt, future, time.monotonic()))
+        return future
+
+    def submit_stream(self, prompt: str) -> Iterator[str]:
+        """Queue one prompt for token-by-token generation; yields its chunks as the worker produces them.
+
+        An exception raised by the generation is re-raised to the reader.
+        """
+        if self.generate_stream is None:
+            raise RuntimeError("inference queue was created without generate_stream")
+        if self._closed:
+            raise RuntimeError("inference queue is closed")
+        request = _StreamRequest(prompt)
+        self._requests.put(request)
+        return self._read_stream(request)
+
+    @staticmethod
+    def _read_stream(request: _StreamRequest) -> Iterator[str]:
+        while True:
+            chunk = request.chunks.get()
+            if chunk is _STOP:
+                return
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting prompts, finish the ones already queued and stop the worker."""
+        self._closed = True
+        self._requests.put(_STOP)
+        self._worker.join(timeout)
+
+    def _next_batch(self) -> Union[None, _StreamRequest, List[Tuple[str, "Future[str]", float]]]:
+        if self._held is not None:
+            first, self._held = self._held, None
+        else:
+            first = self._requests.get()
+        if first is _STOP:
+            return None
+        if isinstance(first, _StreamRequest):
+            return first
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Serve what we have, then stop on the next pass
+                self._requests.put(_STOP)
+                break
+            if isinstance(item, _StreamRequest):
+                # Streams run on their own, right after this batch
+                self._held = item
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if isinstance(batch, _StreamRequest):
+                self._run_stream(batch)
+                continue
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                texts = self.generate_batch([prompt for prompt, _, _ in batch])
+                if len(texts) != len(batch):
+                    raise ValueError(f"generate_batch returned {len(texts)} texts for {len(batch)} prompts")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                failed = True
+            else:
+                for (_, future, _), text in zip(batch, texts):
+                    future.set_result(text)
+                failed = False
+
+            done = time.monotonic()
+            with self._lock:
+                self._stats["requests"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["failed"] += len(batch) if failed else 0
+                self._batch_sizes.append(len(batch))
+                self._latencies.extend(done - submitted for _, _, submitted in batch)
+
+    def _run_stream(self, request: _StreamRequest) -> None:
+        try:
+            for chunk in self.generate_stream(request.prompt):
+                request.chunks.put(chunk)
+        except Exception as e:
+            request.chunks.put(e)
+            failed = True
+        else:
+            failed = False
+        request.chunks.put(_STOP)
+
+        done = time.monotonic()
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["streams"] += 1
+            self._stats["failed"] += 1 if failed else 0
+            self._latencies.append(done - request.submitted)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Queue depth, totals, mean recent batch size and p50/p95 submit-to-result latency (ms)."""
+        with self._lock:
+            sizes = list(self._batch_sizes)
+            latencies = [s * 1000.0 for s in self._latencies]
+            stats: Dict[str, Optional[float]] = dict(self._stats)
+        p50 = _percentile(latencies, 0.50)
+        p95 = _percentile(latencies, 0.95)
+        stats.update(
+            queue_depth=self._requests.qsize(),
+            mean_batch_size=sum(sizes) / len(sizes) if sizes else None,
+            p50_ms=p50,
+            p95_ms=p95,
+        )
+        return stats
+
+
+def pipeline_inference_queue(
+    textgen: Any,
+    max_batch_size: int = HF_BATCH_SIZE,
+    max_wait: float = INFERENCE_MAX_WAIT_MS / 1000.0,
+) -> InferenceQueue:
+    """Wrap a transformers text-generation pipeline in an `InferenceQueue` that can also stream."""
+    return InferenceQueue(
+        lambda prompts: generate_batch_with_pipeline(textgen, prompts, batch_size=max_batch_size),
+        max_batch_size=max_batch_size,
+        max_wait=max_wait,
+        generate_stream=lambda prompt: stream_with_pipeline(textgen, prompt),
+    )
+
+
+def queued_hf_explanation(
+    keyword: str,
+    date: dt.date,
+    direction: str,
+    token: Optional[str],
+    queue_loader: Callable[[Optional[str]], Optional[InferenceQueue]],
+    cache: Optional[ExplanationCache] = None,
+) -> str:
+    """Like `hf_explanation`, but generated through a shared `InferenceQueue` (blocks until ready).
+
+    Concurrent calls for the same prompt submit it once and share the result;
+    expired cache entries are served while they are regenerated in the background.
+    """
+    if is_missing_key(token, HF_TOKEN_PLACEHOLDER):
+        return demo_explanation(date, direction)
+
+    prompt = build_explanation_prompt(keyword, date, direction)
+    generate = partial(_generate_queued_hf_explanation, prompt, token, queue_loader, cache)
+    cached = lookup_explanation(cache, prompt, MODEL_ID, GENERATION_KWARGS, regenerate=generate)
+    if cached is not None:
+        return cached
+    return generate()
+
+
+def _generate_queued_hf_explanation(
+    prompt: str,
+    token: Optional[str],
+    queue_loader: Callable[[Optional[str]], Optional[InferenceQueue]],
+    cache: Optional[ExplanationCache],
+) -> str:
+    def generate() -> str:
+        inference_queue = queue_loader(token)
+        if inference_queue is None:
+            return PIPELINE_UNAVAILABLE
+        try:
+            text = inference_queue.submit(prompt).result()
+        except Exception as e:
+            return f"(Pipeline) Generation failed: {e}"
+        return remember_explanation(cache, prompt, MODEL_ID, GENERATION_KWARGS, text)
+
+    return get_single_flight().do(("explanation", explanation_key(prompt, MODEL_ID, GENERATION_KWARGS)), generate)
+
+
+def queued_stream_hf_explanation(
+    keyword: str,
+    date: dt.date,
+    direction: str,
+    token: Optional[str],
+    queue_loader: Callable[[Optional[str]], Optional[InferenceQueue]],
+    cache: Optional[ExplanationCache] = None,
+) -> Iterator[str]:
+    """Streaming counterpart of `queued_hf_explanation`: tokens come from the queue's worker (`submit_stream`).
+
+    Concurrent streams of the same prompt share one generation and the full text
+    is cached at the end, as in `stream_hf_explanation`.
+    """
+    if is_missing_key(token, HF_TOKEN_PLACEHOLDER):
+        yield demo_explanation(date, direction)
+        return
+
+    prompt = build_explanation_prompt(keyword, date, direction)
+    regenerate = partial(_generate_queued_hf_explanation, prompt, token, queue_loader, cache)
+    cached = lookup_explanation(cache, prompt, MODEL_ID, GENERATION_KWARGS, regenerate=regenerate)
+    if cached is not None:
+        yield cached
+        return
+
+    def generate() -> Iterator[str]:
+        inference_queue = queue_loader(token)
+        if inference_queue is None:
+            yield PIPELINE_UNAVAILABLE
+            return
+        try:
+            yield from stream_and_remember(
+                inference_queue.submit_stream(prompt),
+                lambda text: remember_explanation(cache, prompt, MODEL_ID, GENERATION_KWARGS, text),
+            )
+        except Exception as e:
+            yield f"(Pipeline) Generation failed: {e}"
+
+    yield from get_single_flight().stream(("explanation", explanation_key(prompt, MODEL_ID, GENERATION_KWARGS)), generate)
@@ -0,0 +1,224 @@
+"""Watchlist prefetcher: warm the trends and explanation caches ahead of the morning.
+
+Example (run from the `g_trends v1` directory):
+
+    python -m gtrends.prefetch watchlist.txt --explain openai --budget 200
+    python -m gtrends.prefetch watchlist.txt --explain openai --at 05:30   # keep running, daily
+
+Keywords are handled in order of how often they were viewed in the apps
+recently, so when the Google Trends request budget runs out it is the least
+viewed keywords that wait for the next run.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import argparse
+import threading
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Tuple
+
+from gtrends.cache import get_explanation_cache, get_trends_cache
+from gtrends.cli import EXPLAINERS, detect_all, explain_all, read_keywords
+from gtrends.config import (
+    GEO_CODE,
+    HF_BATCH_SIZE,
+    PREFETCH_REQUEST_BUDGET,
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_PER_MINUTE,
+    TIMEFRAME,
+    VIEW_WINDOW_DAYS,
+)
+from gtrends.fetch import fetch_trends
+from gtrends.ratelimit import configure_rate_limiter
+from gtrends.session import get_session_pool
+from gtrends.views import get_view_log
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def prioritise(keywords: List[str], view_counts: Mapping[str, int]) -> List[str]:
+    """Most viewed first; keywords with equal counts keep their watchlist order."""
+    return sorted(dict.fromkeys(keywords), key=lambda kw: -view_counts.get(kw, 0))
+
+
+def fetch_within_budget(
+    keywords: List[str], timeframe: str, geo: str, budget: int, workers: int = 4
+) -> Tuple[pd.DataFrame, int, List[str]]:
+    """Fetch `keywords` in order until `budget` HTTP requests to Google Trends have been spent.
+
+    Requests are counted where they are made (cookie bootstraps and retries
+    included, see `TrendReqPool.stats`). Once the budget is spent no further
+    uncached keyword is started; fetches already in flight finish, so a run can
+    overshoot by what at most `workers` keywords cost. Keywords fresh in the
+    cache are always read, since they cost nothing.
+
+    Returns (long frame with columns [keyword, geo, date, interest], requests spent, skipped keywords).
+    """
+    import pandas as pd
+
+    pool = get_session_pool()
+    spent_before = pool.stats()["requests"]
+    trends_cache = get_trends_cache()
+    slots = threading.Semaphore(max(1, workers))
+    futures, skipped = {}, []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for keyword in keywords:
+            slots.acquire()
+            cached = trends_cache.get(keyword, timeframe, geo) is not None
+            if not cached and pool.stats()["requests"] - spent_before >= budget:
+                slots.release()
+                skipped.append(keyword)
+                continue
+            future = executor.submit(fetch_trends, keyword, timeframe, geo)
+            future.add_done_callback(lambda _: slots.release())
+            futures[keyword] = future
+
+    frames = []
+    for keyword, future in futures.items():
+        try:
+            df = future.result()
+        except Exception as e:
+            print(f"[gtrends] {keyword}: fetch failed: {e}", file=sys.stderr)
+            continue
+        if not df.empty:
+            frames.append(df.assign(keyword=keyword))
+    long_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["keyword", "date", "interest"])
+    long_df = long_df.assign(geo=geo)[["keyword", "geo", "date", "interest"]]
+    return long_df, pool.stats()["requests"] - spent_before, skipped
+
+
+def prefetch(
+    keywords: List[str],
+    timeframe: str = TIMEFRAME,
+    geo: str = GEO_CODE,
+    budget: int = PREFETCH_REQUEST_BUDGET,
+    explain: str = "none",
+    explain_limit: Optional[int] = None,
+    threshold: float = 0.30,
+    workers: int = 4,
+    view_days: int = VIEW_WINDOW_DAYS,
+) -> Dict[str, int]:
+    """Fetch, score and explain `keywords` in view-frequency order; returns run counters.
+
+    Trend fetches stop once `budget` Google Trends requests have been made (see
+    `fetch_within_budget`); the remaining keywords are skipped until the next
+    run. Anomalies of the fetched keywords are explained with the same prompts as
+    the apps, so the results land in the shared explanation cache;
+    `explain_limit` caps how many anomalies are explained (highest-priority
+    keywords first).
+    """
+    ordered = prioritise(keywords, get_view_log().counts(view_days, geo))
+    long_df, requests, skipped = fetch_within_budget(ordered, timeframe, geo, budget, workers)
+    scored = detect_all(long_df, threshold)
+    stats = {
+        "keywords": len(ordered),
+        "fetched": int(long_df["keyword"].nunique()),
+        "requests": requests,
+        "skipped": len(skipped),
+        "anomalies": int(scored["is_anomaly"].sum()),
+        "explained": 0,
+    }
+
+    if explain != "none":
+        anomalies = scored[scored["is_anomaly"]]
+        if explain_limit is not None:
+            anomalies = anomalies.head(explain_limit)
+        explained = explain_all(anomalies, explain, geo, workers, HF_BATCH_SIZE, get_explanation_cache())
+        stats["explained"] = int(explained["explanation"].notna().sum())
+    return stats
+
+
+def seconds_until(at: dt.time, now: Optional[dt.datetime] = None) -> float:
+    """Seconds from `now` to the next occurrence of the wall-clock time `at`."""
+    now = now or dt.datetime.now()
+    target = dt.datetime.combine(now.date(), at)
+    if target <= now:
+        target += dt.timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m gtrends.prefetch",
+        description="Prefetch trends, anomalies and explanations for a watchlist of keywords.",
+    )
+    parser.add_argument("watchlist", help="File with one keyword per line (re-read before every run)")
+    parser.add_argument("--timeframe", default=TIMEFRAME, help=f"pytrends timeframe (default: '{TIMEFRAME}')")
+    parser.add_argument("--geo", default=GEO_CODE, help=f"Geo code (default: {GEO_CODE})")
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=PREFETCH_REQUEST_BUDGET,
+        help=f"Google Trends HTTP requests per run, retries included (default: {PREFETCH_REQUEST_BUDGET})",
+    )
+    parser.add_argument("--explain", choices=EXPLAINERS, default="none", help="Explanation backend (default: none)")
+    parser.add_argument("--explain-limit", type=int, help="Explain at most this many anomalies per run")
+    parser.add_argument("--threshold", type=float, default=0.30, help="Anomaly threshold as a fraction (default: 0.30)")
+    parser.add_argument(
+        "--top-viewed",
+        type=int,
+        default=0,
+        help="Also prefetch this many of the most viewed keywords that are not on the watchlist",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent fetch / explanation workers (default: 4)")
+    parser.add_argument("--at", type=dt.time.fromisoformat, help="Keep running and prefetch every day at HH:MM")
+    return parser
+
+
+def run_once(args: argparse.Namespace) -> int:
+    keywords = read_keywords(args.watchlist)
+    if args.top_viewed:
+        keywords += get_view_log().top(args.top_viewed, VIEW_WINDOW_DAYS, args.geo)
+    if not keywords:
+        print("[gtrends] watchlist is empty", file=sys.stderr)
+        return 1
+
+    started = time.monotonic()
+    stats = prefetch(
+        keywords,
+        timeframe=args.timeframe,
+        geo=args.geo,
+        budget=args.budget,
+        explain=args.explain,
+        explain_limit=args.explain_limit,
+        threshold=args.threshold,
+        workers=args.workers,
+    )
+    print(
+        f"[gtrends] prefetched {stats['fetched']}/{stats['keywords']} keywords "
+        f"({stats['requests']} requests, {stats['skipped']} over budget), "
+        f"{stats['anomalies']} anomalies, {stats['explained']} explained in {time.monotonic() - started:.0f}s",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+
+    configure_rate_limiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST, RATE_LIMIT_BACKEND)
+    if args.at is None:
+        return run_once(args)
+    while True:
+        time.sleep(seconds_until(args.at))
+        try:
+            run_once(args)
+        except Exception as e:
+            # A failed night must not stop the schedule
+            print(f"[gtrends] prefetch failed: {e}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
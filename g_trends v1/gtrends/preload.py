@@ -0,0 +1,84 @@
+import sys
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class ModelPreloader:
+    """Builds a model (and warms it up) on a background thread.
+
+    `start()` returns immediately; `ready` tells the UI whether the model can serve
+    requests without a cold start, and `wait()` blocks until it can. `loader()`
+    returns the model (or None if unavailable) and `warmup(model)` runs a throwaway
+    generation so first-run graph and allocator costs are paid here too. Only a
+    failing `loader()` marks the preloader failed; a failed warm-up is recorded in
+    `error` and the model is still served.
+    """
+
+    def __init__(self, loader: Callable[[], Any], warmup: Optional[Callable[[Any], None]] = None):
+        self.loader = loader
+        self.warmup = warmup
+        self.state = "idle"  # idle -> loading -> ready / failed
+        self.error: Optional[BaseException] = None
+        self.load_seconds: Optional[float] = None
+        self._model: Any = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ModelPreloader":
+        with self._lock:
+            if self._thread is None:
+                self.state = "loading"
+                self._thread = threading.Thread(target=self._run, name="gtrends-preload", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        started = time.monotonic()
+        try:
+            model = self._model = self.loader()
+        except Exception as e:
+            model, self.error = None, e
+        if model is not None and self.warmup is not None:
+            try:
+                self.warmup(model)
+            except Exception as e:
+                # The model loaded fine; it only pays its first-run costs on the first real request
+                print(f"[gtrends] model warm-up failed: {e}", file=sys.stderr)
+                self.error = e
+        self.state = "ready" if model is not None else "failed"
+        self.load_seconds = time.monotonic() - started
+        self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """Start loading if needed, wait for it and return the model (None if it failed or timed out)."""
+        self.start()
+        self._done.wait(timeout)
+        return self._model
+
+    def status(self) -> Dict[str, Any]:
+        return {"state": self.state, "load_seconds": self.load_seconds, "error": str(self.error) if self.error else None}
+
+
+_preloaders: Dict[Optional[str], ModelPreloader] = {}
+_preloaders_lock = threading.Lock()
+
+
+def preload_textgen_pipeline(token: Optional[str]) -> ModelPreloader:
+    """Return the process-wide preloader of the local pipeline for `token`, started on first use.
+
+    Shared by `app.py` and the `gtrends.serve` launcher, so a preload started at
+    server start is the one the app's first session waits for.
+    """
+    from gtrends.explain import load_textgen_pipeline, warm_up_pipeline
+
+    with _preloaders_lock:
+        preloader = _preloaders.get(token)
+        if preloader is None:
+            preloader = _preloaders[token] = ModelPreloader(lambda: load_textgen_pipeline(token), warmup=warm_up_pipeline)
+    return preloader.start()
@@ -0,0 +1,139 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Optional
+
+from gtrends.config import CACHE_DIR, RATE_LIMIT_BACKEND, RATE_LIMIT_BURST, RATE_LIMIT_PER_MINUTE
+
+
+class TokenBucket:
+    """Process-wide token-bucket rate limiter.
+
+    The bucket holds up to `burst` tokens and refills at `rate` tokens per second.
+    Requests are admitted immediately while tokens are available and only wait
+    when the budget is exhausted, for exactly as long as the refill takes.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate and burst must be positive")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_take(self, tokens: float) -> float:
+        """Take tokens if available and return 0, otherwise return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until `tokens` are available. Returns False if `timeout` would be exceeded."""
+        if tokens > self.burst:
+            raise ValueError("cannot acquire more tokens than the bucket holds")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._try_take(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """Token bucket whose state lives in SQLite so several processes share one budget.
+
+    Use this when multiple Streamlit servers or batch workers run on the same host
+    and must stay under a single Google Trends quota.
+    """
+
+    def __init__(self, path: str, rate: float, burst: float, name: str = "google_trends"):
+        super().__init__(rate, burst)
+        self.path = path
+        self.name = name
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (name, burst, time.time()),
+                )
+        finally:
+            conn.close()
+
+    def _try_take(self, tokens: float) -> float:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            # BEGIN IMMEDIATE takes the write lock up front so read-refill-write is atomic
+            conn.execute("BEGIN IMMEDIATE")
+            current, updated_at = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            now = time.time()
+            current = min(self.burst, current + max(0.0, now - updated_at) * self.rate)
+            wait = 0.0
+            if current >= tokens:
+                current -= tokens
+            else:
+                wait = (tokens - current) / self.rate
+            conn.execute(
+                "UPDATE buckets SET tokens = ?, updated_at = ? WHERE name = ?",
+                (current, now, self.name),
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+
+_limiter: Optional[TokenBucket] = None
+_limiter_lock = threading.Lock()
+
+
+def _build_limiter(rate_per_minute: float, burst: float, backend: str) -> TokenBucket:
+    rate = rate_per_minute / 60.0
+    if backend == "sqlite":
+        return SQLiteTokenBucket(os.path.join(CACHE_DIR, "ratelimit.sqlite"), rate, burst)
+    return TokenBucket(rate, burst)
+
+
+def get_rate_limiter() -> TokenBucket:
+    """Return the shared Google Trends rate limiter.
+
+    Configured through GTRENDS_RATE_PER_MINUTE / GTRENDS_RATE_BURST; set
+    GTRENDS_RATE_LIMITER=sqlite to share the budget across processes.
+    """
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = _build_limiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST, RATE_LIMIT_BACKEND)
+        return _limiter
+
+
+def configure_rate_limiter(
+    rate_per_minute: float = RATE_LIMIT_PER_MINUTE,
+    burst: float = RATE_LIMIT_BURST,
+    backend: str = RATE_LIMIT_BACKEND,
+) -> TokenBucket:
+    """Replace the shared rate limiter, e.g. with settings passed on the command line."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = _build_limiter(rate_per_minute, burst, backend)
+        return _limiter
@@ -0,0 +1,61 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional, Set
+
+from gtrends.config import REFRESH_WORKERS
+
+
+class BackgroundRefresher:
+    """Runs stale-cache refreshes on a small pool of background threads.
+
+    `submit` is a no-op while a refresh for the same key is queued or running, so
+    many users hitting one stale entry trigger a single refresh. Failures are
+    logged and dropped: the stale entry keeps being served until a later refresh
+    succeeds or it passes the maximum staleness.
+    """
+
+    def __init__(self, max_workers: int = REFRESH_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="gtrends-refresh")
+        self._lock = threading.Lock()
+        self._pending: Set[Hashable] = set()
+        self._stats = {"scheduled": 0, "completed": 0, "failed": 0}
+
+    def submit(self, key: Hashable, refresh: Callable[[], object]) -> bool:
+        """Schedule `refresh()` unless one is already pending for `key`; returns whether it was scheduled."""
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            self._stats["scheduled"] += 1
+        self._executor.submit(self._run, key, refresh)
+        return True
+
+    def _run(self, key: Hashable, refresh: Callable[[], object]) -> None:
+        try:
+            refresh()
+        except Exception as e:
+            print(f"[gtrends] background refresh of {key!r} failed: {e}", file=sys.stderr)
+            outcome = "failed"
+        else:
+            outcome = "completed"
+        with self._lock:
+            self._pending.discard(key)
+            self._stats[outcome] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+
+_refresher: Optional[BackgroundRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def get_background_refresher() -> BackgroundRefresher:
+    """Return the process-wide refresher used for stale trends and explanations."""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = BackgroundRefresher()
+        return _refresher
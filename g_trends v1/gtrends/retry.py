@@ -0,0 +1,168 @@
+import time
+import random
+import threading
+from typing import Callable, Optional, TypeVar
+
+from gtrends.config import (
+    BREAKER_COOLDOWN_SECONDS,
+    BREAKER_FAILURE_THRESHOLD,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Google while the circuit breaker is open."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Google Trends is throttling requests; retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    return "429" in str(exc) or "TooManyRequests" in type(exc).__name__ or "TooManyRequests" in str(exc)
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Rate limits and transient network failures are retried; anything else is not."""
+    if is_rate_limit_error(exc):
+        return True
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        import requests
+
+        return isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+    except ImportError:
+        return False
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Return the Retry-After delay carried by an HTTP error, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils
+
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BASE_DELAY, cap: float = RETRY_MAX_DELAY) -> float:
+    """Exponential backoff with full jitter for the given 0-based attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Stops calling Google Trends for a cooldown period after repeated throttling.
+
+    After `failure_threshold` consecutive rate-limit failures (or any failure that
+    carries Retry-After) the breaker opens and every call fails fast with
+    CircuitOpenError. Once the cooldown has passed a single trial call is let
+    through (half-open); its outcome closes the breaker or opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._open_until = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return time.monotonic() < self._open_until
+
+    def before_call(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._open_until:
+                raise CircuitOpenError(self._open_until - now)
+            if self._failures >= self.failure_threshold:
+                # Half-open: admit one trial request, short-circuit the rest until it settles
+                if self._trial_in_flight:
+                    raise CircuitOpenError(self.cooldown)
+                self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, rate_limited: bool, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+            if not rate_limited:
+                return
+            self._failures += 1
+            now = time.monotonic()
+            if retry_after is not None:
+                self._open_until = max(self._open_until, now + retry_after)
+            elif self._failures >= self.failure_threshold:
+                self._open_until = now + self.cooldown
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Return the process-wide circuit breaker guarding Google Trends."""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker()
+        return _breaker
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    max_attempts: int = RETRY_MAX_ATTEMPTS,
+    max_delay: float = RETRY_MAX_DELAY,
+    breaker: Optional[CircuitBreaker] = None,
+) -> T:
+    """Call `fn`, retrying rate limits and transient errors with exponential backoff.
+
+    A Retry-After header takes precedence over the computed backoff; if it asks
+    for a longer wait than `max_delay` the error is raised straight away and the
+    breaker stays open for that long. The last error is re-raised once all
+    attempts are used up.
+    """
+    breaker = breaker or get_circuit_breaker()
+    attempt = 0
+    while True:
+        breaker.before_call()
+        try:
+            result = fn()
+        except Exception as exc:
+            rate_limited = is_rate_limit_error(exc)
+            retry_after = retry_after_seconds(exc) if rate_limited else None
+            breaker.record_failure(rate_limited, retry_after)
+
+            attempt += 1
+            if attempt >= max_attempts or not is_retryable_error(exc):
+                raise
+            delay = retry_after if retry_after is not None else backoff_delay(attempt - 1, cap=max_delay)
+            if delay > max_delay:
+                raise
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
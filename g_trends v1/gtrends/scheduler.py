@@ -0,0 +1,128 @@
+import queue
+import datetime as dt
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Tuple, TypeVar
+
+from gtrends.cache import ExplanationCache
+from gtrends.config import EXPLAIN_MAX_CONCURRENCY
+from gtrends.explain import aopenai_explanation, load_async_openai_client
+from gtrends.semantic import SemanticExplanationCache
+
+# (keyword, date, direction) for one anomaly
+ExplanationJob = Tuple[str, dt.date, str]
+
+T = TypeVar("T")
+
+
+def failed_explanation(e: BaseException) -> str:
+    return f"(Scheduler) Generation failed: {e}"
+
+
+def explain_concurrently(
+    jobs: List[ExplanationJob],
+    explain: Callable[[str, dt.date, str], str],
+    max_concurrency: int = EXPLAIN_MAX_CONCURRENCY,
+    initializer: Optional[Callable[[], None]] = None,
+) -> Iterator[Tuple[int, str]]:
+    """Run `explain(keyword, date, direction)` for every job on a bounded thread pool.
+
+    Yields (job index, explanation) in completion order, so callers can render
+    each result as soon as it is ready. `initializer` runs once in every worker
+    thread (the Streamlit app uses it to attach its script context).
+    """
+    if not jobs:
+        return
+    workers = max(1, min(max_concurrency, len(jobs)))
+    with ThreadPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        futures = {pool.submit(explain, *job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            try:
+                text = future.result()
+            except Exception as e:
+                text = failed_explanation(e)
+            yield futures[future], text
+
+
+async def aexplain_concurrently(
+    jobs: List[ExplanationJob],
+    aexplain: Callable[[str, dt.date, str], Awaitable[str]],
+    max_concurrency: int = EXPLAIN_MAX_CONCURRENCY,
+) -> AsyncIterator[Tuple[int, str]]:
+    """Async counterpart of `explain_concurrently`: at most `max_concurrency` calls in flight."""
+    import asyncio
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(i: int, job: ExplanationJob) -> Tuple[int, str]:
+        async with semaphore:
+            try:
+                return i, await aexplain(*job)
+            except Exception as e:
+                return i, failed_explanation(e)
+
+    tasks = [asyncio.ensure_future(run(i, job)) for i, job in enumerate(jobs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def aexplain_openai(
+    jobs: List[ExplanationJob],
+    api_key: Optional[str],
+    region: str = "the US",
+    max_concurrency: int = EXPLAIN_MAX_CONCURRENCY,
+    cache: Optional[ExplanationCache] = None,
+    semantic_cache: Optional[SemanticExplanationCache] = None,
+) -> AsyncIterator[Tuple[int, str]]:
+    """Explain every job with concurrent AsyncOpenAI chat completions, yielding as each completes."""
+    client = load_async_openai_client(api_key)
+
+    async def explain(keyword: str, date: dt.date, direction: str) -> str:
+        return await aopenai_explanation(
+            keyword, date, direction, api_key, client, region=region, cache=cache, semantic_cache=semantic_cache
+        )
+
+    try:
+        async for item in aexplain_concurrently(jobs, explain, max_concurrency):
+            yield item
+    finally:
+        if client is not None:
+            await client.close()
+
+
+_DONE = object()
+
+
+def iterate_async(make_iterator: Callable[[], AsyncIterator[T]]) -> Iterator[T]:
+    """Drive an async iterator on a private event loop thread and yield its items synchronously.
+
+    This lets synchronous code (such as a Streamlit script) consume results as
+    they arrive while the remaining coroutines keep running in the background.
+    """
+    import asyncio
+
+    items: "queue.Queue[object]" = queue.Queue()
+
+    async def pump() -> None:
+        try:
+            async for item in make_iterator():
+                items.put(item)
+        except BaseException as e:
+            items.put(e)
+        finally:
+            items.put(_DONE)
+
+    thread = threading.Thread(target=lambda: asyncio.run(pump()), daemon=True)
+    thread.start()
+    while True:
+        item = items.get()
+        if item is _DONE:
+            break
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+    thread.join()
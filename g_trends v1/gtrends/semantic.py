@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import threading
+import datetime as dt
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from gtrends.config import (
+    CACHE_DIR,
+    EXPLANATION_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_DATE_WINDOW_DAYS,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
+
+EMBEDDING_DIM = 512
+NGRAM = 3
+# Runs of letters or of digits, so 'S23' and 'iphone15' split into a word and a number
+TOKEN_RE = re.compile(r"[^\W\d_]+|\d+")
+
+
+def keyword_tokens(keyword: str) -> Tuple[List[str], List[str]]:
+    """Split a keyword into (words, numbers), lower-cased, with a plural 's' dropped from longer words.
+
+    Numbers are sorted, since they only ever have to match exactly.
+    """
+    words, numbers = [], []
+    for token in TOKEN_RE.findall(keyword.lower()):
+        if token.isdigit():
+            numbers.append(token.lstrip("0") or "0")
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            words.append(token[:-1])
+        else:
+            words.append(token)
+    return words, sorted(numbers)
+
+
+def same_word_shape(words: List[str], other: List[str]) -> bool:
+    """Keywords are only comparable with the same number of words, or the same words run together.
+
+    Trigram similarity alone rates an added word ('iphone 15 pro', 'jaguar car')
+    close to the shorter keyword, although it usually names something else.
+    """
+    return len(words) == len(other) or "".join(words) == "".join(other)
+
+
+def embed_keyword(keyword: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Embed the words of a keyword as an L2-normalised vector of hashed character trigrams.
+
+    Cheap, dependency-free and stable across processes (crc32 rather than the
+    salted built-in hash). Words are run together, so 'chat gpt' and 'ChatGPT'
+    embed the same; numbers are left out, since they must match exactly (see
+    `block_key`). This measures spelling, not meaning: 'apple event' and
+    'iphone' are unrelated to it.
+    """
+    import numpy as np
+
+    words, _ = keyword_tokens(keyword)
+    text = f" {''.join(words)} "
+    vec = np.zeros(dim, dtype=np.float32)
+    for i in range(max(1, len(text) - NGRAM + 1)):
+        vec[zlib.crc32(text[i:i + NGRAM].encode("utf-8")) % dim] += 1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def block_key(
+    model: str, params: Mapping[str, Any], region: str, direction: str, date: dt.date, numbers: Sequence[str] = ()
+) -> str:
+    """Only explanations for the same model settings, region, direction, week and numbers can be reused.
+
+    Numbers are part of the key so that 'galaxy s23' never serves 'galaxy s24'
+    and 'world cup 2022' never serves 'world cup 2026', however alike they are spelled.
+    """
+    return "|".join(
+        [model, json.dumps(dict(params), sort_keys=True), region, direction, date.isoformat(), " ".join(numbers)]
+    )
+
+
+class SemanticExplanationCache:
+    """Reuses an explanation generated for a variant spelling of a keyword with the same date and direction.
+
+    Entries are grouped into blocks by `block_key`, so a lookup only compares
+    against keywords with the same numbers that moved the same way in the same
+    week (plus `date_window_days` either side), which keeps each comparison a
+    small matrix-vector product even with hundreds of thousands of stored
+    entries. Candidates at or above `threshold` must also pass `same_word_shape`.
+    Blocks are persisted in SQLite and loaded into memory on first use
+    (least recently used blocks are dropped beyond `max_blocks`). Every lookup
+    also pulls rows added since (by rowid), so entries written by other
+    processes are seen at once; a block is reloaded in full after
+    `reload_seconds` to drop entries evicted from SQLite.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        date_window_days: int = SEMANTIC_DATE_WINDOW_DAYS,
+        max_entries: int = EXPLANATION_CACHE_MAX_ENTRIES,
+        max_blocks: int = 4096,
+        reload_seconds: float = 300.0,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.date_window_days = date_window_days
+        self.max_entries = max_entries
+        self.max_blocks = max_blocks
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        # block key -> (keywords, texts, embedding matrix, highest rowid loaded, monotonic load time)
+        self._blocks: "OrderedDict[str, Tuple[List[str], List[str], np.ndarray, int, float]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS semantic_explanations (
+                    block TEXT NOT NULL,
+                    keyword TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (block, keyword)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS semantic_created_at ON semantic_explanations (created_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _block(self, key: str) -> Tuple[List[str], List[str], np.ndarray]:
+        import numpy as np
+
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+        reload = block is None or time.monotonic() - block[4] >= self.reload_seconds
+        if reload:
+            block = None
+        since = block[3] if block is not None else 0
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT rowid, keyword, text, embedding FROM semantic_explanations "
+                "WHERE block = ? AND rowid > ? ORDER BY rowid",
+                (key, since),
+            ).fetchall()
+        if block is not None and not rows:
+            return block[:3]
+
+        if block is None:
+            keywords: List[str] = []
+            texts: List[str] = []
+            matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+            max_rowid, loaded_at = 0, time.monotonic()
+        else:
+            keywords, texts, matrix, max_rowid, loaded_at = block
+            keywords, texts = list(keywords), list(texts)
+        # INSERT OR REPLACE gives a replaced keyword a new rowid, so it shows up here again
+        positions = {kw: i for i, kw in enumerate(keywords)}
+        updates: Dict[int, bytes] = {}
+        for rowid, keyword, text, embedding in rows:
+            if keyword in positions:
+                texts[positions[keyword]] = text
+            else:
+                positions[keyword] = len(keywords)
+                keywords.append(keyword)
+                texts.append(text)
+            updates[positions[keyword]] = embedding
+            max_rowid = max(max_rowid, rowid)
+        # Build a new matrix rather than writing into one a concurrent lookup may be reading
+        grown = np.zeros((len(keywords), EMBEDDING_DIM), dtype=np.float32)
+        grown[: len(matrix)] = matrix
+        for i, embedding in updates.items():
+            grown[i] = np.frombuffer(embedding, dtype=np.float32)
+        matrix = grown
+
+        with self._lock:
+            current = self._blocks.get(key)
+            # Keep whichever view is newer if another thread refreshed this block meanwhile
+            if reload or current is None or current[3] <= max_rowid:
+                self._blocks[key] = (keywords, texts, matrix, max_rowid, loaded_at)
+                self._blocks.move_to_end(key)
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        return keywords, texts, matrix
+
+    def lookup(
+        self,
+        keyword: str,
+        date: dt.date,
+        direction: str,
+        model: str,
+        params: Mapping[str, Any],
+        region: str = "the US",
+    ) -> Optional[str]:
+        """Return the explanation of the most similar stored keyword at or above `threshold`, if any."""
+        words, numbers = keyword_tokens(keyword)
+        query = embed_keyword(keyword)
+        best_score, best_text = self.threshold, None
+        for offset in range(-self.date_window_days, self.date_window_days + 1):
+            key = block_key(model, params, region, direction, date + dt.timedelta(days=offset), numbers)
+            keywords, texts, matrix = self._block(key)
+            if not texts:
+                continue
+            scores = matrix @ query
+            for i in scores.argsort()[::-1]:
+                if scores[i] < best_score:
+                    break
+                if same_word_shape(words, keyword_tokens(keywords[i])[0]):
+                    best_score, best_text = float(scores[i]), texts[i]
+                    break
+
+        with self._lock:
+            if best_text is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return best_text
+
+    def add(
+        self,
+        keyword: str,
+        date: dt.date,
+        direction: str,
+        model: str,
+        params: Mapping[str, Any],
+        text: str,
+        region: str = "the US",
+    ) -> None:
+        key = block_key(model, params, region, direction, date, keyword_tokens(keyword)[1])
+        vec = embed_keyword(keyword)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO semantic_explanations (block, keyword, text, embedding, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, keyword, text, vec.tobytes(), time.time()),
+            )
+            conn.execute(
+                """
+                DELETE FROM semantic_explanations WHERE rowid IN (
+                    SELECT rowid FROM semantic_explanations ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM semantic_explanations")
+        with self._lock:
+            self._blocks.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            (entries,) = conn.execute("SELECT COUNT(*) FROM semantic_explanations").fetchone()
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "entries": entries, "blocks_in_memory": len(self._blocks)}
+
+
+_semantic_cache: Optional[SemanticExplanationCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticExplanationCache]:
+    """Return the process-wide similarity cache under CACHE_DIR, or None if disabled."""
+    global _semantic_cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticExplanationCache(os.path.join(CACHE_DIR, "explanations_semantic.sqlite"))
+        return _semantic_cache
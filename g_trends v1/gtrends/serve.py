@@ -0,0 +1,48 @@
+"""Run a Streamlit app with the local model preloading from the moment the server starts.
+
+Example (run from the `g_trends v1` directory):
+
+    python -m gtrends.serve app.py --server.port 8501
+
+`streamlit run` only executes app.py when the first visitor opens the page, so
+the preload the script kicks off would still make that visitor wait for a cold
+model. This starts the same process-wide preload (see
+`preload_textgen_pipeline`) first and then runs the Streamlit server in this
+process, where the app picks it up. Arguments are passed to `streamlit run`.
+"""
+
+import os
+import sys
+from typing import List, Optional
+
+from gtrends.config import PRELOAD_MODEL, SIDECAR_ADDRESS
+from gtrends.explain import HF_TOKEN_PLACEHOLDER, is_missing_key
+from gtrends.preload import preload_textgen_pipeline
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    if not args:
+        print("usage: python -m gtrends.serve app.py [streamlit run options]", file=sys.stderr)
+        return 2
+
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+
+    token = os.getenv("HUGGINGFACE_API_TOKEN")
+    if PRELOAD_MODEL and not SIDECAR_ADDRESS and not is_missing_key(token, HF_TOKEN_PLACEHOLDER):
+        preload_textgen_pipeline(token)
+        print("[gtrends] preloading the local model while the server starts", file=sys.stderr)
+
+    from streamlit.web import cli as streamlit_cli
+
+    sys.argv = ["streamlit", "run", *args]
+    return streamlit_cli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional
+
+from gtrends.config import SESSION_COOKIE_TTL_SECONDS, SESSION_POOL_MAX_IDLE, TRENDS_HL, TRENDS_TZ
+
+# pytrends releases whose private TrendReq._get_data the pooled override below mirrors
+SUPPORTED_PYTRENDS = ("4.9.",)
+
+
+def _pytrends_version() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("pytrends")
+    except PackageNotFoundError:
+        import pytrends
+
+        return getattr(pytrends, "__version__", "")
+
+
+@lru_cache(maxsize=None)
+def _pooled_trendreq_class():
+    """Build the TrendReq subclass lazily so importing this module does not import pytrends."""
+    import requests
+    from pytrends import exceptions
+    from pytrends.request import TrendReq
+
+    # Other releases may change _get_data; they get the stock implementation (no connection reuse)
+    mirrors_stock = _pytrends_version().startswith(SUPPORTED_PYTRENDS)
+
+    class PooledTrendReq(TrendReq):
+        """TrendReq that keeps one requests.Session (and its connection pool) alive.
+
+        Stock TrendReq opens a fresh requests session for every API call, so each
+        call pays a new TLS handshake. Response handling mirrors pytrends 4.9; on
+        other releases the stock `_get_data` is used.
+        `on_request` is called once per HTTP request to Google (cookie bootstraps
+        included) so the pool can report how many were made.
+        """
+
+        def __init__(self, *args, on_request: Optional[Callable[[], None]] = None, **kwargs):
+            self.session = requests.Session()
+            self.on_request = on_request or (lambda: None)
+            self.on_request()
+            super().__init__(*args, **kwargs)  # fetches the cookies
+            self.cookies_fetched_at = time.monotonic()
+
+        def refresh_cookies(self) -> None:
+            self.on_request()
+            self.cookies = self.GetGoogleCookie()
+            self.cookies_fetched_at = time.monotonic()
+
+        def _get_data(self, url, method=TrendReq.GET_METHOD, trim_chars=0, **kwargs):
+            self.on_request()
+            if not mirrors_stock or self.proxies or self.retries > 0 or self.backoff_factor > 0:
+                return super()._get_data(url, method=method, trim_chars=trim_chars, **kwargs)
+
+            send = self.session.post if method == TrendReq.POST_METHOD else self.session.get
+            response = send(
+                url,
+                timeout=self.timeout,
+                cookies=self.cookies,
+                headers=self.headers,
+                **kwargs,
+                **self.requests_args,
+            )
+            content_type = response.headers.get("Content-Type", "")
+            if response.status_code == 200 and any(
+                t in content_type for t in ("application/json", "application/javascript", "text/javascript")
+            ):
+                # some responses start with garbage characters, like ")]}',"
+                return json.loads(response.text[trim_chars:])
+            if response.status_code == requests.codes.too_many_requests:
+                raise exceptions.TooManyRequestsError.from_response(response)
+            raise exceptions.ResponseError.from_response(response)
+
+    return PooledTrendReq
+
+
+class TrendReqPool:
+    """Thread-safe pool of warmed TrendReq clients.
+
+    Constructing TrendReq performs a cookie-bootstrap request to Google, so
+    clients are checked out for exclusive use (a TrendReq instance holds
+    per-payload state) and returned to the pool afterwards. Cookies are only
+    re-fetched once they are older than `cookie_ttl` seconds. Clients that raised
+    are discarded rather than reused.
+    """
+
+    def __init__(
+        self,
+        hl: str = TRENDS_HL,
+        tz: int = TRENDS_TZ,
+        max_idle: int = SESSION_POOL_MAX_IDLE,
+        cookie_ttl: float = SESSION_COOKIE_TTL_SECONDS,
+    ):
+        self.hl = hl
+        self.tz = tz
+        self.max_idle = max_idle
+        self.cookie_ttl = cookie_ttl
+        self._idle: List[object] = []
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "cookie_refreshes": 0, "discarded": 0, "in_use": 0, "requests": 0}
+
+    def _count_request(self) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+
+    def _checkout(self):
+        with self._lock:
+            client = self._idle.pop() if self._idle else None
+            self._stats["in_use"] += 1
+            if client is not None:
+                self._stats["reused"] += 1
+
+        try:
+            if client is None:
+                client = _pooled_trendreq_class()(hl=self.hl, tz=self.tz, on_request=self._count_request)
+                with self._lock:
+                    self._stats["created"] += 1
+            elif time.monotonic() - client.cookies_fetched_at > self.cookie_ttl:
+                client.refresh_cookies()
+                with self._lock:
+                    self._stats["cookie_refreshes"] += 1
+        except Exception:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            raise
+        return client
+
+    def _checkin(self, client, healthy: bool) -> None:
+        with self._lock:
+            self._stats["in_use"] -= 1
+            if healthy and len(self._idle) < self.max_idle:
+                self._idle.append(client)
+                return
+            self._stats["discarded"] += 1
+        client.session.close()
+
+    @contextmanager
+    def client(self) -> Iterator[object]:
+        """Check out a TrendReq client for the duration of the block."""
+        client = self._checkout()
+        healthy = False
+        try:
+            yield client
+            healthy = True
+        finally:
+            self._checkin(client, healthy)
+
+    def stats(self) -> Dict[str, int]:
+        """Client counters plus `requests`, the HTTP requests made to Google so far."""
+        with self._lock:
+            return dict(self._stats, idle=len(self._idle))
+
+
+_pool: Optional[TrendReqPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> TrendReqPool:
+    """Return the process-wide TrendReq pool shared by every Streamlit session."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = TrendReqPool()
+        return _pool
@@ -0,0 +1,252 @@
+"""Local inference sidecar: one process holds the model weights for every app worker.
+
+Run one per node (from the `g_trends v1` directory):
+
+    python -m gtrends.sidecar --address 127.0.0.1:8765
+
+and point each Streamlit process at it with GTRENDS_SIDECAR_ADDRESS. Requests
+from all workers go through one micro-batching InferenceQueue, so N workers
+share a single copy of the weights and their prompts share batches.
+
+Messages are length-prefixed JSON (never pickle), and every connection must
+pass the HMAC handshake with the shared key: GTRENDS_SIDECAR_AUTHKEY, or a
+random key generated on first use into a 0600 file under the cache directory,
+which is enough for processes on the same host. The sidecar only listens on
+loopback TCP or a Unix socket unless GTRENDS_SIDECAR_ALLOW_REMOTE=1, which
+also requires an explicit GTRENDS_SIDECAR_AUTHKEY.
+"""
+
+import os
+import sys
+import json
+import queue
+import socket
+import secrets
+import argparse
+import ipaddress
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from gtrends.config import (
+    CACHE_DIR,
+    HF_BATCH_SIZE,
+    INFERENCE_MAX_WAIT_MS,
+    SIDECAR_ADDRESS,
+    SIDECAR_ALLOW_REMOTE,
+    SIDECAR_AUTHKEY,
+)
+
+Address = Union[Tuple[str, int], str]
+
+DEFAULT_ADDRESS = SIDECAR_ADDRESS or "127.0.0.1:8765"
+AUTHKEY_PATH = os.path.join(CACHE_DIR, "sidecar.key")
+# Largest request / reply accepted; prompts and explanations are a few KB each
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+
+def parse_address(address: str) -> Address:
+    """'host:port' for TCP, anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+def is_local_address(address: Address) -> bool:
+    """True for Unix socket paths and TCP hosts that resolve to a loopback address."""
+    if isinstance(address, str):
+        return True
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(address[0])).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def load_authkey(path: str = AUTHKEY_PATH) -> bytes:
+    """GTRENDS_SIDECAR_AUTHKEY if set, else the host-local key in `path` (created 0600 on first use)."""
+    if SIDECAR_AUTHKEY:
+        return SIDECAR_AUTHKEY
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # Atomic and fails if the sidecar or another client created the key first
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    with open(path) as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"sidecar: empty authkey file {path}")
+    return key.encode("utf-8")
+
+
+def _send(conn: Any, message: Dict[str, Any]) -> None:
+    conn.send_bytes(json.dumps(message).encode("utf-8"))
+
+
+def _recv(conn: Any) -> Dict[str, Any]:
+    message = json.loads(conn.recv_bytes(MAX_MESSAGE_BYTES))
+    if not isinstance(message, dict):
+        raise ValueError("sidecar: expected a JSON object")
+    return message
+
+
+def _serve_connection(conn: Any, inference_queue: Any) -> None:
+    with conn:
+        while True:
+            try:
+                request = _recv(conn)
+            except (EOFError, OSError, ValueError):
+                # Closed, oversized or not JSON: drop the connection
+                return
+            try:
+                if request.get("op") == "stats":
+                    reply: Dict[str, Any] = {"stats": inference_queue.stats()}
+                else:
+                    prompts = request["prompts"]
+                    if not all(isinstance(prompt, str) for prompt in prompts):
+                        raise ValueError("prompts must be strings")
+                    futures = [inference_queue.submit(prompt) for prompt in prompts]
+                    reply = {"texts": [future.result() for future in futures]}
+            except Exception as e:
+                reply = {"error": str(e)}
+            try:
+                _send(conn, reply)
+            except (EOFError, OSError):
+                return
+
+
+def serve(
+    address: str = DEFAULT_ADDRESS,
+    authkey: Optional[bytes] = None,
+    token: Optional[str] = None,
+    max_batch_size: int = HF_BATCH_SIZE,
+    max_wait: float = INFERENCE_MAX_WAIT_MS / 1000.0,
+    allow_remote: bool = SIDECAR_ALLOW_REMOTE,
+) -> None:
+    """Load and warm up the pipeline, then answer prompt batches from any number of local clients."""
+    from multiprocessing.connection import Listener
+
+    listen_address = parse_address(address)
+    if not is_local_address(listen_address):
+        if not allow_remote:
+            raise RuntimeError(
+                f"sidecar: refusing to listen on non-loopback address {address}; "
+                "set GTRENDS_SIDECAR_ALLOW_REMOTE=1 to allow it"
+            )
+        if authkey is None and not SIDECAR_AUTHKEY:
+            raise RuntimeError("sidecar: a non-loopback address requires GTRENDS_SIDECAR_AUTHKEY to be set")
+    authkey = authkey or load_authkey()
+
+    from gtrends.explain import load_textgen_pipeline, warm_up_pipeline
+    from gtrends.inference import pipeline_inference_queue
+
+    textgen = load_textgen_pipeline(token)
+    if textgen is None:
+        raise RuntimeError("Text-generation pipeline unavailable. Ensure transformers is installed and the token is valid.")
+    try:
+        warm_up_pipeline(textgen)
+    except Exception as e:
+        print(f"[gtrends] sidecar: model warm-up failed, serving anyway: {e}", file=sys.stderr)
+    inference_queue = pipeline_inference_queue(textgen, max_batch_size=max_batch_size, max_wait=max_wait)
+
+    with Listener(listen_address, authkey=authkey) as listener:
+        print(f"[gtrends] sidecar serving on {address}", file=sys.stderr)
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # A client with the wrong authkey or a dropped handshake must not stop the server
+                print(f"[gtrends] sidecar: rejected connection: {e}", file=sys.stderr)
+                continue
+            threading.Thread(target=_serve_connection, args=(conn, inference_queue), daemon=True).start()
+
+
+class SidecarClient:
+    """Client for `serve`, with the same `submit()` / `stats()` interface as InferenceQueue.
+
+    Each in-flight request uses its own pooled connection (connections are not
+    thread-safe); the sidecar batches concurrent requests from all clients.
+    Without `authkey`, the key is resolved like the sidecar's (see `load_authkey`).
+    """
+
+    def __init__(
+        self, address: str = DEFAULT_ADDRESS, authkey: Optional[bytes] = None, max_connections: int = 2 * HF_BATCH_SIZE
+    ):
+        self.address = parse_address(address)
+        self.authkey = authkey or load_authkey()
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="gtrends-sidecar")
+
+    def _request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        from multiprocessing.connection import Client
+
+        try:
+            conn, pooled = self._idle.get_nowait(), True
+        except queue.Empty:
+            conn, pooled = Client(self.address, authkey=self.authkey), False
+        try:
+            _send(conn, payload)
+            reply = _recv(conn)
+        except (EOFError, OSError):
+            conn.close()
+            if not pooled:
+                raise
+            # The sidecar restarted since this connection was pooled; retry once on a fresh one
+            conn = Client(self.address, authkey=self.authkey)
+            _send(conn, payload)
+            reply = _recv(conn)
+        self._idle.put(conn)
+        if "error" in reply:
+            raise RuntimeError(f"sidecar: {reply['error']}")
+        return reply
+
+    def generate_batch(self, prompts: List[str]) -> List[str]:
+        return self._request({"prompts": prompts})["texts"]
+
+    def submit(self, prompt: str) -> "Future[str]":
+        return self._executor.submit(lambda: self.generate_batch([prompt])[0])
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request({"op": "stats"})["stats"]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m gtrends.sidecar", description=__doc__.splitlines()[0])
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help=f"host:port or Unix socket path (default: {DEFAULT_ADDRESS})")
+    parser.add_argument("--batch-size", type=int, default=HF_BATCH_SIZE, help="Max prompts per batch")
+    parser.add_argument("--max-wait-ms", type=float, default=INFERENCE_MAX_WAIT_MS, help="Max wait to fill a batch")
+    parser.add_argument(
+        "--allow-remote",
+        action="store_true",
+        default=SIDECAR_ALLOW_REMOTE,
+        help="Allow a non-loopback TCP address (requires GTRENDS_SIDECAR_AUTHKEY)",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+
+    serve(
+        args.address,
+        token=os.getenv("HUGGINGFACE_API_TOKEN"),
+        max_batch_size=args.batch_size,
+        max_wait=args.max_wait_ms / 1000.0,
+        allow_remote=args.allow_remote,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Broadcast(Generic[T]):
+    """Chunks of one in-flight stream, replayable from the start by any number of readers."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._chunks: List[T] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+
+    def publish(self, chunk: T) -> None:
+        with self._cond:
+            self._chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        with self._cond:
+            self._done, self._error = True, error
+            self._cond.notify_all()
+
+    def replay(self) -> Iterator[T]:
+        seen = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._chunks) > seen or self._done)
+                new, done, error = self._chunks[seen:], self._done, self._error
+            yield from new
+            seen += len(new)
+            if done and not new:
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key runs `fn`; callers that arrive while it is in
+    flight wait for it and get the same result (or exception). Nothing is kept
+    once the call returns, so results must be cached elsewhere; this only stops a
+    burst of identical cache misses from all reaching the backend at once.
+    `stream` does the same for generators (coalescing only with other `stream` calls).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, "Future[object]"] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self._executed = 0
+        self._shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._executed += 1
+            else:
+                self._shared += 1
+        if not leader:
+            return future.result()  # type: ignore[return-value]
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stream(self, key: Hashable, fn: Callable[[], Iterable[T]]) -> Iterator[T]:
+        """Streaming counterpart of `do`: one caller iterates `fn()`, the others replay its chunks.
+
+        Callers that join late first get the chunks produced so far, then the rest
+        as they arrive; an exception raised by the stream is re-raised to all of them.
+        If the leading caller stops reading early, the stream is finished on a
+        background thread so the callers replaying it still get the whole of it.
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            leader = broadcast is None
+            if leader:
+                broadcast = self._streams[key] = _Broadcast()
+                self._executed += 1
+            else:
+                self._shared += 1
+        if not leader:
+            yield from broadcast.replay()
+            return
+
+        try:
+            chunks = iter(fn())
+            for chunk in chunks:
+                broadcast.publish(chunk)
+                yield chunk
+        except GeneratorExit:
+            threading.Thread(target=self._drain, args=(key, broadcast, chunks), daemon=True).start()
+            raise
+        except BaseException as e:
+            self._end_stream(key, broadcast, e)
+            raise
+        else:
+            self._end_stream(key, broadcast)
+
+    def _drain(self, key: Hashable, broadcast: _Broadcast, chunks: Iterator[T]) -> None:
+        try:
+            for chunk in chunks:
+                broadcast.publish(chunk)
+        except BaseException as e:
+            self._end_stream(key, broadcast, e)
+        else:
+            self._end_stream(key, broadcast)
+
+    def _end_stream(self, key: Hashable, broadcast: _Broadcast, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+        broadcast.finish(error)
+
+    def stats(self) -> Dict[str, int]:
+        """Calls that ran, calls that waited for an identical one instead, and calls in flight."""
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "shared": self._shared,
+                "in_flight": len(self._calls) + len(self._streams),
+            }
+
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide SingleFlight shared by trend fetches and explanations."""
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            _single_flight = SingleFlight()
+        return _single_flight
@@ -0,0 +1,164 @@
+"""Daily-resolution history for ranges longer than Google's daily limit.
+
+Google Trends only returns daily points for windows of up to about nine
+months. Longer ranges are split into the fewest overlapping sub-windows that
+still return daily data, fetched concurrently (every request still goes through
+the shared rate limiter) and chained onto one scale using the overlaps. Each
+sub-window is cached on its own (under a 'window:' timeframe key), so a run
+that fails part-way (e.g. on a 429) only refetches the windows it is missing.
+"""
+
+from __future__ import annotations
+
+import math
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from gtrends.cache import TrendsCache, get_trends_cache, ttl_for_timeframe
+from gtrends.config import GEO_CODE, STITCH_OVERLAP_DAYS, STITCH_WINDOW_DAYS, TIMEFRAME
+from gtrends.fetch import fetch_interest_over_time, timeframe_bounds
+from gtrends.singleflight import get_single_flight
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def plan_windows(
+    start: dt.date,
+    end: dt.date,
+    window_days: int = STITCH_WINDOW_DAYS,
+    overlap_days: int = STITCH_OVERLAP_DAYS,
+) -> List[Tuple[dt.date, dt.date]]:
+    """Cover [start, end] with the fewest `window_days`-long windows overlapping by at least `overlap_days`.
+
+    n windows of length W with overlap O cover at most W + (n - 1) * (W - O) days,
+    so n = ceil((days - O) / (W - O)). The windows are then spread evenly, which
+    makes every overlap as large as the request count allows.
+    """
+    if overlap_days >= window_days:
+        raise ValueError("overlap_days must be smaller than window_days")
+    total = (end - start).days + 1
+    if total <= window_days:
+        return [(start, end)]
+
+    n = math.ceil((total - overlap_days) / (window_days - overlap_days))
+    span = total - window_days  # days between the first and the last window start
+    starts = [start + dt.timedelta(days=i * span // (n - 1)) for i in range(n)]
+    return [(s, s + dt.timedelta(days=window_days - 1)) for s in starts]
+
+
+def stitch_windows(frames: List[pd.Series]) -> pd.Series:
+    """Chain overlapping daily series (each normalised to its own peak) onto one 0-100 scale.
+
+    Window i is multiplied by the ratio of window i-1's total to its own total over
+    the days they share; the ratios are computed for all pairs at once and
+    accumulated with a cumulative product. Overlapping days take the mean of the
+    rescaled windows. A window whose overlap is all zero cannot be placed on the
+    common scale, so it and every later window come back NaN.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not frames:
+        return pd.Series(dtype=float, name="interest")
+
+    matrix = pd.concat(frames, axis=1, keys=range(len(frames))).sort_index()
+    values = matrix.to_numpy(dtype=float)
+    prev, cur = values[:, :-1], values[:, 1:]
+    shared = ~np.isnan(prev) & ~np.isnan(cur)
+    reference = np.where(shared, prev, 0.0).sum(axis=0)
+    own = np.where(shared, cur, 0.0).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.where((reference > 0) & (own > 0), reference / own, np.nan)
+    factors = np.concatenate([[1.0], np.cumprod(ratios)])
+
+    scaled = values * factors
+    counts = (~np.isnan(scaled)).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily = np.where(counts > 0, np.nansum(scaled, axis=1) / counts, np.nan)
+
+    peak = np.nanmax(daily) if np.isfinite(daily).any() else np.nan
+    if peak > 0:
+        daily = daily * (100.0 / peak)
+    return pd.Series(daily, index=matrix.index, name="interest")
+
+
+def fetch_window(
+    keyword: str, window: Tuple[dt.date, dt.date], geo: str = GEO_CODE, cache: Optional[TrendsCache] = None
+) -> pd.Series:
+    """Daily interest for one sub-window, read from and stored in `cache` under a 'window:' timeframe key.
+
+    Windows shorter than a week come back hourly from Google and are averaged into
+    days. The cache and single-flight keys are kept apart from `fetch_trends`,
+    which stores the same explicit-date timeframe as an unresampled frame.
+    """
+    import pandas as pd
+
+    timeframe = f"{window[0]:%Y-%m-%d} {window[1]:%Y-%m-%d}"
+    cache_key = f"window:{timeframe}"
+    if cache is not None:
+        cached = cache.get(keyword, cache_key, geo)
+        if cached is not None:
+            return cached.set_index("date")["interest"].rename(keyword)
+
+    def fetch() -> pd.Series:
+        wide = fetch_interest_over_time([keyword], timeframe=timeframe, geo=geo)
+        if keyword not in wide.columns or wide.empty:
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([], name="date"), name=keyword)
+        series = wide[keyword]
+        if len(series) > 1 and series.index[1] - series.index[0] < pd.Timedelta(days=1):
+            series = series.resample("D").mean()
+        if cache is not None:
+            frame = series.rename("interest").rename_axis("date").reset_index()
+            cache.set(keyword, cache_key, geo, frame, ttl=ttl_for_timeframe(timeframe))
+        return series
+
+    return get_single_flight().do(("trends", keyword, cache_key, geo), fetch).copy()
+
+
+def fetch_daily_trends(
+    keyword: str,
+    timeframe: str = TIMEFRAME,
+    geo: str = GEO_CODE,
+    workers: int = 4,
+    use_cache: bool = True,
+) -> pd.DataFrame:
+    """Fetch a daily series for any day-resolution timeframe, stitching sub-windows when needed.
+
+    Cached and coalesced like `fetch_trends` (under a 'daily:' timeframe key), and every
+    sub-window is cached on its own (see `fetch_window`). Raises ValueError for timeframes
+    without day bounds ('all', 'now 7-d').
+
+    Returns a DataFrame with columns: [date, interest]
+    """
+    import pandas as pd
+
+    bounds = timeframe_bounds(timeframe)
+    if bounds is None:
+        raise ValueError(f"Cannot fetch daily data for timeframe '{timeframe}'")
+
+    cache_key = f"daily:{timeframe}"
+    cache = get_trends_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.get(keyword, cache_key, geo)
+        if cached is not None:
+            return cached
+
+    def fetch() -> pd.DataFrame:
+        windows = plan_windows(*bounds)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(windows)))) as pool:
+            # A failing window raises here, but only after the others finished and were cached
+            frames = list(pool.map(lambda window: fetch_window(keyword, window, geo, cache), windows))
+
+        if all(f.empty for f in frames):
+            return pd.DataFrame(columns=["date", "interest"])
+        daily = stitch_windows(frames)
+        out = daily.round(2).rename_axis("date").reset_index()[["date", "interest"]]
+
+        if cache is not None and not out.empty:
+            ttl = ttl_for_timeframe(f"{bounds[0]:%Y-%m-%d} {bounds[1]:%Y-%m-%d}")
+            cache.set(keyword, cache_key, geo, out, ttl=ttl)
+        return out
+
+    return get_single_flight().do(("trends", keyword, cache_key, geo), fetch).copy()
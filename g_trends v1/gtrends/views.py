@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import threading
+import datetime as dt
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from gtrends.config import CACHE_DIR, GEO_CODE, VIEW_RETENTION_DAYS
+
+
+class ViewLog:
+    """SQLite-backed daily view counts per keyword, used to prioritise prefetching.
+
+    Rows older than `retention_days` are dropped as new views are recorded.
+    """
+
+    def __init__(self, path: str, retention_days: int = VIEW_RETENTION_DAYS):
+        self.path = path
+        self.retention_days = retention_days
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS views (
+                    keyword TEXT NOT NULL,
+                    geo TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (keyword, geo, day)
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, keyword: str, geo: str = GEO_CODE, day: Optional[dt.date] = None) -> None:
+        day = day or dt.date.today()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO views (keyword, geo, day, count) VALUES (?, ?, ?, 1)
+                ON CONFLICT (keyword, geo, day) DO UPDATE SET count = count + 1
+                """,
+                (keyword, geo, day.isoformat()),
+            )
+            cutoff = day - dt.timedelta(days=self.retention_days)
+            conn.execute("DELETE FROM views WHERE day < ?", (cutoff.isoformat(),))
+
+    def counts(self, days: int, geo: str = GEO_CODE, today: Optional[dt.date] = None) -> Dict[str, int]:
+        """Views per keyword over the last `days` days (including today)."""
+        since = (today or dt.date.today()) - dt.timedelta(days=days - 1)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT keyword, SUM(count) FROM views WHERE geo = ? AND day >= ? GROUP BY keyword",
+                (geo, since.isoformat()),
+            ).fetchall()
+        return {keyword: total for keyword, total in rows}
+
+    def top(self, n: int, days: int, geo: str = GEO_CODE) -> List[str]:
+        counts = self.counts(days, geo)
+        return sorted(counts, key=counts.get, reverse=True)[:n]
+
+
+_view_log: Optional[ViewLog] = None
+_view_log_lock = threading.Lock()
+
+
+def get_view_log() -> ViewLog:
+    """Return the process-wide view log stored under CACHE_DIR."""
+    global _view_log
+    with _view_log_lock:
+        if _view_log is None:
+            _view_log = ViewLog(os.path.join(CACHE_DIR, "views.sqlite"))
+        return _view_log
@@ -0,0 +1,83 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gtrends import fetch, ratelimit, retry, stitch
+from gtrends.fetch import timeframe_bounds
+
+
+class FakeGoogle:
+    """Deterministic stand-in for `fetch_interest_over_time`.
+
+    Every keyword has a fixed daily "true" interest. Like Google, windows of up to
+    269 days come back daily and longer ones as Sunday-started weekly means, each
+    window is scaled to its own peak of 100 and rounded to integers, and the point
+    whose period includes `today` is marked partial (averaged over the days so far).
+    """
+
+    def __init__(self, today: dt.date):
+        self.today = today
+        self.calls = []
+
+    @staticmethod
+    def truth(keyword: str) -> pd.Series:
+        days = pd.date_range("2015-01-01", "2030-12-31", freq="D")
+        rng = np.random.default_rng(sum(map(ord, keyword)))
+        trend = 50 + 20 * np.sin(np.arange(len(days)) / 45) + rng.normal(0, 6, len(days))
+        return pd.Series(np.clip(trend, 1, None), index=days)
+
+    def __call__(self, kw_list, timeframe, geo="US", keep_partial=False):
+        self.calls.append(timeframe)
+        start, end = timeframe_bounds(timeframe, self.today)
+        weekly = (end - start).days >= 270
+        end = min(end, self.today)
+        if weekly:
+            # Whole weeks: the first one starts on the Sunday on or before `start`
+            start -= dt.timedelta(days=(start.weekday() + 1) % 7)
+        wide = pd.DataFrame({kw: self.truth(kw)[pd.Timestamp(start):pd.Timestamp(end)] for kw in kw_list})
+        if weekly:
+            wide = wide.resample("W-SUN", label="left", closed="left").mean()
+            partial = wide.index + pd.Timedelta(days=6) >= pd.Timestamp(self.today)
+        else:
+            partial = wide.index == pd.Timestamp(self.today)
+        wide = (wide / wide.max().max() * 100).round()
+        if keep_partial:
+            wide["isPartial"] = partial
+        wide.index.name = "date"
+        return wide
+
+
+@pytest.fixture
+def fake_google(monkeypatch):
+    google = FakeGoogle(dt.date(2024, 6, 12))
+    monkeypatch.setattr(fetch, "fetch_interest_over_time", google)
+    monkeypatch.setattr(stitch, "fetch_interest_over_time", google)
+    return google
+
+
+class FakeClock:
+    """Stands in for the `time` module: sleeping moves the clock forward instead of waiting."""
+
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    for module in (retry, ratelimit):
+        monkeypatch.setattr(module, "time", fake)
+    return fake
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gtrends.anomalies import compute_anomalies, compute_anomalies_long
+
+
+def loop_anomalies(df, change_threshold=0.30):
+    """The original per-series implementation, with its forward fill spelled out."""
+    out = df.copy()
+    pct = out["interest"].astype(float).ffill().pct_change(fill_method=None)
+    out["pct_change"] = pct
+    out["is_anomaly"] = pct.abs() >= change_threshold
+    out["direction"] = pct.apply(lambda x: "spiked" if pd.notna(x) and x > 0 else ("dropped" if pd.notna(x) and x < 0 else None))
+    return out
+
+
+def make_series(keyword, seed):
+    rng = np.random.default_rng(seed)
+    interest = rng.integers(0, 100, 60).astype(float)
+    interest[[5, 6, 20]] = np.nan  # missing weeks
+    interest[[30, 31]] = 0.0  # zero interest, including 0 -> 0
+    dates = pd.date_range("2023-01-01", periods=60, freq="W-SUN")
+    return pd.DataFrame({"keyword": keyword, "geo": "US", "date": dates, "interest": interest})
+
+
+def assert_same(expected, actual):
+    np.testing.assert_allclose(expected["pct_change"], actual["pct_change"], equal_nan=True)
+    assert (expected["is_anomaly"].to_numpy() == actual["is_anomaly"].to_numpy()).all()
+    assert (expected["direction"].fillna("-").to_numpy() == actual["direction"].astype(object).fillna("-").to_numpy()).all()
+
+
+def test_single_series_matches_the_loop():
+    df = make_series("iphone", 0)
+    assert_same(loop_anomalies(df), compute_anomalies(df))
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_grouped_series_match_the_loop(shuffle):
+    frames = [make_series(f"kw{i}", i) for i in range(5)]
+    expected = pd.concat([loop_anomalies(f) for f in frames], ignore_index=True)
+    long_df = pd.concat(frames, ignore_index=True)
+
+    if shuffle:
+        order = np.random.default_rng(0).permutation(len(long_df))
+        actual = compute_anomalies_long(long_df.iloc[order]).sort_index()
+    else:
+        actual = compute_anomalies(long_df, by="keyword")
+    assert_same(expected, actual)
@@ -0,0 +1,64 @@
+import json
+import datetime as dt
+
+import pytest
+
+from gtrends.bulk import BulkExplanationJob, LocalFileBackend
+from gtrends.cache import ExplanationCache
+
+JOBS = [
+    ("iphone", dt.date(2023, 9, 10), "spiked"),
+    ("galaxy", dt.date(2023, 2, 5), "dropped"),
+    ("pixel", dt.date(2023, 10, 1), "spiked"),
+]
+
+
+def submitted_keywords(job_dir):
+    """Keywords whose prompts are in the last submitted request file."""
+    with open(job_dir / "requests.jsonl", encoding="utf-8") as f:
+        prompts = [json.loads(line)["body"]["messages"][-1]["content"] for line in f]
+    return sorted(kw for kw, _, _ in JOBS if any(f"'{kw}'" in prompt for prompt in prompts))
+
+
+def make_job(tmp_path, complete, **kwargs):
+    job_dir = tmp_path / "job"
+    backend = LocalFileBackend(str(job_dir / "local"), complete)
+    cache = ExplanationCache(str(tmp_path / "explanations.sqlite"))
+    return job_dir, BulkExplanationJob(str(job_dir), backend, cache, poll_interval=0, **kwargs)
+
+
+def test_rerun_resubmits_only_unfinished_items(tmp_path):
+    def flaky(prompt):
+        if "'galaxy'" in prompt:
+            raise RuntimeError("server error")
+        return "Explained."
+
+    job_dir, job = make_job(tmp_path, flaky)
+    texts = job.run(JOBS, max_rounds=1)
+    assert texts == ["Explained.", None, "Explained."]
+    assert submitted_keywords(job_dir) == ["galaxy", "iphone", "pixel"]
+
+    job_dir, job = make_job(tmp_path, lambda prompt: "Explained later.")
+    texts = job.run(JOBS, max_rounds=1)
+    assert texts == ["Explained.", "Explained later.", "Explained."]
+    assert submitted_keywords(job_dir) == ["galaxy"]
+
+
+def test_timeout_resumes_the_batch_in_flight(tmp_path):
+    class SlowBackend(LocalFileBackend):
+        finished = False
+
+        def status(self, batch_id):
+            return super().status(batch_id) if self.finished else "in_progress"
+
+    job_dir, job = make_job(tmp_path, lambda prompt: "Explained.")
+    job.backend = SlowBackend(str(job_dir / "local"), lambda prompt: "Explained.")
+    with pytest.raises(TimeoutError):
+        job.run(JOBS, timeout=0)
+    assert job.cached_texts(JOBS) == [None, None, None]
+    batch_id = json.loads((job_dir / "state.json").read_text())["batch_id"]
+
+    job.backend.finished = True
+    job.backend.submit = lambda path: pytest.fail("resubmitted a batch that was still in flight")
+    assert job.run(JOBS) == ["Explained."] * 3
+    assert json.loads((job_dir / "state.json").read_text())["last_batch_id"] == batch_id
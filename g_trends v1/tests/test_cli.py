@@ -0,0 +1,41 @@
+import pytest
+
+from gtrends import cli, fetch
+
+KEYWORDS = [f"kw{i}" for i in range(13)]
+
+
+@pytest.fixture
+def flaky_google(monkeypatch, fake_google):
+    """Fails every payload that contains `failing` (a set the test fills in)."""
+    failing = set()
+
+    def google(kw_list, timeframe, geo="US", keep_partial=False):
+        if failing & set(kw_list):
+            raise RuntimeError("429 Too Many Requests")
+        return fake_google(kw_list, timeframe, geo, keep_partial)
+
+    monkeypatch.setattr(fetch, "fetch_interest_over_time", google)
+    return failing
+
+
+@pytest.mark.parametrize("failing", ["kw7", "kw2"], ids=["later group", "anchor probe"])
+def test_batch_group_failure_keeps_the_other_groups(flaky_google, capsys, failing):
+    flaky_google.add(failing)
+    long_df = cli.fetch_all(KEYWORDS, "2023-01-01 2023-12-31", "US", workers=1, batch=True)
+
+    fetched = set(long_df["keyword"])
+    assert failing not in fetched and len(fetched) >= len(KEYWORDS) - 5
+    assert f"{failing}" in capsys.readouterr().err
+
+
+def test_batch_failure_sets_the_exit_code(flaky_google, tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, "configure_rate_limiter", lambda *args: None)
+    keywords_file = tmp_path / "keywords.txt"
+    keywords_file.write_text("\n".join(KEYWORDS))
+    output = tmp_path / "out.csv"
+
+    assert cli.main([str(keywords_file), "--batch", "--timeframe", "2023-01-01 2023-12-31", "-o", str(output)]) == 0
+    flaky_google.add("kw7")
+    assert cli.main([str(keywords_file), "--batch", "--timeframe", "2023-01-01 2023-12-31", "-o", str(output)]) == 1
+    assert output.exists()
@@ -0,0 +1,92 @@
+import json
+import time
+import threading
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from gtrends import explain
+from gtrends.cache import ExplanationCache
+from gtrends.singleflight import SingleFlight
+
+DATE = dt.date(2023, 9, 10)
+
+
+class StreamingClient:
+    """Fake OpenAI client whose streamed completion waits for `release` after the first chunk."""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        self.started.set()
+        return self.events()
+
+    def events(self):
+        for i, text in enumerate(["New ", "phone ", "launch."]):
+            if i == 1:
+                assert self.release.wait(5)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def test_concurrent_streams_share_one_call(tmp_path, monkeypatch):
+    flight = SingleFlight()
+    monkeypatch.setattr(explain, "get_single_flight", lambda: flight)
+    client = StreamingClient()
+    cache = ExplanationCache(str(tmp_path / "explanations.sqlite"))
+
+    def read():
+        return "".join(explain.stream_openai_explanation(
+            "iphone", DATE, "spiked", "sk-test", client_loader=lambda key: client, cache=cache
+        ))
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(read)
+        assert client.started.wait(5)
+        follower = pool.submit(read)
+        deadline = time.monotonic() + 5
+        while flight.stats()["shared"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        client.release.set()
+        assert leader.result() == follower.result() == "New phone launch."
+
+    assert client.calls == 1
+    prompt = explain.build_explanation_prompt("iphone", DATE, "spiked")
+    assert cache.get(prompt, explain.OPENAI_MODEL, explain.OPENAI_PARAMS) == "New phone launch."
+
+
+def test_parse_batch_keeps_complete_entries_of_a_cut_off_reply():
+    reply = '{"2023-01-01": "A \\"quoted\\" launch.", "2023-01-08": "Cut o'
+    assert explain.parse_batch_explanations(reply) == {"2023-01-01": 'A "quoted" launch.'}
+
+
+def test_parse_batch_rejects_malformed_replies():
+    assert explain.parse_batch_explanations("Sorry, I cannot help.") == {}
+    assert explain.parse_batch_explanations('["2023-01-01", "x"]') == {}
+    assert explain.parse_batch_explanations('{"2023-01-01": 3, "2023-01-08": "  "}') == {}
+    assert explain.parse_batch_explanations('```json\n{"2023-01-01": " Launch. "}\n```') == {"2023-01-01": "Launch."}
+
+
+def test_batch_is_split_into_bounded_requests(monkeypatch):
+    monkeypatch.setattr(explain, "get_single_flight", SingleFlight)
+    requests = []
+
+    def create(**kwargs):
+        dates = [line[2:12] for line in kwargs["messages"][0]["content"].splitlines() if line.startswith("- ")]
+        requests.append((len(dates), kwargs["max_tokens"]))
+        content = json.dumps({date: f"Explained {date}." for date in dates})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    anomalies = [(DATE + dt.timedelta(weeks=i), "spiked") for i in range(23)]
+    texts = explain.openai_explanations_batch(
+        "iphone", anomalies, "sk-test", client_loader=lambda key: client, chunk_size=10
+    )
+
+    assert texts == [f"Explained {date:%Y-%m-%d}." for date, _ in anomalies]
+    assert [n for n, _ in requests] == [10, 10, 3]
+    assert max(tokens for _, tokens in requests) == (explain.MAX_TOKENS + 20) * 10
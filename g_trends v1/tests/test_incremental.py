@@ -0,0 +1,45 @@
+import datetime as dt
+
+from gtrends.cache import SeriesStore
+from gtrends.fetch import refresh_trends, timeframe_bounds
+
+KEYWORD, TIMEFRAME, GEO = "iphone", "today 12-m", "US"
+
+
+def refresh(google, store):
+    return refresh_trends(KEYWORD, TIMEFRAME, GEO, overlap=4, store=store, today=google.today)
+
+
+def test_tail_refresh_matches_full_refetch(tmp_path, fake_google):
+    store = SeriesStore(str(tmp_path / "series.sqlite"))
+    refresh(fake_google, store)
+    fake_google.today += dt.timedelta(days=10)
+
+    fake_google.calls.clear()
+    incremental = refresh(fake_google, store)
+    assert len(fake_google.calls) == 1
+    tail_start, tail_end = timeframe_bounds(fake_google.calls[0])
+    assert tail_end == fake_google.today
+    assert (tail_end - tail_start).days < 60
+
+    full = refresh(fake_google, SeriesStore(str(tmp_path / "full.sqlite")))
+    assert incremental["date"].tolist() == full["date"].tolist()
+    assert (incremental["interest"] - full["interest"]).abs().max() <= 2.0
+
+
+def test_partial_rows_are_replaced(tmp_path, fake_google):
+    store = SeriesStore(str(tmp_path / "series.sqlite"))
+    refresh(fake_google, store)
+    stored, _ = store.get(KEYWORD, TIMEFRAME, GEO)
+    assert stored["is_partial"].tolist()[-1:] == [True] and stored["is_partial"].sum() == 1
+    partial_week = stored["date"].iloc[-1]
+
+    fake_google.today += dt.timedelta(days=10)
+    refreshed = refresh(fake_google, store)
+    stored, _ = store.get(KEYWORD, TIMEFRAME, GEO)
+    assert not stored.loc[stored["date"] == partial_week, "is_partial"].item()
+    assert stored["is_partial"].sum() == 1 and stored["is_partial"].iloc[-1]
+
+    full = refresh(fake_google, SeriesStore(str(tmp_path / "full.sqlite")))
+    week = lambda df: df.loc[df["date"] == partial_week, "interest"].item()
+    assert abs(week(refreshed) - week(full)) <= 2.0
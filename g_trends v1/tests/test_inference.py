@@ -0,0 +1,93 @@
+import time
+import threading
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gtrends import inference
+from gtrends.cache import ExplanationCache
+from gtrends.inference import InferenceQueue
+from gtrends.singleflight import SingleFlight
+
+
+class FakeModel:
+    """Records whether two calls ever use the model at the same time."""
+
+    def __init__(self):
+        self.active = 0
+        self.overlapped = False
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        with self.lock:
+            self.active += 1
+            self.overlapped |= self.active > 1
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.active -= 1
+
+    def generate_batch(self, prompts):
+        with self:
+            time.sleep(0.02)
+            return [f"batched {p}" for p in prompts]
+
+    def generate_stream(self, prompt):
+        with self:
+            for word in ["streamed", " ", prompt]:
+                time.sleep(0.01)
+                yield word
+
+
+def test_streams_and_batches_never_share_the_model():
+    model = FakeModel()
+    queue = InferenceQueue(model.generate_batch, max_batch_size=4, max_wait=0.01, generate_stream=model.generate_stream)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            batched = [pool.submit(lambda i=i: queue.submit(f"b{i}").result()) for i in range(12)]
+            streamed = [pool.submit(lambda i=i: "".join(queue.submit_stream(f"s{i}"))) for i in range(4)]
+            assert [f.result() for f in batched] == [f"batched b{i}" for i in range(12)]
+            assert [f.result() for f in streamed] == [f"streamed s{i}" for i in range(4)]
+    finally:
+        queue.close(5)
+
+    assert not model.overlapped
+    assert queue.stats()["streams"] == 4
+
+
+def test_stream_failure_reaches_the_reader():
+    def broken(prompt):
+        yield "partial"
+        raise RuntimeError("CUDA error")
+
+    queue = InferenceQueue(lambda prompts: prompts, generate_stream=broken)
+    chunks = []
+    try:
+        with pytest.raises(RuntimeError, match="CUDA error"):
+            for chunk in queue.submit_stream("p"):
+                chunks.append(chunk)
+    finally:
+        queue.close(5)
+    assert chunks == ["partial"] and queue.stats()["failed"] == 1
+
+
+def test_queued_stream_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(inference, "get_single_flight", SingleFlight)
+    model = FakeModel()
+    queue = InferenceQueue(model.generate_batch, generate_stream=model.generate_stream)
+    cache = ExplanationCache(str(tmp_path / "explanations.sqlite"))
+    date = dt.date(2023, 9, 10)
+
+    def stream():
+        return "".join(inference.queued_stream_hf_explanation(
+            "iphone", date, "spiked", "hf_token", queue_loader=lambda token: queue, cache=cache
+        ))
+
+    try:
+        first = stream()
+        assert first.startswith("streamed ")
+        assert stream() == first
+    finally:
+        queue.close(5)
+    assert queue.stats()["streams"] == 1
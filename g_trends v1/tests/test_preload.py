@@ -0,0 +1,22 @@
+from gtrends import explain, preload
+
+
+def test_server_start_and_app_share_one_preload(monkeypatch):
+    loads = []
+    monkeypatch.setattr(preload, "_preloaders", {})
+    monkeypatch.setattr(explain, "load_textgen_pipeline", lambda token: loads.append(token) or "pipeline")
+    monkeypatch.setattr(explain, "warm_up_pipeline", lambda textgen: None)
+
+    started = preload.preload_textgen_pipeline("hf_token")  # gtrends.serve, before the server runs
+    assert preload.preload_textgen_pipeline("hf_token") is started  # app.py, on the first page view
+    assert started.wait(5) == "pipeline" and started.ready
+    assert loads == ["hf_token"]
+
+
+def test_failed_warm_up_still_serves_the_model():
+    def warmup(model):
+        raise RuntimeError("out of memory")
+
+    preloader = preload.ModelPreloader(lambda: "pipeline", warmup=warmup).start()
+    assert preloader.wait(5) == "pipeline"
+    assert preloader.state == "ready" and "out of memory" in preloader.status()["error"]
@@ -0,0 +1,57 @@
+import sys
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from gtrends.ratelimit import SQLiteTokenBucket, TokenBucket
+
+
+def test_bucket_admits_a_burst_then_waits_for_the_refill(clock):
+    bucket = TokenBucket(rate=0.5, burst=3)
+    for _ in range(3):
+        assert bucket.acquire()
+    assert clock.sleeps == []
+
+    assert bucket.acquire()
+    assert clock.sleeps == [pytest.approx(2.0)]
+    assert not bucket.acquire(timeout=1.0)
+
+
+def test_sqlite_buckets_share_one_budget(tmp_path, clock):
+    path = str(tmp_path / "ratelimit.sqlite")
+    first = SQLiteTokenBucket(path, rate=0.5, burst=2)
+    second = SQLiteTokenBucket(path, rate=0.5, burst=2)  # e.g. another Streamlit process
+
+    assert first.acquire() and second.acquire()
+    # The budget spent through `first` is gone for `second` too
+    assert not second.acquire(timeout=1.0)
+    assert not first.acquire(timeout=1.0)
+
+    # Refill time is shared as well: 2 s later one token is back, for whichever instance asks first
+    clock.sleep(2.0)
+    assert second.acquire(timeout=0)
+    assert not first.acquire(timeout=1.0)
+    clock.sleep(10.0)
+    assert first.acquire(timeout=0) and first.acquire(timeout=0)
+    assert not second.acquire(timeout=1.0)  # never refills beyond the burst
+
+
+CHILD = """
+import sys
+from gtrends.ratelimit import SQLiteTokenBucket
+bucket = SQLiteTokenBucket(sys.argv[1], rate=1 / 3600, burst=3)
+print(sum(bucket.acquire(timeout=0) for _ in range(5)))
+"""
+
+
+def test_budget_is_shared_with_another_process(tmp_path):
+    path = str(tmp_path / "ratelimit.sqlite")
+    # Refilling one token an hour, the real clock cannot refill anything during the test
+    child = subprocess.run(
+        [sys.executable, "-c", CHILD, path], cwd=Path(__file__).parents[1], capture_output=True, text=True, check=True
+    )
+    assert child.stdout.strip() == "3"
+
+    bucket = SQLiteTokenBucket(path, rate=1 / 3600, burst=3)
+    assert not bucket.acquire(timeout=0)
@@ -0,0 +1,117 @@
+import email.utils
+from types import SimpleNamespace
+
+import pytest
+
+from gtrends import retry
+from gtrends.retry import CircuitBreaker, CircuitOpenError, call_with_retry
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"{status_code} error")
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def failing(*errors, result="ok"):
+    """A callable that raises `errors` in turn, then returns `result`."""
+    pending = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if pending:
+            raise pending.pop(0)
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+def test_retry_after_header_sets_the_wait(clock):
+    fn = failing(HTTPError(429, {"Retry-After": "7"}), HTTPError(429, {"Retry-After": "3"}))
+    breaker = CircuitBreaker(failure_threshold=5)
+    assert call_with_retry(fn, max_attempts=3, max_delay=60, breaker=breaker) == "ok"
+    assert clock.sleeps == [7.0, 3.0]
+
+
+def test_retry_after_http_date(clock):
+    header = email.utils.formatdate(clock.now + 30, usegmt=True)
+    fn = failing(HTTPError(429, {"Retry-After": header}))
+    assert call_with_retry(fn, max_attempts=2, max_delay=60, breaker=CircuitBreaker()) == "ok"
+    assert clock.sleeps == [pytest.approx(30, abs=1)]
+
+
+def test_backoff_without_retry_after_is_exponential_and_capped(clock, monkeypatch):
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)  # always the longest jittered wait
+    fn = failing(*[HTTPError(429)] * 4)
+    assert call_with_retry(fn, max_attempts=5, max_delay=3.0, breaker=CircuitBreaker(failure_threshold=10)) == "ok"
+    base = retry.RETRY_BASE_DELAY
+    assert clock.sleeps == [min(3.0, base * 2 ** i) for i in range(4)]
+
+
+def test_retry_after_beyond_max_delay_opens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=5)
+    fn = failing(HTTPError(429, {"Retry-After": "120"}))
+    with pytest.raises(HTTPError):
+        call_with_retry(fn, max_attempts=3, max_delay=60, breaker=breaker)
+    assert clock.sleeps == [] and len(fn.calls) == 1
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        call_with_retry(fn, breaker=breaker)
+    assert excinfo.value.retry_in == pytest.approx(120) and len(fn.calls) == 1
+
+
+def test_other_errors_are_not_retried(clock):
+    fn = failing(ValueError("bad payload"))
+    with pytest.raises(ValueError):
+        call_with_retry(fn, max_attempts=5, breaker=CircuitBreaker())
+    assert len(fn.calls) == 1 and clock.sleeps == []
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure(rate_limited=True)
+
+    # Open: every call fails fast until the cooldown has passed
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.sleep(59)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # Half-open: one trial call, the others still fail fast
+    clock.sleep(1)
+    assert not breaker.is_open
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # A successful trial closes it
+    breaker.record_success()
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+    for _ in range(2):
+        breaker.record_failure(rate_limited=True)
+    clock.sleep(60)
+
+    breaker.before_call()
+    breaker.record_failure(rate_limited=True)
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_in == pytest.approx(60)
+
+
+def test_non_rate_limit_failures_do_not_trip_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.record_failure(rate_limited=False)
+    breaker.before_call()
+    assert not breaker.is_open
@@ -0,0 +1,57 @@
+import datetime as dt
+
+import pytest
+
+from gtrends.semantic import SemanticExplanationCache
+
+DATE = dt.date(2023, 9, 10)
+PARAMS = {"max_tokens": 150}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SemanticExplanationCache(str(tmp_path / "semantic.sqlite"))
+
+
+def remember(cache, keyword):
+    cache.add(keyword, DATE, "spiked", "gpt-4o-mini", PARAMS, f"Explanation for {keyword}.")
+
+
+def lookup(cache, keyword):
+    return cache.lookup(keyword, DATE, "spiked", "gpt-4o-mini", PARAMS)
+
+
+@pytest.mark.parametrize(
+    "stored, query",
+    [
+        ("iphone 15", "iPhone15"),
+        ("electric cars", "electric car"),
+        ("ChatGPT", "chat gpt"),
+        ("world cup 2022", "2022 World Cup"),
+    ],
+)
+def test_variant_spellings_are_reused(cache, stored, query):
+    remember(cache, stored)
+    assert lookup(cache, query) == f"Explanation for {stored}."
+
+
+@pytest.mark.parametrize(
+    "stored, query",
+    [
+        ("galaxy s23", "galaxy s24"),
+        ("world cup 2022", "world cup 2026"),
+        ("iphone", "iphone 15"),
+        ("iphone 15", "iphone 15 pro"),
+        ("jaguar", "jaguar car"),
+        ("apple event", "iphone"),
+    ],
+)
+def test_different_entities_are_not_reused(cache, stored, query):
+    remember(cache, stored)
+    assert lookup(cache, query) is None
+
+
+def test_other_week_or_direction_is_not_reused(cache):
+    remember(cache, "electric cars")
+    assert cache.lookup("electric car", DATE, "dropped", "gpt-4o-mini", PARAMS) is None
+    assert cache.lookup("electric car", DATE + dt.timedelta(days=7), "spiked", "gpt-4o-mini", PARAMS) is None
@@ -0,0 +1,74 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gtrends.singleflight import SingleFlight
+
+FOLLOWERS = 4
+
+
+def run_together(flight, fn):
+    """Call `flight.do("key", fn)` from a leader and FOLLOWERS threads that join while it is in flight."""
+    release = threading.Event()
+    started = threading.Event()
+    calls = []
+
+    def leader_fn():
+        calls.append(1)
+        started.set()
+        assert release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            return "result", flight.do("key", leader_fn)
+        except Exception as e:
+            return "error", e
+
+    with ThreadPoolExecutor(max_workers=FOLLOWERS + 1) as pool:
+        leader = pool.submit(call)
+        assert started.wait(5)
+        followers = [pool.submit(call) for _ in range(FOLLOWERS)]
+        deadline = time.monotonic() + 5
+        while flight.stats()["shared"] < FOLLOWERS and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        outcomes = [leader.result()] + [f.result() for f in followers]
+    return calls, outcomes
+
+
+def test_followers_get_the_leaders_result():
+    flight = SingleFlight()
+    shared = object()
+    calls, outcomes = run_together(flight, lambda: shared)
+
+    assert len(calls) == 1
+    assert all(kind == "result" and value is shared for kind, value in outcomes)
+    assert flight.stats() == {"executed": 1, "shared": FOLLOWERS, "in_flight": 0}
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight()
+    error = RuntimeError("429 Too Many Requests")
+
+    def fail():
+        raise error
+
+    calls, outcomes = run_together(flight, fail)
+    assert len(calls) == 1
+    assert all(kind == "error" and value is error for kind, value in outcomes)
+
+
+def test_nothing_is_kept_after_the_call():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("first")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "second") == "second"
+    assert flight.do("other", lambda: "other") == "other"
+    assert flight.stats() == {"executed": 3, "shared": 0, "in_flight": 0}
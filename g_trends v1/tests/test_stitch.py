@@ -0,0 +1,85 @@
+import math
+import threading
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from gtrends import fetch, stitch
+from gtrends.cache import TrendsCache
+from gtrends.stitch import fetch_daily_trends, plan_windows
+
+START, END = dt.date(2019, 1, 1), dt.date(2023, 12, 31)
+
+
+def test_plan_windows_five_years():
+    windows = plan_windows(START, END, window_days=269, overlap_days=30)
+
+    total = (END - START).days + 1
+    assert len(windows) == math.ceil((total - 30) / (269 - 30)) == 8
+    assert windows[0][0] == START and windows[-1][1] == END
+    assert all((end - start).days + 1 == 269 for start, end in windows)
+    overlaps = [(prev[1] - cur[0]).days + 1 for prev, cur in zip(windows, windows[1:])]
+    assert min(overlaps) >= 30
+
+
+def test_short_range_is_one_window():
+    assert plan_windows(dt.date(2023, 1, 1), dt.date(2023, 6, 30)) == [(dt.date(2023, 1, 1), dt.date(2023, 6, 30))]
+
+
+def test_stitched_history_matches_truth(fake_google):
+    daily = fetch_daily_trends("iphone", f"{START} {END}", use_cache=False).set_index("date")["interest"]
+
+    assert len(fake_google.calls) == 8
+    truth = fake_google.truth("iphone")[str(START):str(END)]
+    truth = truth / truth.max() * 100
+    assert daily.index.equals(truth.index)
+    assert (daily - truth).abs().max() <= 2.0
+
+
+def test_failed_window_is_the_only_one_refetched(tmp_path, monkeypatch, fake_google):
+    monkeypatch.setattr(stitch, "get_trends_cache", lambda: TrendsCache(str(tmp_path / "trends.sqlite")))
+    windows = plan_windows(START, END)
+    throttled = f"{windows[3][0]:%Y-%m-%d} {windows[3][1]:%Y-%m-%d}"
+
+    def flaky(kw_list, timeframe, geo="US", keep_partial=False):
+        if timeframe == throttled:
+            raise RuntimeError("429 Too Many Requests")
+        return fake_google(kw_list, timeframe, geo, keep_partial)
+
+    monkeypatch.setattr(stitch, "fetch_interest_over_time", flaky)
+    with pytest.raises(RuntimeError):
+        fetch_daily_trends("iphone", f"{START} {END}")
+    assert len(fake_google.calls) == 7
+
+    fake_google.calls.clear()
+    monkeypatch.setattr(stitch, "fetch_interest_over_time", fake_google)
+    assert len(fetch_daily_trends("iphone", f"{START} {END}")) == (END - START).days + 1
+    assert fake_google.calls == [throttled]
+
+
+def test_window_and_trends_fetches_stay_apart(tmp_path, monkeypatch, fake_google):
+    cache = TrendsCache(str(tmp_path / "trends.sqlite"))
+    monkeypatch.setattr(fetch, "get_trends_cache", lambda: cache)
+    window = (dt.date(2023, 3, 1), dt.date(2023, 3, 5))
+    timeframe = f"{window[0]:%Y-%m-%d} {window[1]:%Y-%m-%d}"
+    both_in_flight = threading.Barrier(2, timeout=5)
+
+    def hourly(kw_list, timeframe, geo="US", keep_partial=False):
+        # Both calls must reach Google: a coalesced one would leave the barrier waiting
+        both_in_flight.wait()
+        hours = pd.date_range(window[0], periods=5 * 24, freq="h", name="date")
+        return pd.DataFrame({kw: range(len(hours)) for kw in kw_list}, index=hours, dtype=float)
+
+    monkeypatch.setattr(fetch, "fetch_interest_over_time", hourly)
+    monkeypatch.setattr(stitch, "fetch_interest_over_time", hourly)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        trends = pool.submit(fetch.fetch_trends, "iphone", timeframe, "US", True, False)
+        daily = pool.submit(stitch.fetch_window, "iphone", window, "US", cache)
+        trends, daily = trends.result(), daily.result()
+
+    assert list(trends.columns) == ["date", "interest"] and len(trends) == 5 * 24
+    assert isinstance(daily, pd.Series) and len(daily) == 5
+    assert len(cache.get("iphone", timeframe, "US")) == 5 * 24
+    assert len(stitch.fetch_window("iphone", window, "US", cache)) == 5